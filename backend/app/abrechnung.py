@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import Date, Integer, cast, delete, extract, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger("GreenEcoHub")
+
+RECHNUNGSPERIODE_TAGE = 365
+ZAHLUNGSZIEL_TAGE = 30
+RECHNUNG_PERIODE_UC = "_rechnung_periode_uc"
+BATCH_AUFBEWAHRUNG_TAGE = 30
+BATCH_MAX_FEHLVERSUCHE = 3
+RECHNUNG_SPALTEN = [
+    "empfaenger_id",
+    "rechnungsbetrag",
+    "rechnungsdatum",
+    "faelligkeitsdatum",
+    "rechnungsart",
+    "steller_id",
+    "rechnungsperiode_start",
+    "rechnungsperiode_ende",
+    "zahlungsstatus",
+]
+
+
+def jahrestag_ausdruck(jahr: int):
+    """
+    Baut den SQL-Ausdruck für den Jahrestag des Vertragsbeginns im angegebenen Jahr.
+
+    Postgres kürzt beim Addieren von Jahren einen 29. Februar in Nicht-Schaltjahren auf den 28. Februar.
+
+    Args:
+        jahr (int): Das Jahr, in dem der Jahrestag liegen soll.
+
+    Returns:
+        ColumnElement: Der Jahrestag als Date-Ausdruck.
+    """
+    jahre_seit_beginn = literal(jahr, Integer) - cast(extract("year", models.Vertrag.beginn_datum), Integer)
+    return cast(models.Vertrag.beginn_datum + func.make_interval(jahre_seit_beginn), Date)
+
+
+def faellige_rechnungen_select(heute: date, vertrag_id_von: Optional[int] = None,
+                               vertrag_id_bis: Optional[int] = None):
+    """
+    Baut die Abfrage aller Netzbetreiber-Rechnungen, die bis heute fällig sind.
+
+    Fällig ist jeder Vertrag, dessen Jahrestag im laufenden Jahr erreicht oder bereits vergangen ist. Ob die Rechnung
+    schon existiert, entscheidet der Unique-Constraint beim Einfügen, nicht diese Abfrage.
+
+    Args:
+        heute (date): Das Stichtagsdatum des Rechnungslaufs.
+        vertrag_id_von (Optional[int]): Untere Grenze der Vertrags-IDs (einschließlich).
+        vertrag_id_bis (Optional[int]): Obere Grenze der Vertrags-IDs (einschließlich).
+
+    Returns:
+        Select: Die Abfrage mit den Spalten in der Reihenfolge von RECHNUNG_SPALTEN.
+    """
+    vertraege = select(
+        models.Vertrag.user_id,
+        models.Vertrag.netzbetreiber_id,
+        models.Vertrag.jahresabschlag,
+        models.Vertrag.beginn_datum,
+        jahrestag_ausdruck(heute.year).label("jahrestag"),
+    )
+    if vertrag_id_von is not None:
+        vertraege = vertraege.where(models.Vertrag.vertrag_id >= vertrag_id_von)
+    if vertrag_id_bis is not None:
+        vertraege = vertraege.where(models.Vertrag.vertrag_id <= vertrag_id_bis)
+    v = vertraege.subquery("v")
+
+    return select(
+        v.c.user_id,
+        v.c.jahresabschlag,
+        v.c.jahrestag,
+        v.c.jahrestag + ZAHLUNGSZIEL_TAGE,
+        literal(models.Rechnungsart.Netzbetreiber_Rechnung, models.Rechnungen.rechnungsart.type),
+        v.c.netzbetreiber_id,
+        v.c.jahrestag,
+        v.c.jahrestag + RECHNUNGSPERIODE_TAGE,
+        literal(models.Zahlungsstatus.Offen, models.Rechnungen.zahlungsstatus.type),
+    ).where(v.c.jahrestag <= heute, v.c.beginn_datum <= v.c.jahrestag)
+
+
+async def erstelle_faellige_rechnungen(db: AsyncSession, heute: date, vertrag_id_von: Optional[int] = None,
+                                       vertrag_id_bis: Optional[int] = None) -> int:
+    """
+    Legt alle fälligen Netzbetreiber-Rechnungen mit einem einzigen INSERT ... SELECT an.
+
+    Bereits vorhandene Rechnungen für denselben Empfänger und Zeitraum werden über den Unique-Constraint
+    übersprungen, daher kann der Lauf beliebig oft wiederholt werden. Gezählt werden nur die per RETURNING
+    zurückgegebenen, tatsächlich eingefügten Zeilen. Die Transaktion wird nicht committet.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        heute (date): Das Stichtagsdatum des Rechnungslaufs.
+        vertrag_id_von (Optional[int]): Untere Grenze der Vertrags-IDs (einschließlich).
+        vertrag_id_bis (Optional[int]): Obere Grenze der Vertrags-IDs (einschließlich).
+
+    Returns:
+        int: Die Anzahl der neu angelegten Rechnungen.
+    """
+    stmt = (insert(models.Rechnungen)
+            .from_select(RECHNUNG_SPALTEN, faellige_rechnungen_select(heute, vertrag_id_von, vertrag_id_bis))
+            .on_conflict_do_nothing(constraint=RECHNUNG_PERIODE_UC)
+            .returning(models.Rechnungen.rechnung_id))
+    result = await db.execute(stmt)
+    return len(result.scalars().all())
+
+
+async def plane_batches(db: AsyncSession, stichtag: date, batch_groesse: int) -> int:
+    """
+    Teilt die Verträge für einen Stichtag in Batches zusammenhängender Vertrags-IDs auf und speichert sie.
+
+    Die Batchgrenzen werden per Keyset-Paginierung über den Primärschlüssel bestimmt. Sind für den Stichtag noch
+    Batches offen, etwa weil ein abgebrochener Lauf fortgesetzt wird, bleibt die Planung unverändert. Sind bereits
+    alle abgeschlossen, z. B. bei einem zweiten, manuell ausgelösten Lauf am selben Tag, wird der nach oben offene
+    letzte Batch wieder geöffnet, damit seit der Planung angelegte Verträge noch am selben Tag abgerechnet werden.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        stichtag (date): Der Stichtag des Rechnungslaufs.
+        batch_groesse (int): Die Anzahl der Verträge pro Batch.
+
+    Returns:
+        int: Die Anzahl der neu geplanten oder wieder geöffneten Batches.
+    """
+    vorhanden, offen = (await db.execute(
+        select(func.count(), func.count().filter(models.RechnungslaufBatch.abgeschlossen_am.is_(None)))
+        .where(models.RechnungslaufBatch.stichtag == stichtag)
+    )).one()
+    if offen:
+        return 0
+    if vorhanden:
+        # Bereits abgerechnete Verträge des Batches überspringt der Unique-Constraint
+        result = await db.execute(update(models.RechnungslaufBatch)
+                                  .where(models.RechnungslaufBatch.stichtag == stichtag,
+                                         models.RechnungslaufBatch.vertrag_id_bis.is_(None))
+                                  .values(abgeschlossen_am=None, geplant_am=func.now()))
+        await db.commit()
+        return max(result.rowcount, 0)
+
+    grenzen: List[int] = []
+    naechste = await db.scalar(select(func.min(models.Vertrag.vertrag_id)))
+    while naechste is not None:
+        grenzen.append(naechste)
+        naechste = await db.scalar(select(models.Vertrag.vertrag_id)
+                                   .where(models.Vertrag.vertrag_id >= naechste)
+                                   .order_by(models.Vertrag.vertrag_id)
+                                   .offset(batch_groesse).limit(1))
+    if not grenzen:
+        return 0
+
+    batches = [{"stichtag": stichtag, "vertrag_id_von": von,
+                "vertrag_id_bis": grenzen[i + 1] - 1 if i + 1 < len(grenzen) else None}
+               for i, von in enumerate(grenzen)]
+    result = await db.execute(insert(models.RechnungslaufBatch).values(batches)
+                              .on_conflict_do_nothing(index_elements=["stichtag", "vertrag_id_von"]))
+    await db.execute(delete(models.RechnungslaufBatch).where(
+        models.RechnungslaufBatch.abgeschlossen_am < datetime.now() - timedelta(days=BATCH_AUFBEWAHRUNG_TAGE)))
+    await db.commit()
+    return max(result.rowcount, 0)
+
+
+async def rechne_batches_ab(stichtag: date) -> dict:
+    """
+    Arbeitet offene Batches bis zum Stichtag ab, bis keiner mehr übrig ist.
+
+    Jeder Batch wird mit SELECT ... FOR UPDATE SKIP LOCKED reserviert, sodass mehrere Aufrufe, auch aus anderen
+    Prozessen, parallel laufen können, ohne denselben Batch doppelt zu bearbeiten. Rechnungen und Abschluss des
+    Batches werden in derselben Transaktion committet; bricht ein Lauf ab, bleibt der Batch offen und wird beim
+    nächsten Lauf fortgesetzt. Schlägt ein Batch fehl, wird das in fehlversuche gespeichert; nach
+    BATCH_MAX_FEHLVERSUCHE Fehlversuchen überspringen ihn alle Worker bis zum nächsten Lauf.
+
+    Args:
+        stichtag (date): Der Stichtag des aktuellen Laufs, offene Batches früherer Läufe werden mit abgearbeitet.
+
+    Returns:
+        dict: Anzahl der abgeschlossenen Batches, der dabei erstellten Rechnungen und der aufgegebenen Batches.
+    """
+    batch_tabelle = models.RechnungslaufBatch
+    batches, erstellt, fehlgeschlagen = 0, 0, 0
+    async with SessionLocal() as db:
+        while True:
+            batch = (await db.execute(
+                select(batch_tabelle)
+                .where(batch_tabelle.abgeschlossen_am.is_(None),
+                       batch_tabelle.stichtag <= stichtag,
+                       batch_tabelle.fehlversuche < BATCH_MAX_FEHLVERSUCHE)
+                .order_by(batch_tabelle.stichtag, batch_tabelle.vertrag_id_von)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )).scalar_one_or_none()
+            if batch is None:
+                await db.rollback()
+                break
+
+            schluessel = (batch.stichtag, batch.vertrag_id_von)
+            try:
+                neu = await erstelle_faellige_rechnungen(db, batch.stichtag, batch.vertrag_id_von,
+                                                         batch.vertrag_id_bis)
+                # Ein wieder geöffneter Batch behält die Anzahl seines ersten Durchlaufs
+                batch.erstellt = (batch.erstellt or 0) + neu
+                batch.abgeschlossen_am = datetime.now()
+                await db.commit()
+            except DBAPIError as e:
+                # z. B. ein Deadlock mit einem parallelen Batch, der dieselbe Rechnung einfügt
+                await db.rollback()
+                versuche = await db.scalar(
+                    update(batch_tabelle)
+                    .where(batch_tabelle.stichtag == schluessel[0], batch_tabelle.vertrag_id_von == schluessel[1])
+                    .values(fehlversuche=batch_tabelle.fehlversuche + 1)
+                    .returning(batch_tabelle.fehlversuche)
+                    .execution_options(synchronize_session=False))
+                await db.commit()
+                if versuche >= BATCH_MAX_FEHLVERSUCHE:
+                    fehlgeschlagen += 1
+                    logger.error(f"Rechnungslauf-Batch {schluessel[0]} ab Vertrags-ID {schluessel[1]} nach "
+                                 f"{versuche} Fehlversuchen übersprungen: {e}")
+                else:
+                    logger.warning(f"Rechnungslauf-Batch {schluessel[0]} ab Vertrags-ID {schluessel[1]} "
+                                   f"fehlgeschlagen (Versuch {versuche}): {e}")
+                continue
+            batches += 1
+            erstellt += neu
+    return {"batches": batches, "erstellt": erstellt, "fehlgeschlagen": fehlgeschlagen}
+
+
+async def rechnungslauf(heute: Optional[date] = None, worker: Optional[int] = None,
+                        batch_groesse: Optional[int] = None) -> dict:
+    """
+    Führt den nächtlichen Rechnungslauf für alle Verträge aus.
+
+    Die Verträge werden in Batches geplant, die anschließend von mehreren Workern mit jeweils eigener Verbindung
+    gleichzeitig abgerechnet werden. Offene Batches eines abgebrochenen früheren Laufs werden dabei fortgesetzt,
+    ihre Fehlversuche beginnen in jedem Lauf bei 0. Bricht ein Worker mit einem Fehler ab, werden die übrigen
+    abgebrochen und abgewartet, bevor der Fehler weitergereicht wird, damit keiner den Lauf überdauert.
+
+    Args:
+        heute (Optional[date]): Das Stichtagsdatum, standardmäßig das heutige Datum.
+        worker (Optional[int]): Anzahl paralleler Worker, standardmäßig BILLING_WORKERS.
+        batch_groesse (Optional[int]): Verträge pro Batch, standardmäßig BILLING_BATCH_SIZE.
+
+    Returns:
+        dict: Stichtag, Worker, geplante und abgeschlossene Batches, erstellte Rechnungen und Laufzeit in Sekunden.
+
+    Raises:
+        RuntimeError: Wenn Batches nach BATCH_MAX_FEHLVERSUCHE Fehlversuchen übersprungen wurden; die übrigen
+            Batches sind dann bereits abgerechnet.
+    """
+    heute = heute or date.today()
+    worker = max(1, worker or settings.BILLING_WORKERS)
+    start = time.perf_counter()
+    async with SessionLocal() as db:
+        geplant = await plane_batches(db, heute, batch_groesse or settings.BILLING_BATCH_SIZE)
+        await db.execute(update(models.RechnungslaufBatch)
+                         .where(models.RechnungslaufBatch.abgeschlossen_am.is_(None),
+                                models.RechnungslaufBatch.fehlversuche > 0)
+                         .values(fehlversuche=0)
+                         .execution_options(synchronize_session=False))
+        await db.commit()
+
+    aufgaben = [asyncio.create_task(rechne_batches_ab(heute)) for _ in range(worker)]
+    try:
+        ergebnisse = await asyncio.gather(*aufgaben)
+    except BaseException:
+        for aufgabe in aufgaben:
+            aufgabe.cancel()
+        await asyncio.gather(*aufgaben, return_exceptions=True)
+        raise
+
+    ergebnis = {
+        "stichtag": heute.isoformat(),
+        "worker": worker,
+        "geplant": geplant,
+        "batches": sum(e["batches"] for e in ergebnisse),
+        "erstellt": sum(e["erstellt"] for e in ergebnisse),
+        "dauer_s": round(time.perf_counter() - start, 3),
+    }
+    fehlgeschlagen = sum(e["fehlgeschlagen"] for e in ergebnisse)
+    if fehlgeschlagen:
+        raise RuntimeError(f"Rechnungslauf {ergebnis['stichtag']}: {fehlgeschlagen} Batches nach "
+                           f"{BATCH_MAX_FEHLVERSUCHE} Fehlversuchen übersprungen, {ergebnis['erstellt']} Rechnungen "
+                           f"in {ergebnis['batches']} Batches erstellt")
+    return ergebnis
+
+
+async def check_and_create_rechnung():
+    """
+    Erstellt einmal täglich alle fälligen Netzbetreiber-Rechnungen, auch nachgeholte für verpasste Jahrestage.
+
+    Diese Funktion ist für die Ausführung als Hintergrundaufgabe in der Anwendung vorgesehen. Die Rechnungen werden
+    in Batches über mehrere Verbindungen parallel erzeugt, siehe rechnungslauf.
+
+    Returns:
+        dict: Stichtag, Worker, Batches, Anzahl der erstellten Rechnungen und Laufzeit in Sekunden.
+    """
+    try:
+        ergebnis = await rechnungslauf()
+        logger.info(f"Rechnungslauf {ergebnis['stichtag']}: {ergebnis['erstellt']} Rechnungen in "
+                    f"{ergebnis['batches']} Batches ({ergebnis['geplant']} neu geplant oder wieder geöffnet) mit "
+                    f"{ergebnis['worker']} Workern in {ergebnis['dauer_s']} s erstellt.")
+        return ergebnis
+    except SQLAlchemyError as e:
+        logger.error(f"Datenbankfehler in check_and_create_rechnungen: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Unerwarteter Fehler in check_and_create_rechnungen: {e}")
+        raise
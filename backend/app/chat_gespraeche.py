@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app import models
+from app.database import engine
+
+
+def paar(user_id: int, other_user_id: int) -> Tuple[int, int]:
+    """
+    Gibt das Nutzerpaar eines Gesprächs in der Reihenfolge von chat_conversations zurück.
+
+    Args:
+        user_id (int): Die ID des einen Nutzers.
+        other_user_id (int): Die ID des anderen Nutzers.
+
+    Returns:
+        Tuple[int, int]: (user_a_id, user_b_id) mit user_a_id <= user_b_id.
+    """
+    return min(user_id, other_user_id), max(user_id, other_user_id)
+
+
+async def aktualisiere_gespraech(db: AsyncSession, nachricht: models.ChatMessage) -> None:
+    """
+    Trägt eine neue Nachricht in die Zusammenfassung ihres Gesprächs ein und erhöht den Zähler ungelesener
+    Nachrichten des Empfängers. Muss in derselben Transaktion wie das Speichern der Nachricht aufgerufen werden.
+
+    Gleichzeitige Nachrichten im selben Gespräch werden über die Zeilensperre des Upserts serialisiert; die letzte
+    Nachricht ist immer die mit der größten nachricht_id, auch wenn die Transaktionen in anderer Reihenfolge enden.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        nachricht (models.ChatMessage): Die bereits geflushte Nachricht mit nachricht_id und timestamp.
+    """
+    tabelle = models.ChatConversation
+    user_a_id, user_b_id = paar(nachricht.sender_id, nachricht.empfaenger_id)
+    # Nachrichten an sich selbst zählen nicht als ungelesen
+    an_partner = nachricht.sender_id != nachricht.empfaenger_id
+    stmt = insert(tabelle).values(
+        user_a_id=user_a_id,
+        user_b_id=user_b_id,
+        letzte_nachricht_id=nachricht.nachricht_id,
+        letzte_nachricht_am=nachricht.timestamp or datetime.now(),
+        ungelesen_a=int(an_partner and nachricht.empfaenger_id == user_a_id),
+        ungelesen_b=int(an_partner and nachricht.empfaenger_id == user_b_id),
+    )
+    ist_neuer = stmt.excluded.letzte_nachricht_id > tabelle.letzte_nachricht_id
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[tabelle.user_a_id, tabelle.user_b_id],
+        set_={"letzte_nachricht_id": case((ist_neuer, stmt.excluded.letzte_nachricht_id),
+                                          else_=tabelle.letzte_nachricht_id),
+              "letzte_nachricht_am": case((ist_neuer, stmt.excluded.letzte_nachricht_am),
+                                          else_=tabelle.letzte_nachricht_am),
+              "ungelesen_a": tabelle.ungelesen_a + stmt.excluded.ungelesen_a,
+              "ungelesen_b": tabelle.ungelesen_b + stmt.excluded.ungelesen_b}))
+
+
+async def als_gelesen_markieren(db: AsyncSession, user_id: int, other_user_id: int) -> bool:
+    """
+    Setzt den Zähler ungelesener Nachrichten eines Nutzers in einem Gespräch zurück und committet.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        user_id (int): Die ID des lesenden Nutzers.
+        other_user_id (int): Die ID des Gesprächspartners.
+
+    Returns:
+        bool: False, wenn es das Gespräch nicht gibt.
+    """
+    tabelle = models.ChatConversation
+    user_a_id, user_b_id = paar(user_id, other_user_id)
+    zaehler = "ungelesen_a" if user_id == user_a_id else "ungelesen_b"
+    result = await db.execute(update(tabelle)
+                              .where(tabelle.user_a_id == user_a_id, tabelle.user_b_id == user_b_id)
+                              .values({zaehler: 0})
+                              .execution_options(synchronize_session=False))
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def fuelle_aus_nachrichten(conn: AsyncConnection) -> int:
+    """
+    Legt für alle Gespräche aus chat_messages, die noch keine Zusammenfassung haben, eine an. Wird einmalig nach dem
+    Anlegen der Tabelle ausgeführt; die bestehenden Nachrichten gelten dabei als gelesen.
+
+    Args:
+        conn (AsyncConnection): Die Datenbankverbindung.
+
+    Returns:
+        int: Die Anzahl der angelegten Gespräche.
+    """
+    nachricht = models.ChatMessage
+    user_a_id = func.least(nachricht.sender_id, nachricht.empfaenger_id)
+    user_b_id = func.greatest(nachricht.sender_id, nachricht.empfaenger_id)
+    letzte = (
+        select(user_a_id.label("user_a_id"), user_b_id.label("user_b_id"),
+               func.max(nachricht.nachricht_id).label("nachricht_id"))
+        .where(nachricht.sender_id.isnot(None), nachricht.empfaenger_id.isnot(None))
+        .group_by(user_a_id, user_b_id)
+        .subquery()
+    )
+    quelle = (
+        select(letzte.c.user_a_id, letzte.c.user_b_id, nachricht.nachricht_id,
+               func.coalesce(nachricht.timestamp, func.now()), literal(0), literal(0))
+        .join(nachricht, nachricht.nachricht_id == letzte.c.nachricht_id)
+    )
+    tabelle = models.ChatConversation
+    result = await conn.execute(
+        insert(tabelle)
+        .from_select([tabelle.user_a_id, tabelle.user_b_id, tabelle.letzte_nachricht_id,
+                      tabelle.letzte_nachricht_am, tabelle.ungelesen_a, tabelle.ungelesen_b], quelle)
+        .on_conflict_do_nothing()
+    )
+    return result.rowcount
+
+
+async def _main():
+    async with engine.begin() as conn:
+        gespraeche = await fuelle_aus_nachrichten(conn)
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {gespraeche} Gespräche in "
+          f"{models.ChatConversation.__tablename__} angelegt")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
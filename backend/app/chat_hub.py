@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import json
+import logging
+from typing import Dict, Optional, Set
+
+import asyncpg
+from fastapi import WebSocket
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import database, models, schemas
+from app.config import settings
+
+logger = logging.getLogger("GreenEcoHub")
+
+KANAL = "chat_nachrichten"
+# NOTIFY-Payloads sind auf knapp 8000 Byte begrenzt, längere Nachrichten werden nur per ID angekündigt
+MAX_PAYLOAD_BYTES = 7900
+
+
+def nachricht_zu_dict(nachricht: models.ChatMessage) -> dict:
+    """
+    Wandelt eine Chatnachricht in das JSON-Format der WebSocket-Ereignisse um.
+
+    Args:
+        nachricht (models.ChatMessage): Die Nachricht.
+
+    Returns:
+        dict: Die Nachricht im Format von schemas.ChatMessageResponse.
+    """
+    return schemas.ChatMessageResponse.model_validate(nachricht, from_attributes=True).model_dump(mode="json")
+
+
+async def benachrichtige(db: AsyncSession, nachricht: models.ChatMessage) -> None:
+    """
+    Kündigt eine neue Nachricht per pg_notify an. Postgres stellt die Benachrichtigung erst beim Commit der
+    Transaktion zu und verwirft sie bei einem Rollback, sodass nur gespeicherte Nachrichten ausgeliefert werden.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung, in deren Transaktion die Nachricht gespeichert wird.
+        nachricht (models.ChatMessage): Die bereits geflushte Nachricht.
+    """
+    payload = json.dumps(nachricht_zu_dict(nachricht))
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        payload = json.dumps({"nachricht_id": nachricht.nachricht_id, "sender_id": nachricht.sender_id,
+                              "empfaenger_id": nachricht.empfaenger_id})
+    await db.execute(select(func.pg_notify(KANAL, payload)))
+
+
+class ChatHub:
+    """
+    Verteilt neue Chatnachrichten an die WebSocket-Verbindungen dieses Worker-Prozesses.
+
+    Jeder Prozess hört über eine eigene Verbindung per LISTEN auf den Kanal chat_nachrichten, sodass eine Nachricht,
+    die ein beliebiger Worker speichert, bei allen Empfängern ankommt, egal mit welchem Worker sie verbunden sind.
+    Nach einem Verbindungsabbruch wird die Verbindung neu aufgebaut und alle Clients erhalten ein resync-Ereignis,
+    damit sie verpasste Nachrichten über /users/chat/sync nachladen.
+    """
+
+    def __init__(self):
+        self.verbindungen: Dict[int, Set[WebSocket]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._verteilungen: Set[asyncio.Task] = set()
+        self._zugestellt = 0
+
+    def verbinden(self, user_id: int, websocket: WebSocket) -> None:
+        """
+        Registriert eine angenommene WebSocket-Verbindung für einen Nutzer.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+            websocket (WebSocket): Die Verbindung.
+        """
+        self.verbindungen.setdefault(user_id, set()).add(websocket)
+
+    def trennen(self, user_id: int, websocket: WebSocket) -> None:
+        """
+        Entfernt eine WebSocket-Verbindung.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+            websocket (WebSocket): Die Verbindung.
+        """
+        sockets = self.verbindungen.get(user_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.verbindungen[user_id]
+
+    def starten(self) -> None:
+        """
+        Startet das Lauschen auf neue Nachrichten in der laufenden Event-Loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._lauschen())
+
+    async def stoppen(self) -> None:
+        """
+        Beendet das Lauschen und schließt alle WebSocket-Verbindungen dieses Prozesses.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for sockets in list(self.verbindungen.values()):
+            for websocket in list(sockets):
+                with contextlib.suppress(Exception):
+                    await websocket.close(code=1001)
+        self.verbindungen.clear()
+
+    def statistik(self) -> dict:
+        """
+        Gibt die Anzahl der verbundenen Nutzer und Sockets sowie der zugestellten Ereignisse zurück.
+
+        Returns:
+            dict: Die Zähler dieses Prozesses.
+        """
+        return {"nutzer": len(self.verbindungen),
+                "verbindungen": sum(len(sockets) for sockets in self.verbindungen.values()),
+                "zugestellt": self._zugestellt}
+
+    async def _lauschen(self):
+        erste_verbindung = True
+        while True:
+            verbindung = None
+            try:
+                verbindung = await asyncpg.connect(database.SQL_URL)
+                getrennt = asyncio.Event()
+                verbindung.add_termination_listener(lambda _: getrennt.set())
+                await verbindung.add_listener(KANAL, self._bei_benachrichtigung)
+                if not erste_verbindung:
+                    # Während der Unterbrechung gesendete Nachrichten sind nicht angekommen
+                    await self._an_alle({"typ": "resync"})
+                erste_verbindung = False
+                await getrennt.wait()
+                logger.warning("LISTEN-Verbindung des Chat-Hubs wurde getrennt")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Fehler in der LISTEN-Verbindung des Chat-Hubs: {e}")
+            finally:
+                if verbindung is not None:
+                    with contextlib.suppress(Exception):
+                        await verbindung.close(timeout=2)
+            await asyncio.sleep(settings.CHAT_LISTEN_RECONNECT_SECONDS)
+
+    def _bei_benachrichtigung(self, verbindung, pid, kanal, payload):
+        task = asyncio.create_task(self._verteile(json.loads(payload)))
+        self._verteilungen.add(task)
+        task.add_done_callback(self._verteilungen.discard)
+
+    async def _verteile(self, daten: dict):
+        empfaenger = {daten["sender_id"], daten["empfaenger_id"]}
+        if not any(user_id in self.verbindungen for user_id in empfaenger):
+            return
+        if "nachricht_inhalt" not in daten:
+            daten = await self._lade_nachricht(daten["nachricht_id"])
+            if daten is None:
+                return
+        ereignis = {"typ": "nachricht", "nachricht": daten}
+        await asyncio.gather(*(self._sende(user_id, websocket, ereignis)
+                               for user_id in empfaenger
+                               for websocket in list(self.verbindungen.get(user_id, ()))))
+
+    async def _an_alle(self, ereignis: dict):
+        await asyncio.gather(*(self._sende(user_id, websocket, ereignis)
+                               for user_id, sockets in list(self.verbindungen.items())
+                               for websocket in list(sockets)))
+
+    @staticmethod
+    async def _lade_nachricht(nachricht_id: int) -> Optional[dict]:
+        async with database.SessionLocal() as db:
+            nachricht = await db.get(models.ChatMessage, nachricht_id)
+            return nachricht_zu_dict(nachricht) if nachricht is not None else None
+
+    async def _sende(self, user_id: int, websocket: WebSocket, ereignis: dict):
+        try:
+            await asyncio.wait_for(websocket.send_json(ereignis), timeout=settings.CHAT_WS_SEND_TIMEOUT)
+            self._zugestellt += 1
+        except Exception:
+            # Langsame oder getrennte Clients werden entfernt und laden nach dem Wiederverbinden per resync nach
+            self.trennen(user_id, websocket)
+            with contextlib.suppress(Exception):
+                await websocket.close(code=1011)
+
+
+hub = ChatHub()
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -23,6 +25,53 @@ class Settings(BaseSettings):
         SMTP_PORT (int): Der SMTP-Port für den E-Mail-Versand.
         USERNAME (str): Der Benutzername für den SMTP-Server.
         PASSWORD (str): Das Passwort für den SMTP-Server.
+        JWT_CLAIMS (bool): True, wenn Rolle und Ausstellungszeit in den JWT geschrieben werden, sodass
+            get_current_claims ohne Datenbankabfrage autorisieren kann.
+        JWT_CLAIMS_TTL_MINUTES (int): Wie lange den Claims eines Tokens ohne erneute Prüfung vertraut wird.
+        DB_POOL_SIZE (int): Anzahl dauerhaft offener Datenbankverbindungen pro Worker-Prozess.
+        DB_MAX_OVERFLOW (int): Anzahl zusätzlicher Verbindungen, die bei Last geöffnet werden dürfen.
+        DB_POOL_TIMEOUT (float): Wartezeit in Sekunden auf eine freie Verbindung, danach wird ein Fehler ausgelöst.
+        DB_POOL_RECYCLE (int): Alter in Sekunden, nach dem eine Verbindung neu aufgebaut wird (-1 für nie).
+        DB_POOL_PRE_PING (bool): True, wenn Verbindungen vor der Ausgabe aus dem Pool geprüft werden.
+        DB_STATEMENT_CACHE_SIZE (int): Größe des Caches für Prepared Statements pro Verbindung (0 deaktiviert ihn).
+        DB_ECHO (bool): True, wenn alle SQL-Anweisungen geloggt werden sollen.
+        POSTGRES_REPLICA_HOST (str): Hostname einer lesenden Replica; ohne Angabe lesen alle Endpunkte vom Primary.
+        POSTGRES_REPLICA_PORT (int): Portnummer der Replica, standardmäßig POSTGRES_PORT.
+        DB_REPLICA_MAX_LAG_SECONDS (float): Maximal tolerierter Replikationsrückstand in Sekunden, darüber wird
+            vom Primary gelesen.
+        DB_REPLICA_CHECK_SECONDS (float): Abstand in Sekunden, in dem Erreichbarkeit und Rückstand der Replica
+            erneut geprüft werden.
+        DB_REPLICA_CONNECT_TIMEOUT (float): Wartezeit in Sekunden auf den Verbindungsaufbau zur Replica.
+        BILLING_WORKERS (int): Anzahl der Batches des Rechnungslaufs, die gleichzeitig auf eigenen Verbindungen
+            abgerechnet werden.
+        BILLING_BATCH_SIZE (int): Anzahl der Verträge pro Batch des Rechnungslaufs.
+        GEOCODER_URL (str): Such-Endpunkt eines Nominatim-kompatiblen Geocoding-Dienstes.
+        GEOCODER_USER_AGENT (str): User-Agent, mit dem sich die Anwendung beim Geocoding-Dienst ausweist.
+        GEOCODER_RATE (float): Maximale Anzahl an Geocoding-Anfragen pro Sekunde.
+        GEOCODER_BURST (int): Anzahl an Anfragen, die nach einer Pause ohne Wartezeit gesendet werden dürfen.
+        GEOCODER_TIMEOUT (float): Zeitlimit einer Geocoding-Anfrage in Sekunden.
+        GEOCODER_BATCH_SIZE (int): Anzahl der Adressen, die pro Commit geokodiert werden.
+        GEOCODE_CACHE_TTL_DAYS (int): Gültigkeit gefundener Koordinaten im Geocode-Cache in Tagen.
+        GEOCODE_CACHE_NEGATIVE_TTL_HOURS (int): Wie lange eine nicht gefundene Adresse nicht erneut beim
+            Geocoding-Dienst angefragt wird, in Stunden.
+        SMTP_USE_SSL (bool): True für eine implizite TLS-Verbindung (z. B. Port 465), sonst wird STARTTLS genutzt,
+            sofern der Server es anbietet.
+        SMTP_POOL_SIZE (int): Anzahl wiederverwendeter, angemeldeter SMTP-Verbindungen pro Worker-Prozess.
+        SMTP_BATCH_SIZE (int): Anzahl der E-Mails, die pro Durchlauf aus dem Postausgang versendet werden.
+        SMTP_MAX_RETRIES (int): Anzahl der Versuche, nach denen eine E-Mail als fehlgeschlagen gilt.
+        SMTP_RETRY_BASE_SECONDS (float): Wartezeit vor dem ersten erneuten Versuch, sie verdoppelt sich mit jedem
+            weiteren Versuch.
+        SMTP_POLL_SECONDS (float): Abstand in Sekunden, in dem der Postausgang auf neue E-Mails geprüft wird.
+        SMTP_IDLE_SECONDS (float): Ungenutzte SMTP-Verbindungen werden nach dieser Zeit in Sekunden neu aufgebaut.
+        SMTP_CLAIM_SECONDS (float): Wie lange ein Prozess reservierte E-Mails versenden darf, bevor sie ein anderer
+            Prozess erneut versendet. Muss länger sein als das Senden eines Batches dauern kann.
+        USERS_COUNT_CACHE_SECONDS (float): Wie lange die Gesamtzahl der Nutzer je Filterkombination zwischengespeichert
+            wird.
+        CHAT_WS_SEND_TIMEOUT (float): Maximale Zeit in Sekunden für das Senden eines Ereignisses an einen
+            WebSocket-Client, danach wird die Verbindung geschlossen.
+        CHAT_LISTEN_RECONNECT_SECONDS (float): Wartezeit vor dem erneuten Aufbau der LISTEN-Verbindung des Chat-Hubs.
+        CHAT_WS_AUTH_CHECK_SECONDS (float): Abstand in Sekunden, in dem der Token einer Chat-WebSocket-Verbindung
+            erneut gegen Sperrliste und Nutzer geprüft wird.
 
     Example:
         settings = Settings()
@@ -44,6 +93,42 @@ class Settings(BaseSettings):
     SMTP_PORT: int
     USERNAME: str
     PASSWORD: str
+    JWT_CLAIMS: bool = True
+    JWT_CLAIMS_TTL_MINUTES: int = 5
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+    POSTGRES_REPLICA_HOST: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30
+    DB_REPLICA_CHECK_SECONDS: float = 5
+    DB_REPLICA_CONNECT_TIMEOUT: float = 3
+    BILLING_WORKERS: int = 4
+    BILLING_BATCH_SIZE: int = 5000
+    GEOCODER_URL: str = "https://nominatim.openstreetmap.org/search"
+    GEOCODER_USER_AGENT: str = "ToseBackend"
+    GEOCODER_RATE: float = 1
+    GEOCODER_BURST: int = 1
+    GEOCODER_TIMEOUT: float = 10
+    GEOCODER_BATCH_SIZE: int = 50
+    GEOCODE_CACHE_TTL_DAYS: int = 180
+    GEOCODE_CACHE_NEGATIVE_TTL_HOURS: int = 24
+    SMTP_USE_SSL: bool = False
+    SMTP_POOL_SIZE: int = 2
+    SMTP_BATCH_SIZE: int = 20
+    SMTP_MAX_RETRIES: int = 5
+    SMTP_RETRY_BASE_SECONDS: float = 30
+    SMTP_POLL_SECONDS: float = 5
+    SMTP_IDLE_SECONDS: float = 60
+    SMTP_CLAIM_SECONDS: float = 900
+    USERS_COUNT_CACHE_SECONDS: float = 60
+    CHAT_WS_SEND_TIMEOUT: float = 5
+    CHAT_LISTEN_RECONNECT_SECONDS: float = 5
+    CHAT_WS_AUTH_CHECK_SECONDS: float = 30
 
 
 settings = Settings()
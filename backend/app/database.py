@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import time
+
+from sqlalchemy import create_engine, exc, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app import config
 
@@ -12,16 +17,188 @@ SQL_URL = (f"postgresql://{config.settings.POSTGRES_USER}:{config.settings.POSTG
            f"{config.settings.POSTGRES_HOST}:{config.settings.POSTGRES_PORT}/{config.settings.POSTGRES_DB}")
 non_async = False
 
+logger = logging.getLogger("GreenEcoHub")
+
+# Rückstand der Replica in Sekunden; 0, wenn sie alles empfangene WAL bereits angewendet hat (sonst würde ein
+# ruhender Primary als Rückstand erscheinen) oder wenn der Server gar keine Replica ist
+REPLICA_RUECKSTAND_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class MessenderQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection-Pool, der zusätzlich die Wartezeiten auf eine Verbindung und die Timeouts zählt.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wartezeit_summe = 0.0
+        self.wartezeit_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            verbindung = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        wartezeit = time.perf_counter() - start
+        self.checkouts += 1
+        self.wartezeit_summe += wartezeit
+        self.wartezeit_max = max(self.wartezeit_max, wartezeit)
+        return verbindung
+
+    def statistik(self) -> dict:
+        """
+        Gibt den aktuellen Zustand und die Kennzahlen des Pools zurück.
+
+        Returns:
+            dict: Größe, ausgegebene und freie Verbindungen, Overflow, Checkouts, Wartezeiten und Timeouts.
+        """
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "wartezeit_ms_durchschnitt": (round(self.wartezeit_summe / self.checkouts * 1000, 3)
+                                          if self.checkouts else 0.0),
+            "wartezeit_ms_max": round(self.wartezeit_max * 1000, 3),
+            "timeouts": self.timeouts,
+            "pool_timeout_s": self._timeout,
+        }
+
 if non_async:
     engine = create_engine(SQL_URL)
     Base = declarative_base()
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
 else:
-   engine = create_async_engine(SQL_URL_async, echo=True)
+   engine = create_async_engine(SQL_URL_async,
+                                echo=config.settings.DB_ECHO,
+                                poolclass=MessenderQueuePool,
+                                pool_size=config.settings.DB_POOL_SIZE,
+                                max_overflow=config.settings.DB_MAX_OVERFLOW,
+                                pool_timeout=config.settings.DB_POOL_TIMEOUT,
+                                pool_recycle=config.settings.DB_POOL_RECYCLE,
+                                pool_pre_ping=config.settings.DB_POOL_PRE_PING,
+                                connect_args={"prepared_statement_cache_size": config.settings.DB_STATEMENT_CACHE_SIZE})
    Base = declarative_base()
    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine,
                                expire_on_commit=False, class_=AsyncSession)
 
+engine_readonly = None
+SessionLocalReadonly = None
+if not non_async and config.settings.POSTGRES_REPLICA_HOST:
+    SQL_URL_async_readonly = (f"postgresql+asyncpg://{config.settings.POSTGRES_USER}:"
+                              f"{config.settings.POSTGRES_PASSWORD}@{config.settings.POSTGRES_REPLICA_HOST}:"
+                              f"{config.settings.POSTGRES_REPLICA_PORT or config.settings.POSTGRES_PORT}/"
+                              f"{config.settings.POSTGRES_DB}")
+    engine_readonly = create_async_engine(SQL_URL_async_readonly,
+                                          echo=config.settings.DB_ECHO,
+                                          poolclass=MessenderQueuePool,
+                                          pool_size=config.settings.DB_POOL_SIZE,
+                                          max_overflow=config.settings.DB_MAX_OVERFLOW,
+                                          pool_timeout=config.settings.DB_POOL_TIMEOUT,
+                                          pool_recycle=config.settings.DB_POOL_RECYCLE,
+                                          pool_pre_ping=config.settings.DB_POOL_PRE_PING,
+                                          connect_args={
+                                              "prepared_statement_cache_size":
+                                                  config.settings.DB_STATEMENT_CACHE_SIZE,
+                                              "timeout": config.settings.DB_REPLICA_CONNECT_TIMEOUT,
+                                          })
+    SessionLocalReadonly = sessionmaker(autocommit=False, autoflush=False, bind=engine_readonly,
+                                        expire_on_commit=False, class_=AsyncSession)
+
+
+class ReplicaStatus:
+    """
+    Merkt sich, ob die Replica erreichbar und aktuell genug ist, und prüft dies höchstens alle
+    DB_REPLICA_CHECK_SECONDS erneut, damit nicht jede Anfrage eine zusätzliche Abfrage auslöst.
+    """
+
+    def __init__(self):
+        self.verfuegbar = False
+        self.rueckstand_s = None
+        self.fehler = None
+        self.geprueft_am = None
+        self.umleitungen_primary = 0
+        self._lock = asyncio.Lock()
+
+    async def pruefen(self) -> bool:
+        """
+        Gibt zurück, ob lesende Anfragen an die Replica gehen dürfen.
+
+        Returns:
+            bool: True, wenn die Replica erreichbar ist und ihr Rückstand innerhalb der Toleranz liegt.
+        """
+        if engine_readonly is None:
+            return False
+        if self._aktuell():
+            return self.verfuegbar
+        async with self._lock:
+            if not self._aktuell():
+                await self._aktualisiere()
+        return self.verfuegbar
+
+    def _aktuell(self) -> bool:
+        return (self.geprueft_am is not None
+                and time.monotonic() - self.geprueft_am < config.settings.DB_REPLICA_CHECK_SECONDS)
+
+    @staticmethod
+    async def _lies_rueckstand():
+        async with engine_readonly.connect() as verbindung:
+            return (await verbindung.execute(REPLICA_RUECKSTAND_SQL)).scalar()
+
+    async def _aktualisiere(self):
+        war_verfuegbar = self.verfuegbar
+        try:
+            rueckstand = await asyncio.wait_for(self._lies_rueckstand(),
+                                                timeout=config.settings.DB_REPLICA_CONNECT_TIMEOUT * 2)
+            self.rueckstand_s = float(rueckstand or 0)
+            self.fehler = None
+            self.verfuegbar = self.rueckstand_s <= config.settings.DB_REPLICA_MAX_LAG_SECONDS
+            if not self.verfuegbar:
+                self.fehler = (f"Rückstand {self.rueckstand_s:.1f} s über der Toleranz von "
+                               f"{config.settings.DB_REPLICA_MAX_LAG_SECONDS} s")
+        except Exception as e:
+            self.rueckstand_s = None
+            self.fehler = str(e) or type(e).__name__
+            self.verfuegbar = False
+        self.geprueft_am = time.monotonic()
+        if war_verfuegbar != self.verfuegbar:
+            if self.verfuegbar:
+                logger.info({"message": "Lesende Anfragen werden wieder an die Replica geleitet"})
+            else:
+                logger.warning({"message": f"Replica nicht nutzbar, lese vom Primary: {self.fehler}"})
+
+    def statistik(self) -> dict:
+        """
+        Gibt den zuletzt geprüften Zustand der Replica zurück.
+
+        Returns:
+            dict: Konfiguration, Verfügbarkeit, Rückstand, letzter Fehler und Anzahl der Umleitungen auf den Primary.
+        """
+        return {
+            "konfiguriert": engine_readonly is not None,
+            "verfuegbar": self.verfuegbar,
+            "rueckstand_s": self.rueckstand_s,
+            "max_rueckstand_s": config.settings.DB_REPLICA_MAX_LAG_SECONDS,
+            "fehler": self.fehler,
+            "umleitungen_primary": self.umleitungen_primary,
+            "pool": engine_readonly.pool.statistik() if engine_readonly is not None else None,
+        }
+
+
+replica_status = ReplicaStatus()
+
 
 def get_db():
     """
@@ -48,4 +225,27 @@ async def get_db_async():
     try:
         yield db
     finally:
-        await db.close()
\ No newline at end of file
+        await db.close()
+
+
+async def get_db_async_readonly():
+    """
+    Funktion zur Bereitstellung einer Datenbankverbindung für rein lesende Endpunkte wie Berichte und Dashboards.
+
+    Ist eine Replica konfiguriert, erreichbar und liegt ihr Rückstand innerhalb von DB_REPLICA_MAX_LAG_SECONDS,
+    wird die Sitzung an die Replica gebunden, andernfalls an den Primary. Endpunkte, die diese Abhängigkeit nutzen,
+    dürfen daher nicht schreiben.
+
+    Returns:
+        AsyncSession: Eine SQLAlchemy-Async-Sitzung auf der Replica oder, als Rückfall, auf dem Primary.
+    """
+    if await replica_status.pruefen():
+        db = SessionLocalReadonly()
+    else:
+        if engine_readonly is not None:
+            replica_status.umleitungen_primary += 1
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
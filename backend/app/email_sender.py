@@ -1,5 +1,17 @@
-import smtplib
+import asyncio
+import contextlib
+import time
+from datetime import datetime, timedelta
 from email.message import EmailMessage
+from typing import List, Optional
+
+import aiosmtplib
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
 from app.logger import LogConfig
 import logging
 from logging.config import dictConfig
@@ -7,56 +19,366 @@ from logging.config import dictConfig
 dictConfig(LogConfig().dict())
 logger = logging.getLogger("GreenEcoHub")
 
+OFFEN = "offen"
+SENDET = "sendet"
+GESENDET = "gesendet"
+FEHLGESCHLAGEN = "fehlgeschlagen"
+MAX_WARTEZEIT = timedelta(hours=6)
+_AUSSTEHEND = object()
+
+
+class SmtpPool:
+    """
+    Ein kleiner Pool angemeldeter SMTP-Verbindungen, die über mehrere E-Mails hinweg wiederverwendet werden.
+
+    Args:
+        smtp_server (str): Der SMTP-Server.
+        smtp_port (int): Der Port des SMTP-Servers.
+        username (str): Der Benutzername für die SMTP-Authentifizierung, leer für Server ohne Anmeldung.
+        password (str): Das Passwort für die SMTP-Authentifizierung.
+        use_ssl (bool): True für implizites TLS, sonst STARTTLS, sofern der Server es anbietet.
+        groesse (int): Maximale Anzahl gleichzeitig genutzter Verbindungen.
+    """
+
+    def __init__(self, smtp_server, smtp_port, username, password, use_ssl=False, groesse=2):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.groesse = max(1, groesse)
+        self._frei = []
+        self._semaphore = asyncio.Semaphore(self.groesse)
+
+    async def _verbinde(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port, use_tls=self.use_ssl, timeout=30)
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        return smtp
+
+    @staticmethod
+    async def _schliesse(smtp: aiosmtplib.SMTP):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @contextlib.asynccontextmanager
+    async def verbindung(self):
+        """
+        Stellt eine angemeldete Verbindung bereit und gibt sie danach an den Pool zurück.
+
+        Verbindungen, die länger als SMTP_IDLE_SECONDS ungenutzt waren oder vom Server getrennt wurden, werden neu
+        aufgebaut. Tritt während der Nutzung ein Fehler auf, wird die Verbindung verworfen.
+
+        Returns:
+            aiosmtplib.SMTP: Die Verbindung.
+        """
+        async with self._semaphore:
+            smtp = None
+            while self._frei and smtp is None:
+                kandidat, zuletzt_genutzt = self._frei.pop()
+                if kandidat.is_connected and time.monotonic() - zuletzt_genutzt < settings.SMTP_IDLE_SECONDS:
+                    smtp = kandidat
+                else:
+                    await self._schliesse(kandidat)
+            if smtp is None:
+                smtp = await self._verbinde()
+            try:
+                yield smtp
+            except BaseException:
+                await self._schliesse(smtp)
+                raise
+            self._frei.append((smtp, time.monotonic()))
+
+    async def schliessen(self):
+        """
+        Meldet alle ungenutzten Verbindungen ab.
+        """
+        while self._frei:
+            smtp, _ = self._frei.pop()
+            await self._schliesse(smtp)
+
 
 class EmailSender:
     """
     Eine Klasse zur Verwendung für das Senden von E-Mails über SMTP.
 
+    Die Verbindungen werden in einem SmtpPool gehalten, sodass nicht für jede E-Mail eine neue TCP/TLS-Verbindung
+    aufgebaut und angemeldet werden muss. Endpunkte senden nicht direkt, sondern legen E-Mails mit email_einreihen
+    im Postausgang ab; der OutboxWorker versendet sie im Hintergrund.
+
     Args:
         smtp_server (str): Der SMTP-Server, über den die E-Mail gesendet werden soll.
         smtp_port (int): Der Port für die SMTP-Verbindung.
         username (str): Der Benutzername für die SMTP-Authentifizierung.
         password (str): Das Passwort für die SMTP-Authentifizierung.
-        use_ssl (bool, optional): True, wenn SSL verwendet werden soll, False (Standard) für unverschlüsselte Verbindung.
+        use_ssl (bool, optional): True, wenn SSL verwendet werden soll, False (Standard) für STARTTLS, sofern der
+            Server es anbietet.
+        pool_groesse (int, optional): Anzahl wiederverwendeter SMTP-Verbindungen.
 
     Methods:
         send_email(empfaenger_email, subject, body):
-            Sendet eine E-Mail an die angegebene E-Mail-Adresse.
+            Sendet eine E-Mail sofort an die angegebene E-Mail-Adresse.
+        sende_batch(nachrichten):
+            Sendet mehrere E-Mails, verteilt auf die Verbindungen des Pools.
 
     Raises:
-        smtplib.SMTPException: Wenn ein SMTP-Fehler auftritt.
-        Exception: Wenn ein allgemeiner Fehler beim Senden der E-Mail auftritt.
+        aiosmtplib.SMTPException: Wenn ein SMTP-Fehler auftritt.
 
     Example:
         email_sender = EmailSender("smtp.example.com", 587, "me@example.com", "mypassword")
         await email_sender.send_email("recipient@example.com", "Betreff der E-Mail", "Inhalt der E-Mail")
     """
-    def __init__(self, smtp_server, smtp_port, username, password, use_ssl=False):
+    def __init__(self, smtp_server, smtp_port, username, password, use_ssl=False, pool_groesse=2):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.username = username
         self.password = password
         self.use_ssl = use_ssl
+        self.pool = SmtpPool(smtp_server, smtp_port, username, password, use_ssl, pool_groesse)
 
-    async def send_email(self, empfaenger_email, subject, body):
+    def nachricht(self, empfaenger_email, subject, body) -> EmailMessage:
         msg = EmailMessage()
         msg.set_content(body)
         msg["Subject"] = subject
         msg["From"] = self.username
         msg["To"] = empfaenger_email
+        return msg
 
+    async def send_email(self, empfaenger_email, subject, body):
         try:
-            if self.use_ssl:
-                server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port)
-            else:
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-
-            server.login(self.username, self.password)
-            server.send_message(msg)
-            server.quit()
-        except smtplib.SMTPException as smtp_error:
+            async with self.pool.verbindung() as smtp:
+                await smtp.send_message(self.nachricht(empfaenger_email, subject, body))
+        except aiosmtplib.SMTPException as smtp_error:
             logger.error(f"SMTP-Fehler aufgetreten: {smtp_error}")
             raise smtp_error
+
+    async def sende_batch(self, nachrichten: List[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Sendet mehrere E-Mails über die Verbindungen des Pools, jede Verbindung überträgt ihren Anteil nacheinander
+        in derselben SMTP-Sitzung.
+
+        Args:
+            nachrichten (List[EmailMessage]): Die zu sendenden E-Mails.
+
+        Returns:
+            List[Optional[Exception]]: Je E-Mail None bei Erfolg, sonst der aufgetretene Fehler.
+        """
+        ergebnisse = [_AUSSTEHEND] * len(nachrichten)
+        anteile = [range(start, len(nachrichten), self.pool.groesse)
+                   for start in range(min(self.pool.groesse, len(nachrichten)))]
+        await asyncio.gather(*(self._sende_anteil(nachrichten, anteil, ergebnisse) for anteil in anteile))
+        return ergebnisse
+
+    async def _sende_anteil(self, nachrichten: List[EmailMessage], anteil: range, ergebnisse: list):
+        try:
+            async with self.pool.verbindung() as smtp:
+                for i in anteil:
+                    try:
+                        await smtp.send_message(nachrichten[i])
+                        ergebnisse[i] = None
+                    except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPResponseException) as e:
+                        # Der Server lehnt nur diese E-Mail ab, die Sitzung bleibt nutzbar
+                        ergebnisse[i] = e
         except Exception as e:
-            logger.error(f"Beim Senden einer E-Mail ist ein Fehler aufgetreten: {e}")
-            raise e
+            for i in anteil:
+                if ergebnisse[i] is _AUSSTEHEND:
+                    ergebnisse[i] = e
+
+
+def ist_dauerhaft(fehler: Exception) -> bool:
+    """
+    Prüft, ob ein SMTP-Fehler dauerhaft ist (5xx), sodass ein erneuter Versuch zwecklos wäre.
+
+    Args:
+        fehler (Exception): Der beim Senden aufgetretene Fehler.
+
+    Returns:
+        bool: True bei einem dauerhaften Fehler.
+    """
+    if isinstance(fehler, aiosmtplib.SMTPRecipientsRefused):
+        return all(ablehnung.code >= 500 for ablehnung in fehler.recipients)
+    if isinstance(fehler, aiosmtplib.SMTPResponseException):
+        return fehler.code >= 500
+    return False
+
+
+def naechster_versuch(versuche: int) -> datetime:
+    """
+    Berechnet den Zeitpunkt des nächsten Versuchs mit exponentiellem Backoff.
+
+    Args:
+        versuche (int): Die Anzahl der bisherigen Versuche.
+
+    Returns:
+        datetime: Der Zeitpunkt, ab dem die E-Mail erneut gesendet wird.
+    """
+    wartezeit = timedelta(seconds=settings.SMTP_RETRY_BASE_SECONDS * 2 ** (versuche - 1))
+    return datetime.now() + min(wartezeit, MAX_WARTEZEIT)
+
+
+async def reserviere_faellige(batch_groesse: int) -> List[models.EmailOutbox]:
+    """
+    Reserviert einen Batch fälliger E-Mails in einer kurzen Transaktion für den Versand durch diesen Prozess.
+
+    Die Zeilen werden mit SELECT ... FOR UPDATE SKIP LOCKED gewählt, auf den Status "sendet" gesetzt und erhalten
+    in naechster_versuch_am das Ende der Reservierung (SMTP_CLAIM_SECONDS). Bricht ein Prozess während des Versands
+    ab, werden seine E-Mails nach Ablauf der Reservierung erneut versendet. Der Versuch wird bereits hier gezählt,
+    damit auch solche Abbrüche auf SMTP_MAX_RETRIES angerechnet werden.
+
+    Args:
+        batch_groesse (int): Die maximale Anzahl der E-Mails.
+
+    Returns:
+        List[models.EmailOutbox]: Die reservierten, von der Sitzung gelösten E-Mails.
+    """
+    jetzt = datetime.now()
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(models.EmailOutbox)
+            .where(or_(models.EmailOutbox.status == OFFEN, models.EmailOutbox.status == SENDET),
+                   models.EmailOutbox.naechster_versuch_am <= jetzt)
+            .order_by(models.EmailOutbox.naechster_versuch_am, models.EmailOutbox.email_id)
+            .limit(batch_groesse)
+            .with_for_update(skip_locked=True)
+        )
+        mails = result.scalars().all()
+        reserviert_bis = jetzt + timedelta(seconds=settings.SMTP_CLAIM_SECONDS)
+        for mail in mails:
+            mail.status = SENDET
+            mail.versuche += 1
+            mail.naechster_versuch_am = reserviert_bis
+        await db.commit()
+        return mails
+
+
+async def versende_ausstehende(sender: EmailSender, batch_groesse: int = None) -> int:
+    """
+    Versendet einen Batch fälliger E-Mails aus dem Postausgang.
+
+    Die E-Mails werden zuerst in einer eigenen Transaktion reserviert (siehe reserviere_faellige), sodass mehrere
+    Worker-Prozesse parallel senden können, ohne eine E-Mail doppelt zu verschicken. Während der Verbindung zum
+    SMTP-Server ist keine Transaktion offen, die Ergebnisse werden danach in einer zweiten kurzen Transaktion
+    gespeichert. Fehlgeschlagene E-Mails werden mit exponentiellem Backoff erneut versucht, bis SMTP_MAX_RETRIES
+    erreicht ist oder der Server sie dauerhaft ablehnt.
+
+    Args:
+        sender (EmailSender): Der Sender mit dem SMTP-Pool.
+        batch_groesse (int): Anzahl der E-Mails pro Batch, standardmäßig SMTP_BATCH_SIZE.
+
+    Returns:
+        int: Die Anzahl der bearbeiteten E-Mails, gesendet oder nicht.
+    """
+    mails = await reserviere_faellige(batch_groesse or settings.SMTP_BATCH_SIZE)
+    if not mails:
+        return 0
+
+    ergebnisse = await sender.sende_batch([sender.nachricht(mail.empfaenger, mail.betreff, mail.inhalt)
+                                           for mail in mails])
+    async with SessionLocal() as db:
+        for mail, fehler in zip(mails, ergebnisse):
+            if fehler is None:
+                werte = {"status": GESENDET, "gesendet_am": datetime.now(), "letzter_fehler": None}
+            elif ist_dauerhaft(fehler) or mail.versuche >= settings.SMTP_MAX_RETRIES:
+                werte = {"status": FEHLGESCHLAGEN, "letzter_fehler": f"{type(fehler).__name__}: {fehler}"[:1000]}
+                logger.error(f"E-Mail {mail.email_id} nach {mail.versuche} Versuchen nicht zugestellt: {fehler}")
+            else:
+                werte = {"status": OFFEN, "naechster_versuch_am": naechster_versuch(mail.versuche),
+                         "letzter_fehler": f"{type(fehler).__name__}: {fehler}"[:1000]}
+                logger.warning(f"E-Mail {mail.email_id} nicht gesendet, neuer Versuch ab "
+                               f"{werte['naechster_versuch_am']:%H:%M:%S}: {fehler}")
+            # Nur schreiben, solange die Reservierung nicht abgelaufen und von einem anderen Prozess übernommen ist
+            await db.execute(update(models.EmailOutbox)
+                             .where(models.EmailOutbox.email_id == mail.email_id,
+                                    models.EmailOutbox.status == SENDET,
+                                    models.EmailOutbox.versuche == mail.versuche)
+                             .values(**werte)
+                             .execution_options(synchronize_session=False))
+        await db.commit()
+    return len(mails)
+
+
+class OutboxWorker:
+    """
+    Hintergrundaufgabe, die den Postausgang leert, sobald eine E-Mail eingereiht wurde, und ihn zusätzlich alle
+    SMTP_POLL_SECONDS auf fällige Wiederholungen und E-Mails anderer Worker-Prozesse prüft.
+
+    Args:
+        sender (EmailSender): Der Sender mit dem SMTP-Pool.
+    """
+
+    def __init__(self, sender: EmailSender):
+        self.sender = sender
+        self._neue_mail = asyncio.Event()
+        self._task = None
+
+    def benachrichtigen(self):
+        """
+        Weckt den Worker auf, nachdem eine E-Mail eingereiht wurde.
+        """
+        self._neue_mail.set()
+
+    def starten(self):
+        """
+        Startet die Hintergrundaufgabe in der laufenden Event-Loop.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._lauf())
+
+    async def stoppen(self):
+        """
+        Beendet die Hintergrundaufgabe und meldet die SMTP-Verbindungen ab.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.sender.pool.schliessen()
+
+    async def _lauf(self):
+        batch_groesse = settings.SMTP_BATCH_SIZE
+        while True:
+            try:
+                while await versende_ausstehende(self.sender, batch_groesse) == batch_groesse:
+                    pass
+            except Exception as e:
+                logger.error(f"Fehler beim Versenden des Postausgangs: {e}")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._neue_mail.wait(), timeout=settings.SMTP_POLL_SECONDS)
+            self._neue_mail.clear()
+
+
+email_sender = EmailSender(
+    smtp_server=settings.SMTP_SERVER,
+    smtp_port=settings.SMTP_PORT,
+    username=settings.USERNAME,
+    password=settings.PASSWORD,
+    use_ssl=settings.SMTP_USE_SSL,
+    pool_groesse=settings.SMTP_POOL_SIZE,
+)
+outbox_worker = OutboxWorker(email_sender)
+
+
+async def email_einreihen(db: AsyncSession, empfaenger_email: str, subject: str, body: str) -> models.EmailOutbox:
+    """
+    Legt eine E-Mail im Postausgang ab und committet sie; versendet wird sie im Hintergrund vom OutboxWorker.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        empfaenger_email (str): Die E-Mail-Adresse des Empfängers.
+        subject (str): Der Betreff.
+        body (str): Der Inhalt.
+
+    Returns:
+        models.EmailOutbox: Der Eintrag im Postausgang.
+    """
+    jetzt = datetime.now()
+    mail = models.EmailOutbox(empfaenger=empfaenger_email, betreff=subject, inhalt=body, status=OFFEN, versuche=0,
+                              naechster_versuch_am=jetzt, erstellt_am=jetzt)
+    db.add(mail)
+    await db.commit()
+    outbox_worker.benachrichtigen()
+    return mail
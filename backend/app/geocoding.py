@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger("GreenEcoHub")
+
+STANDARD_LAND = "Germany"
+LAND_ALIASE = {"": "de", "de": "de", "deutschland": "de", "germany": "de"}
+STRASSEN_SUFFIXE = re.compile(r"(strasse|str)\b\.?")
+
+
+class TokenBucket:
+    """
+    Ratenbegrenzung nach dem Token-Bucket-Verfahren: pro Sekunde kommen `rate` Tokens hinzu, höchstens `kapazitaet`
+    können sich ansammeln. Jede Anfrage verbraucht ein Token und wartet, bis eines verfügbar ist.
+
+    Args:
+        rate (float): Anzahl der Tokens pro Sekunde.
+        kapazitaet (int): Maximale Anzahl angesammelter Tokens, also die erlaubte Burst-Größe.
+    """
+
+    def __init__(self, rate: float, kapazitaet: int):
+        self.rate = rate
+        self.kapazitaet = max(1, kapazitaet)
+        self.tokens = float(self.kapazitaet)
+        self.zuletzt = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _auffuellen(self):
+        jetzt = time.monotonic()
+        self.tokens = min(self.kapazitaet, self.tokens + (jetzt - self.zuletzt) * self.rate)
+        self.zuletzt = jetzt
+
+    async def erwerbe(self):
+        """
+        Wartet, bis ein Token verfügbar ist, und verbraucht es.
+        """
+        async with self._lock:
+            self._auffuellen()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._auffuellen()
+            self.tokens -= 1
+
+
+class Geocoder:
+    """
+    Asynchroner Client für einen Nominatim-kompatiblen Geocoding-Dienst mit Ratenbegrenzung.
+
+    Die Adresse des Dienstes ist über GEOCODER_URL konfigurierbar, etwa um lokal gegen test/geocoder_stub.py
+    zu laufen.
+    """
+
+    def __init__(self, url: str = None, rate: float = None, burst: int = None):
+        self.url = url or settings.GEOCODER_URL
+        self.bucket = TokenBucket(rate or settings.GEOCODER_RATE, burst or settings.GEOCODER_BURST)
+        self._client = None
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=settings.GEOCODER_TIMEOUT,
+                                             headers={"User-Agent": settings.GEOCODER_USER_AGENT})
+        return self._client
+
+    async def schliessen(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def geocode(self, strasse: str, hausnummer, plz, stadt: str,
+                      land: Optional[str] = None) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Ermittelt Breiten- und Längengrad einer Adresse.
+
+        Args:
+            strasse (str): Die Straße.
+            hausnummer: Die Hausnummer.
+            plz: Die Postleitzahl.
+            stadt (str): Die Stadt.
+            land (Optional[str]): Das Land, standardmäßig Deutschland.
+
+        Returns:
+            Tuple[Optional[float], Optional[float]]: Breiten- und Längengrad oder (None, None), wenn die Adresse
+            nicht gefunden wurde.
+
+        Raises:
+            httpx.HTTPError: Wenn der Dienst nicht erreichbar ist oder mit einem Fehler antwortet.
+        """
+        await self.bucket.erwerbe()
+        antwort = await self.client().get(self.url, params={
+            "street": f"{hausnummer} {strasse}",
+            "postalcode": plz,
+            "city": stadt,
+            "country": land or STANDARD_LAND,
+            "format": "jsonv2",
+            "limit": 1,
+        })
+        antwort.raise_for_status()
+        treffer = antwort.json()
+        if not treffer:
+            return None, None
+        return float(treffer[0]["lat"]), float(treffer[0]["lon"])
+
+
+geocoder = Geocoder()
+
+fortschritt = {
+    "laeuft": False,
+    "gestartet_am": None,
+    "beendet_am": None,
+    "gesamt": 0,
+    "verarbeitet": 0,
+    "erfolgreich": 0,
+    "nicht_gefunden": 0,
+    "fehlgeschlagen": 0,
+    "cache_treffer": 0,
+    "letzter_fehler": None,
+}
+
+
+def _normalisiere(wert) -> str:
+    return " ".join(str(wert or "").casefold().split())
+
+
+def cache_schluessel(strasse, hausnummer, plz, stadt, land) -> str:
+    """
+    Bildet den Schlüssel des Geocode-Caches aus einer Adresse.
+
+    Groß- und Kleinschreibung, Leerzeichen, "ß" sowie die Schreibweisen "Straße", "Strasse" und "Str." werden
+    vereinheitlicht, damit gleiche Adressen unabhängig von der Eingabe denselben Eintrag treffen.
+
+    Args:
+        strasse: Die Straße.
+        hausnummer: Die Hausnummer.
+        plz: Die Postleitzahl.
+        stadt: Die Stadt.
+        land: Das Land, leer für Deutschland.
+
+    Returns:
+        str: Der normalisierte Schlüssel.
+    """
+    strasse = STRASSEN_SUFFIXE.sub("str", _normalisiere(strasse))
+    land = _normalisiere(land)
+    return "|".join([strasse, _normalisiere(hausnummer), _normalisiere(plz), _normalisiere(stadt),
+                     LAND_ALIASE.get(land, land)])
+
+
+def adresse_schluessel(adresse) -> str:
+    """
+    Bildet den Schlüssel des Geocode-Caches für ein Adressobjekt.
+
+    Args:
+        adresse: Ein Objekt mit den Attributen strasse, hausnummer, plz, stadt und land.
+
+    Returns:
+        str: Der normalisierte Schlüssel.
+    """
+    return cache_schluessel(adresse.strasse, adresse.hausnummer, adresse.plz, adresse.stadt, adresse.land)
+
+
+def ist_aktuell(eintrag: models.GeocodeCache) -> bool:
+    """
+    Prüft, ob ein Cache-Eintrag noch gültig ist; negative Einträge verfallen früher als gefundene Koordinaten.
+
+    Args:
+        eintrag (models.GeocodeCache): Der Cache-Eintrag.
+
+    Returns:
+        bool: True, wenn der Eintrag innerhalb seiner TTL liegt.
+    """
+    if eintrag.latitude is None:
+        ttl = timedelta(hours=settings.GEOCODE_CACHE_NEGATIVE_TTL_HOURS)
+    else:
+        ttl = timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+    return datetime.now() - eintrag.abgefragt_am < ttl
+
+
+async def lade_cache(db: AsyncSession, schluessel: Iterable[str]) -> Dict[str, models.GeocodeCache]:
+    """
+    Lädt die gültigen Cache-Einträge zu mehreren Schlüsseln mit einer Abfrage.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        schluessel (Iterable[str]): Die Schlüssel der Adressen.
+
+    Returns:
+        Dict[str, models.GeocodeCache]: Die gültigen Einträge nach Schlüssel.
+    """
+    schluessel = set(schluessel)
+    if not schluessel:
+        return {}
+    result = await db.execute(select(models.GeocodeCache).where(models.GeocodeCache.schluessel.in_(schluessel)))
+    return {eintrag.schluessel: eintrag for eintrag in result.scalars().all() if ist_aktuell(eintrag)}
+
+
+async def koordinaten_aus_cache(db: AsyncSession, adresse) -> Optional[Tuple[float, float]]:
+    """
+    Sucht die Koordinaten einer Adresse im Geocode-Cache, ohne den Geocoding-Dienst anzufragen.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        adresse: Ein Objekt mit den Attributen strasse, hausnummer, plz, stadt und land.
+
+    Returns:
+        Optional[Tuple[float, float]]: Breiten- und Längengrad oder None, wenn kein gültiger positiver Eintrag
+        existiert.
+    """
+    eintrag = await db.get(models.GeocodeCache, adresse_schluessel(adresse))
+    if eintrag is None or eintrag.latitude is None or not ist_aktuell(eintrag):
+        return None
+    return eintrag.latitude, eintrag.longitude
+
+
+async def speichere_im_cache(db: AsyncSession, eintraege: Dict[str, Tuple[Optional[float], Optional[float]]]):
+    """
+    Schreibt Ergebnisse des Geocoding-Dienstes in den Cache, bestehende Einträge werden überschrieben.
+    Die Transaktion wird nicht committet.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        eintraege (Dict[str, Tuple[Optional[float], Optional[float]]]): Koordinaten nach Schlüssel,
+            (None, None) für nicht gefundene Adressen.
+    """
+    if not eintraege:
+        return
+    jetzt = datetime.now()
+    stmt = insert(models.GeocodeCache).values([
+        {"schluessel": schluessel, "latitude": latitude, "longitude": longitude, "abgefragt_am": jetzt}
+        for schluessel, (latitude, longitude) in eintraege.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.GeocodeCache.schluessel],
+        set_={"latitude": stmt.excluded.latitude, "longitude": stmt.excluded.longitude,
+              "abgefragt_am": stmt.excluded.abgefragt_am}))
+
+
+def fehlende_koordinaten():
+    """
+    Gibt die Bedingung für Adressen zurück, denen Breiten- oder Längengrad fehlt.
+
+    Returns:
+        ColumnElement: Die Filterbedingung.
+    """
+    return or_(models.Adresse.latitude.is_(None), models.Adresse.longitude.is_(None))
+
+
+async def anzahl_offen() -> int:
+    """
+    Zählt die Adressen, denen noch Koordinaten fehlen.
+
+    Returns:
+        int: Die Anzahl der Adressen ohne Koordinaten.
+    """
+    async with SessionLocal() as db:
+        return await db.scalar(select(func.count()).select_from(models.Adresse).where(fehlende_koordinaten()))
+
+
+async def geocodiere_fehlende(batch_groesse: int = None) -> dict:
+    """
+    Geokodiert alle Adressen ohne Koordinaten.
+
+    Die Adressen werden per Keyset-Paginierung über adresse_id in Batches gelesen. Zuerst wird der Geocode-Cache
+    befragt, nur für fehlende oder abgelaufene Einträge wird der ratenbegrenzte Geocoder angefragt und das Ergebnis,
+    auch ein negatives, im Cache gespeichert. Adressen und Cache werden pro Batch committet. Nicht gefundene
+    Adressen bleiben ohne Koordinaten und werden im selben Lauf nicht erneut abgefragt.
+
+    Args:
+        batch_groesse (int): Anzahl der Adressen pro Batch, standardmäßig GEOCODER_BATCH_SIZE.
+
+    Returns:
+        dict: Anzahl der verarbeiteten, erfolgreich geokodierten, nicht gefundenen und fehlgeschlagenen Adressen
+        sowie der Treffer im Geocode-Cache.
+    """
+    batch_groesse = batch_groesse or settings.GEOCODER_BATCH_SIZE
+    fortschritt.update(laeuft=True, gestartet_am=datetime.now(), beendet_am=None, gesamt=await anzahl_offen(),
+                       verarbeitet=0, erfolgreich=0, nicht_gefunden=0, fehlgeschlagen=0, cache_treffer=0,
+                       letzter_fehler=None)
+    letzte_id = 0
+    try:
+        async with SessionLocal() as db:
+            while True:
+                adressen = (await db.execute(
+                    select(models.Adresse)
+                    .where(fehlende_koordinaten(), models.Adresse.adresse_id > letzte_id)
+                    .order_by(models.Adresse.adresse_id)
+                    .limit(batch_groesse)
+                )).scalars().all()
+                if not adressen:
+                    break
+                cache = {schluessel: (eintrag.latitude, eintrag.longitude)
+                         for schluessel, eintrag in (await lade_cache(db, map(adresse_schluessel, adressen))).items()}
+                # Verbindung freigeben, solange auf den ratenbegrenzten Geocoder gewartet wird
+                await db.commit()
+
+                neue_eintraege = {}
+                for adresse in adressen:
+                    fortschritt["verarbeitet"] += 1
+                    schluessel = adresse_schluessel(adresse)
+                    if schluessel in cache:
+                        fortschritt["cache_treffer"] += 1
+                        latitude, longitude = cache[schluessel]
+                    else:
+                        try:
+                            latitude, longitude = await geocoder.geocode(adresse.strasse, adresse.hausnummer,
+                                                                         adresse.plz, adresse.stadt, adresse.land)
+                        except (httpx.HTTPError, ValueError, KeyError) as e:
+                            fortschritt["fehlgeschlagen"] += 1
+                            fortschritt["letzter_fehler"] = f"Adresse {adresse.adresse_id}: {e}"
+                            continue
+                        cache[schluessel] = neue_eintraege[schluessel] = (latitude, longitude)
+
+                    if latitude is not None and longitude is not None:
+                        adresse.latitude = latitude
+                        adresse.longitude = longitude
+                        fortschritt["erfolgreich"] += 1
+                    else:
+                        fortschritt["nicht_gefunden"] += 1
+
+                await speichere_im_cache(db, neue_eintraege)
+                await db.commit()
+                letzte_id = adressen[-1].adresse_id
+                logger.info(f"Geocodierung: {fortschritt['verarbeitet']} von {fortschritt['gesamt']} Adressen "
+                            f"verarbeitet.")
+    finally:
+        fortschritt.update(laeuft=False, beendet_am=datetime.now())
+        await geocoder.schliessen()
+
+    return {schluessel: fortschritt[schluessel]
+            for schluessel in ("verarbeitet", "erfolgreich", "nicht_gefunden", "fehlgeschlagen", "cache_treffer")}
@@ -1,7 +1,35 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+HASH_THREADS = 4
+HASH_MAX_GLEICHZEITIG = HASH_THREADS
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="bcrypt")
+_hash_semaphore = asyncio.Semaphore(HASH_MAX_GLEICHZEITIG)
+
+
+async def _im_hash_pool(funktion, *args):
+    """
+    Führt eine bcrypt-Funktion im Thread-Pool aus, damit sie die Event-Loop nicht blockiert.
+
+    bcrypt gibt während des Hashens den GIL frei, die Threads laufen also parallel zur Event-Loop. Über die
+    Semaphore warten überzählige Aufrufe in der Event-Loop statt in der Queue des Pools, sodass abgebrochene
+    Anfragen (z. B. bei einem Login-Ansturm) keine Rechenzeit mehr belegen.
+
+    Args:
+        funktion: Die auszuführende Funktion.
+        *args: Die Argumente der Funktion.
+
+    Returns:
+        Das Ergebnis der Funktion.
+    """
+    async with _hash_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, funktion, *args)
+
 
 class Hashing:
     """
@@ -14,10 +42,17 @@ class Hashing:
         verify_password(plain_password: str, hashed_password: str) -> bool:
             Überprüft, ob ein gegebenes Passwort mit einem verschlüsselten Hash übereinstimmt.
 
+        hash_password_async(password: str) -> str:
+            Wie hash_password, aber im bcrypt-Thread-Pool, zur Verwendung in async Endpunkten.
+
+        verify_password_async(plain_password: str, hashed_password: str) -> bool:
+            Wie verify_password, aber im bcrypt-Thread-Pool, zur Verwendung in async Endpunkten.
+
     Example:
         hashing = Hashing()
         hashed_password = hashing.hash_password("geheimes_passwort")
         is_valid = hashing.verify_password("geheimes_passwort", hashed_password)
+        is_valid = await Hashing.verify_password_async("geheimes_passwort", hashed_password)
     """
     @staticmethod
     def hash_password(password):
@@ -45,3 +80,30 @@ class Hashing:
             bool: True, wenn das Passwort korrekt ist, andernfalls False.
         """
         return pwd_context.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def hash_password_async(password):
+        """
+        Verschlüsselt ein Passwort im bcrypt-Thread-Pool, ohne die Event-Loop zu blockieren.
+
+        Args:
+            password (str): Das zu verschlüsselnde Passwort.
+
+        Returns:
+            str: Der verschlüsselte Hash des Passworts.
+        """
+        return await _im_hash_pool(pwd_context.hash, password)
+
+    @staticmethod
+    async def verify_password_async(plain_password, hashed_password):
+        """
+        Überprüft ein Passwort im bcrypt-Thread-Pool, ohne die Event-Loop zu blockieren.
+
+        Args:
+            plain_password (str): Das zu überprüfende Passwort im Klartext.
+            hashed_password (str): Der verschlüsselte Hash des gespeicherten Passworts.
+
+        Returns:
+            bool: True, wenn das Passwort korrekt ist, andernfalls False.
+        """
+        return await _im_hash_pool(pwd_context.verify, plain_password, hashed_password)
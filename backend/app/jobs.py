@@ -0,0 +1,122 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import delete, func, select, update
+
+from app import abrechnung, geocoding, log_store, models, partitionen
+from app.database import SessionLocal, engine
+
+logger = logging.getLogger("GreenEcoHub")
+
+LAEUFT = "laeuft"
+ERFOLGREICH = "erfolgreich"
+FEHLGESCHLAGEN = "fehlgeschlagen"
+ABGEBROCHEN = "abgebrochen"
+HISTORIE_TAGE = 30
+
+
+class Job:
+    """
+    Eine geplante Aufgabe, die über alle Worker-Prozesse hinweg nur von einem Prozess gleichzeitig ausgeführt wird.
+
+    Args:
+        funktion (Callable[[], Awaitable]): Die auszuführende Coroutine-Funktion, ihr Rückgabewert wird als
+            Ergebnis des Laufs gespeichert.
+        mindestabstand (timedelta): Geplante Läufe, die so kurz nach einem erfolgreichen Lauf starten, werden
+            übersprungen. Das verhindert, dass Worker, deren Scheduler zum selben Termin etwas später feuert, den
+            Job ein zweites Mal ausführen.
+    """
+
+    def __init__(self, funktion: Callable[[], Awaitable], mindestabstand: timedelta):
+        self.funktion = funktion
+        self.mindestabstand = mindestabstand
+
+
+JOBS = {
+    "rechnungslauf": Job(abrechnung.check_and_create_rechnung, timedelta(hours=1)),
+    "log_import": Job(log_store.importiere_logs_job, timedelta(seconds=30)),
+    "geocodierung": Job(geocoding.geocodiere_fehlende, timedelta(0)),
+    "partitionen": Job(partitionen.lege_kommende_partitionen_an, timedelta(hours=1)),
+}
+
+
+def sperr_schluessel(name: str):
+    """
+    Gibt den Schlüssel der Postgres-Advisory-Lock für einen Job zurück.
+
+    Args:
+        name (str): Der Name des Jobs.
+
+    Returns:
+        ColumnElement: Ein integer-Ausdruck, der für denselben Namen in allen Prozessen gleich ist.
+    """
+    return func.hashtext(f"greenecohub-job:{name}")
+
+
+async def fuehre_aus(name: str, ausgeloest_von: Optional[int] = None) -> Optional[models.JobLauf]:
+    """
+    Führt einen Job aus, sofern kein anderer Prozess ihn gerade ausführt.
+
+    Die Wahl des ausführenden Prozesses erfolgt über eine Advisory-Lock auf einer eigenen Verbindung, die für die
+    Dauer des Laufs gehalten wird. Jeder Lauf wird mit Dauer und Ergebnis in job_laeufe protokolliert.
+
+    Args:
+        name (str): Der Name des Jobs aus JOBS.
+        ausgeloest_von (Optional[int]): Die ID des Admins bei einem manuellen Start. Manuelle Starts ignorieren
+            den Mindestabstand zum letzten Lauf.
+
+    Returns:
+        Optional[models.JobLauf]: Der protokollierte Lauf oder None, wenn ein anderer Prozess den Job gerade ausführt
+        oder er erst vor Kurzem erfolgreich lief.
+    """
+    job = JOBS[name]
+    async with engine.connect() as verbindung:
+        verbindung = await verbindung.execution_options(isolation_level="AUTOCOMMIT")
+        if not await verbindung.scalar(select(func.pg_try_advisory_lock(sperr_schluessel(name)))):
+            return None
+        try:
+            return await _fuehre_als_leader_aus(name, job, ausgeloest_von)
+        finally:
+            await verbindung.scalar(select(func.pg_advisory_unlock(sperr_schluessel(name))))
+
+
+async def _fuehre_als_leader_aus(name: str, job: Job, ausgeloest_von: Optional[int]) -> Optional[models.JobLauf]:
+    async with SessionLocal() as db:
+        if ausgeloest_von is None:
+            letzter_erfolg = await db.scalar(select(func.max(models.JobLauf.gestartet_am))
+                                             .where(models.JobLauf.job == name,
+                                                    models.JobLauf.status == ERFOLGREICH))
+            if letzter_erfolg is not None and datetime.now() - letzter_erfolg < job.mindestabstand:
+                return None
+
+        # Solange wir die Lock halten, kann kein anderer Lauf dieses Jobs aktiv sein
+        await db.execute(update(models.JobLauf)
+                         .where(models.JobLauf.job == name, models.JobLauf.status == LAEUFT)
+                         .values(status=ABGEBROCHEN)
+                         .execution_options(synchronize_session=False))
+        lauf = models.JobLauf(job=name, status=LAEUFT, gestartet_am=datetime.now(), pid=os.getpid(),
+                              ausgeloest_von=ausgeloest_von)
+        db.add(lauf)
+        await db.commit()
+
+        start = time.perf_counter()
+        try:
+            ergebnis = await job.funktion()
+            lauf.status = ERFOLGREICH
+            lauf.ergebnis = ergebnis if isinstance(ergebnis, dict) else None
+        except Exception as e:
+            lauf.status = FEHLGESCHLAGEN
+            lauf.fehler = f"{type(e).__name__}: {e}"
+            logger.error(f"Job {name} fehlgeschlagen: {e}")
+        lauf.beendet_am = datetime.now()
+        lauf.dauer_s = round(time.perf_counter() - start, 3)
+
+        await db.execute(delete(models.JobLauf).where(
+            models.JobLauf.job == name,
+            models.JobLauf.gestartet_am < datetime.now() - timedelta(days=HISTORIE_TAGE))
+            .execution_options(synchronize_session=False))
+        await db.commit()
+        return lauf
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from logging.config import dictConfig
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.database import SessionLocal, get_db_async
+from app.logger import LogConfig
+
+dictConfig(LogConfig().dict())
+logger = logging.getLogger("GreenEcoHub")
+
+LOG_DATEI = Path(LogConfig().LOG_FILE)
+LOG_BACKUPS = LogConfig().handlers["file"]["backupCount"]
+MAX_BYTES_PRO_LESEVORGANG = 8 * 1024 * 1024
+BATCH_GROESSE = 2000
+
+EREIGNIS_REGISTRIERUNG = "User registriert"
+EREIGNIS_LOGIN = "User eingeloggt"
+EREIGNISSE = (EREIGNIS_REGISTRIERUNG, EREIGNIS_LOGIN)
+
+# Arten der Tagesaggregate in log_tagesaggregate
+GESAMT = "gesamt"
+ENDPOINT = "endpoint"
+ERFOLG = "erfolg"
+EREIGNIS = "ereignis"
+
+
+def log_dateien() -> List[Path]:
+    """
+    Gibt die vorhandenen Log-Dateien des RotatingFileHandler zurück, die älteste Sicherung zuerst.
+
+    Returns:
+        List[Path]: Die Pfade von server.log.5 bis server.log, soweit vorhanden.
+    """
+    dateien = [LOG_DATEI.with_name(f"{LOG_DATEI.name}.{i}") for i in range(LOG_BACKUPS, 0, -1)]
+    dateien.append(LOG_DATEI)
+    return [datei for datei in dateien if datei.exists()]
+
+
+def datei_kennung(pfad: Path) -> Optional[str]:
+    """
+    Bildet eine Kennung für eine Log-Datei, die beim Rotieren (Umbenennen) erhalten bleibt.
+
+    Die Kennung besteht aus der Inode und einem Hash der ersten Zeile, damit eine wiederverwendete
+    Inode nicht mit einer früheren Datei verwechselt wird.
+
+    Args:
+        pfad (Path): Der Pfad der Log-Datei.
+
+    Returns:
+        Optional[str]: Die Kennung oder None, wenn die erste Zeile noch nicht vollständig geschrieben ist.
+    """
+    with open(pfad, "rb") as datei:
+        kopf = datei.readline()
+        inode = os.fstat(datei.fileno()).st_ino
+    if not kopf.endswith(b"\n"):
+        return None
+    return f"{inode}-{hashlib.sha1(kopf).hexdigest()[:16]}"
+
+
+def parse_zeitstempel(wert) -> Optional[datetime]:
+    """
+    Parst den Zeitstempel des JsonFormatter (z. B. "2024-01-05 12:34:56,123").
+
+    Args:
+        wert: Der Zeitstempel aus der Log-Zeile.
+
+    Returns:
+        Optional[datetime]: Der Zeitstempel oder None, wenn er fehlt oder ungültig ist.
+    """
+    if not isinstance(wert, str):
+        return None
+    try:
+        return datetime.strptime(wert, "%Y-%m-%d %H:%M:%S,%f")
+    except ValueError:
+        try:
+            return datetime.strptime(wert[:19], "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+
+
+def formatiere_zeitstempel(wert: Optional[datetime]) -> Optional[str]:
+    """
+    Formatiert einen Zeitstempel wieder im Format des JsonFormatter.
+
+    Args:
+        wert (Optional[datetime]): Der Zeitstempel.
+
+    Returns:
+        Optional[str]: Der formatierte Zeitstempel.
+    """
+    if wert is None:
+        return None
+    return f"{wert:%Y-%m-%d %H:%M:%S},{wert.microsecond // 1000:03d}"
+
+
+def parse_log_zeile(zeile: bytes) -> Optional[dict]:
+    """
+    Parst eine JSON-Zeile der Log-Datei in die Spalten von LogEintrag.
+
+    Args:
+        zeile (bytes): Die Zeile aus der Log-Datei.
+
+    Returns:
+        Optional[dict]: Die Spaltenwerte oder None, wenn die Zeile kein gültiges JSON-Objekt ist.
+    """
+    try:
+        eintrag = json.loads(zeile)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(eintrag, dict):
+        return None
+
+    user_id = eintrag.get("user_id")
+    success = eintrag.get("success")
+    message = eintrag.get("message")
+    return {
+        "timestamp": parse_zeitstempel(eintrag.get("timestamp")),
+        "level": eintrag.get("level"),
+        "name": eintrag.get("name"),
+        "message": str(message) if message is not None else None,
+        "user_id": user_id if isinstance(user_id, int) and not isinstance(user_id, bool) else None,
+        "endpoint": eintrag.get("endpoint"),
+        "method": eintrag.get("method"),
+        "success": success if isinstance(success, bool) else None,
+    }
+
+
+def lese_neue_zeilen(pfad: Path, offset: int, max_bytes: int = MAX_BYTES_PRO_LESEVORGANG) -> Tuple[List[dict], int]:
+    """
+    Liest ab einem Byte-Offset die vollständig geschriebenen Zeilen einer Log-Datei.
+
+    Eine am Dateiende noch unvollständige Zeile wird erst beim nächsten Aufruf gelesen.
+
+    Args:
+        pfad (Path): Der Pfad der Log-Datei.
+        offset (int): Der Byte-Offset, ab dem gelesen wird.
+        max_bytes (int): Die ungefähre Höchstmenge an Bytes pro Aufruf.
+
+    Returns:
+        Tuple[List[dict], int]: Die geparsten Zeilen mit ihrem Offset und der Offset hinter der letzten gelesenen Zeile.
+    """
+    with open(pfad, "rb") as datei:
+        if os.fstat(datei.fileno()).st_size < offset:
+            offset = 0  # Datei wurde gekürzt
+        datei.seek(offset)
+        daten = datei.read(max_bytes)
+        if daten and not daten.endswith(b"\n"):
+            daten += datei.readline()
+
+    ende = daten.rfind(b"\n")
+    if ende == -1:
+        return [], offset
+
+    zeilen = []
+    position = offset
+    for zeile in daten[:ende].split(b"\n"):
+        eintrag = parse_log_zeile(zeile)
+        if eintrag is not None:
+            eintrag["datei_offset"] = position
+            zeilen.append(eintrag)
+        position += len(zeile) + 1
+    return zeilen, offset + ende + 1
+
+
+def zaehle_tagesaggregate(zeilen: Iterable[tuple]) -> Counter:
+    """
+    Zählt Log-Einträge nach Art, Schlüssel und Tag für die Übersichten des Admin-Dashboards.
+
+    Args:
+        zeilen (Iterable[tuple]): Zeitstempel, Endpunkt, Erfolg und Nachricht je Log-Eintrag.
+
+    Returns:
+        Counter: Die Anzahl je (art, schluessel, tag).
+    """
+    zaehler = Counter()
+    for timestamp, endpoint, success, message in zeilen:
+        if timestamp is None:
+            continue
+        tag = timestamp.date()
+        zaehler[(GESAMT, "", tag)] += 1
+        if endpoint is not None:
+            zaehler[(ENDPOINT, endpoint, tag)] += 1
+        if success is not None:
+            zaehler[(ERFOLG, "success" if success else "fail", tag)] += 1
+        if message in EREIGNISSE:
+            zaehler[(EREIGNIS, message, tag)] += 1
+    return zaehler
+
+
+async def erhoehe_tagesaggregate(db: AsyncSession, zaehler: Counter) -> None:
+    """
+    Addiert Zählerstände auf die Tagesaggregate. Das Commit erfolgt durch den Aufrufer.
+
+    Die Zeilen werden sortiert geschrieben, damit sich parallele Importe nicht gegenseitig blockieren (Deadlock).
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        zaehler (Counter): Die Anzahl je (art, schluessel, tag).
+    """
+    if not zaehler:
+        return
+    werte = [{"art": art, "schluessel": schluessel, "tag": tag, "anzahl": anzahl}
+             for (art, schluessel, tag), anzahl in sorted(zaehler.items())]
+    stmt = insert(models.LogTagesAggregat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["art", "schluessel", "tag"],
+        set_={"anzahl": models.LogTagesAggregat.anzahl + stmt.excluded.anzahl}
+    )
+    await db.execute(stmt, werte)
+
+
+async def baue_tagesaggregate_neu(db: AsyncSession) -> int:
+    """
+    Berechnet log_tagesaggregate vollständig aus log_eintraege neu, z. B. für vor den Aggregaten importierte Logs.
+
+    Die Tabelle wird dafür exklusiv gesperrt, sodass ein gleichzeitiger Import seine Zeilen entweder vor oder
+    nach der Neuberechnung zählt, aber nicht doppelt. Das Commit erfolgt durch den Aufrufer.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+
+    Returns:
+        int: Die Anzahl der geschriebenen Aggregatzeilen.
+    """
+    aggregat = models.LogTagesAggregat
+    eintrag = models.LogEintrag
+    await db.execute(text(f'LOCK TABLE "{aggregat.__tablename__}" IN EXCLUSIVE MODE'))
+    await db.execute(delete(aggregat))
+
+    tag = func.date(eintrag.timestamp)
+    erfolg = case((eintrag.success, "success"), else_="fail")
+    abfragen = [
+        select(literal(GESAMT), literal(""), tag, func.count())
+        .where(eintrag.timestamp.isnot(None)).group_by(tag),
+        select(literal(ENDPOINT), eintrag.endpoint, tag, func.count())
+        .where(eintrag.endpoint.isnot(None), eintrag.timestamp.isnot(None)).group_by(eintrag.endpoint, tag),
+        select(literal(ERFOLG), erfolg, tag, func.count())
+        .where(eintrag.success.isnot(None), eintrag.timestamp.isnot(None)).group_by(eintrag.success, tag),
+        select(literal(EREIGNIS), eintrag.message, tag, func.count())
+        .where(eintrag.message.in_(EREIGNISSE), eintrag.timestamp.isnot(None)).group_by(eintrag.message, tag),
+    ]
+    zeilen = 0
+    for abfrage in abfragen:
+        result = await db.execute(insert(aggregat).from_select(["art", "schluessel", "tag", "anzahl"], abfrage))
+        zeilen += result.rowcount
+    return zeilen
+
+
+async def importiere_logs(db: AsyncSession) -> int:
+    """
+    Übernimmt neu geschriebene Zeilen aus server.log und den rotierten Sicherungen in die Tabelle log_eintraege.
+
+    Pro Datei wird der zuletzt importierte Offset in log_import_stand gespeichert, sodass nur neue Zeilen
+    gelesen werden. Die tatsächlich eingefügten Zeilen werden in derselben Transaktion in log_tagesaggregate
+    gezählt. Der Import ist idempotent und kann parallel aus mehreren Worker-Prozessen laufen.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+
+    Returns:
+        int: Die Anzahl der gelesenen Zeilen.
+    """
+    result = await db.execute(select(models.LogImportStand))
+    stand = {eintrag.datei_kennung: eintrag.offset for eintrag in result.scalars().all()}
+
+    gelesen = 0
+    for pfad in log_dateien():
+        try:
+            kennung = await asyncio.to_thread(datei_kennung, pfad)
+        except FileNotFoundError:
+            continue  # während des Rotierens umbenannt, wird beim nächsten Durchlauf gelesen
+        if kennung is None:
+            continue
+
+        offset = stand.get(kennung, 0)
+        while True:
+            try:
+                zeilen, neuer_offset = await asyncio.to_thread(lese_neue_zeilen, pfad, offset)
+            except FileNotFoundError:
+                break
+            if neuer_offset == offset:
+                break
+
+            zaehler = Counter()
+            for start in range(0, len(zeilen), BATCH_GROESSE):
+                batch = [{**zeile, "datei_kennung": kennung} for zeile in zeilen[start:start + BATCH_GROESSE]]
+                # RETURNING liefert nur neu eingefügte Zeilen, bereits importierte werden nicht doppelt gezählt
+                eingefuegt = await db.execute(
+                    insert(models.LogEintrag).on_conflict_do_nothing(constraint="_log_datei_offset_uc")
+                    .returning(models.LogEintrag.timestamp, models.LogEintrag.endpoint,
+                               models.LogEintrag.success, models.LogEintrag.message), batch)
+                zaehler.update(zaehle_tagesaggregate(eingefuegt.all()))
+            await erhoehe_tagesaggregate(db, zaehler)
+
+            stmt = insert(models.LogImportStand).values(datei_kennung=kennung, offset=neuer_offset)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["datei_kennung"],
+                set_={"offset": func.greatest(models.LogImportStand.offset, stmt.excluded.offset),
+                      "aktualisiert_am": func.now()}
+            )
+            await db.execute(stmt)
+            await db.commit()
+
+            gelesen += len(zeilen)
+            offset = neuer_offset
+    return gelesen
+
+
+async def importiere_logs_job() -> dict:
+    """
+    Hintergrundaufgabe, die die Log-Dateien regelmäßig in die Tabelle log_eintraege übernimmt.
+
+    Returns:
+        dict: Die Anzahl der gelesenen Log-Zeilen.
+
+    Raises:
+        Exception: Wenn der Import fehlschlägt, die Transaktion wird zuvor zurückgerollt.
+    """
+    async for db in get_db_async():
+        try:
+            return {"gelesen": await importiere_logs(db)}
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Fehler beim Import der Log-Dateien: {e}")
+            raise
+
+
+async def _main():
+    async with SessionLocal() as db:
+        zeilen = await baue_tagesaggregate_neu(db)
+        await db.commit()
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {zeilen} Tagesaggregate aus log_eintraege berechnet")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,8 +1,19 @@
 from pydantic import BaseModel
 import logging
+import logging.handlers
 import json
+import queue
+import threading
+import time
 from pythonjsonlogger import jsonlogger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_ENDE = object()
+
 class JsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record, record, message_dict):
         super(JsonFormatter, self).add_fields(log_record, record, message_dict)
@@ -18,6 +29,173 @@ class JsonFormatter(jsonlogger.JsonFormatter):
                 log_record[key] = value
 
 
+def log_eintrag(user_id: int, endpoint: str, method: str, message: str, success: bool) -> dict:
+    """
+    Baut die Felder eines strukturierten Log-Eintrags, ohne den Umweg über schemas.LoggingSchema.
+
+    Args:
+        user_id (int): Die ID des Nutzers, der die Anfrage stellt.
+        endpoint (str): Der aufgerufene Endpunkt.
+        method (str): Die HTTP-Methode.
+        message (str): Die Log-Nachricht.
+        success (bool): Ob die Anfrage erfolgreich war.
+
+    Returns:
+        dict: Die Felder, die direkt an logger.info bzw. logger.error übergeben werden.
+
+    Example:
+        logger.info(log_eintrag(user_id=1, endpoint="/users/", method="GET", message="OK", success=True))
+    """
+    return {"user_id": user_id, "endpoint": endpoint, "method": method, "message": message, "success": success}
+
+
+class FastJsonFormatter(logging.Formatter):
+    """
+    Schneller JSON-Formatter mit derselben Ausgabe wie JsonFormatter (timestamp, level, name, message und die
+    Felder eines als dict geloggten Eintrags).
+
+    Der Datumsteil des Zeitstempels wird nur einmal pro Sekunde formatiert, serialisiert wird mit orjson,
+    falls installiert, sonst mit json.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._sekunde = (None, "")
+
+    def _zeitstempel(self, record) -> str:
+        sekunde, praefix = self._sekunde
+        aktuelle_sekunde = int(record.created)
+        if aktuelle_sekunde != sekunde:
+            praefix = time.strftime("%Y-%m-%d %H:%M:%S", self.converter(aktuelle_sekunde))
+            self._sekunde = (aktuelle_sekunde, praefix)
+        return f"{praefix},{int(record.msecs):03d}"
+
+    def format(self, record) -> str:
+        felder = record.msg if isinstance(record.msg, dict) else None
+        eintrag = {
+            "timestamp": self._zeitstempel(record),
+            "level": record.levelname,
+            "name": record.name,
+            "message": "" if felder is not None else record.getMessage(),
+        }
+        if felder is not None:
+            eintrag.update(felder)
+        if record.exc_info:
+            eintrag["exc_info"] = self.formatException(record.exc_info)
+        if orjson is not None:
+            return orjson.dumps(eintrag, default=str).decode()
+        return json.dumps(eintrag, default=str)
+
+
+class QueueFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler, der Log-Records nur in eine begrenzte Queue legt und sie in einem eigenen Thread
+    gesammelt schreibt. Formatieren, Schreiben und Flushen laufen so nicht mehr im Thread der Event-Loop.
+
+    Ist die Queue voll, wird der Record bei drop_policy "drop" sofort verworfen, bei "block" wird bis zu
+    block_timeout Sekunden gewartet und erst dann verworfen. Verworfene Records werden in verworfen gezählt
+    und vom Schreib-Thread als Warnung in die Log-Datei geschrieben.
+
+    Args:
+        filename (str): Der Pfad zur Log-Datei.
+        mode (str): Der Modus, in dem die Log-Datei geöffnet wird.
+        maxBytes (int): Die Größe, ab der die Datei rotiert wird.
+        backupCount (int): Die Anzahl der aufbewahrten Sicherungen.
+        encoding (str): Die Kodierung der Log-Datei.
+        queue_size (int): Die maximale Anzahl wartender Records.
+        batch_size (int): Die maximale Anzahl Records, die vor einem Flush geschrieben werden.
+        drop_policy (str): "drop" oder "block".
+        block_timeout (float): Die maximale Wartezeit bei drop_policy "block" in Sekunden.
+    """
+
+    def __init__(self, filename, mode="a", maxBytes=0, backupCount=0, encoding=None, queue_size=10000,
+                 batch_size=256, drop_policy="drop", block_timeout=0.05):
+        if drop_policy not in ("drop", "block"):
+            raise ValueError(f"Unbekannte drop_policy: {drop_policy}")
+        super().__init__(filename, mode=mode, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.verworfen = 0
+        self._gemeldet = 0
+        self._thread = threading.Thread(target=self._schreibe, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        try:
+            if self.drop_policy == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.verworfen += 1  # emit läuft unter self.lock
+
+    def flush(self):
+        pass  # der Schreib-Thread flusht nach jedem Batch
+
+    def _schreibe(self):
+        ende = False
+        while not ende:
+            record = self.queue.get()
+            if record is _ENDE:
+                break
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _ENDE:
+                    ende = True
+                    break
+                batch.append(record)
+            self._schreibe_batch(batch)
+
+    def _schreibe_batch(self, batch):
+        verworfen = self.verworfen
+        if verworfen > self._gemeldet:
+            batch.append(logging.LogRecord(self.name or "log-writer", logging.WARNING, __file__, 0,
+                                           f"{verworfen - self._gemeldet} Log-Einträge verworfen, Queue voll",
+                                           None, None))
+            self._gemeldet = verworfen
+
+        for record in batch:
+            try:
+                zeile = self.format(record) + self.terminator
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() + len(zeile) >= self.maxBytes:
+                    self.doRollover()
+                self.stream.write(zeile)
+            except Exception:
+                self.handleError(record)
+        try:
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def close(self):
+        if self._thread.is_alive():
+            self.queue.put(_ENDE)
+            self._thread.join(timeout=5)
+        super().close()
+
+
+def verworfene_log_eintraege(logger_name: str = "GreenEcoHub") -> int:
+    """
+    Gibt die Anzahl der verworfenen Log-Records aller QueueFileHandler eines Loggers zurück.
+
+    Args:
+        logger_name (str): Der Name des Loggers.
+
+    Returns:
+        int: Die Anzahl der verworfenen Records.
+    """
+    return sum(handler.verworfen for handler in logging.getLogger(logger_name).handlers
+               if isinstance(handler, QueueFileHandler))
+
+
 class LogConfig(BaseModel):
     """
     Logging-Konfiguration für den Server.
@@ -28,9 +206,14 @@ class LogConfig(BaseModel):
         JSON_LOG_FORMAT (str): Das Format für die JSON-Logausgabe.
         LOG_LEVEL (str): Das Log-Level für den Logger.
         LOG_FILE (str): Der Pfad zur Log-Datei.
+        LOG_ASYNC (bool): Ob die Log-Datei über einen QueueFileHandler in einem eigenen Thread geschrieben wird.
+        LOG_QUEUE_SIZE (int): Die maximale Anzahl wartender Records im asynchronen Modus.
+        LOG_BATCH_SIZE (int): Die maximale Anzahl Records pro Schreibvorgang im asynchronen Modus.
+        LOG_DROP_POLICY (str): "drop" verwirft bei voller Queue sofort, "block" wartet kurz.
 
     Example:
         config = LogConfig()
+        config = LogConfig(LOG_ASYNC=False)  # synchron mit RotatingFileHandler
     """
 
     LOGGER_NAME: str = "GreenEcoHub"
@@ -38,6 +221,10 @@ class LogConfig(BaseModel):
     JSON_LOG_FORMAT: str = "%(timestamp)s %(level)s %(name)s %(message)s"
     LOG_LEVEL: str = "DEBUG"
     LOG_FILE: str = "./logs/server.log"
+    LOG_ASYNC: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 256
+    LOG_DROP_POLICY: str = "drop"
 
     # Logging config
     version: int = 1
@@ -49,8 +236,7 @@ class LogConfig(BaseModel):
             "datefmt": "%Y-%m-%d %H:%M:%S",
         },
         "json": {
-            "()": JsonFormatter,
-            "fmt": JSON_LOG_FORMAT,
+            "()": FastJsonFormatter,
         },
     }
     handlers: dict = {
@@ -73,6 +259,17 @@ class LogConfig(BaseModel):
         LOGGER_NAME: {"handlers": ["default", "file"], "level": LOG_LEVEL},
     }
 
+    def model_post_init(self, __context):
+        if self.LOG_ASYNC:
+            datei = self.handlers["file"]
+            self.handlers = {**self.handlers, "file": {
+                **datei,
+                "class": "app.logger.QueueFileHandler",
+                "queue_size": self.LOG_QUEUE_SIZE,
+                "batch_size": self.LOG_BATCH_SIZE,
+                "drop_policy": self.LOG_DROP_POLICY,
+            }}
+
 class LogConfigRegistration(BaseModel):
     """
     Logging-Konfiguration für den Server-Registration-Logger.
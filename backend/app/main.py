@@ -8,12 +8,15 @@ from app.oauth import get_current_user
 from app.logger import LogConfig
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from app import log_store, jobs, email_sender, chat_hub
 
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"],  # which origins are allowed
                    allow_credentials=True,
                    allow_methods=["*"],  # which http methods are allowed
-                   allow_headers=["*"])  # which headers are allowed
+                   allow_headers=["*"],  # which headers are allowed
+                   expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Estimated"])  # which headers the frontend may read
 
 scheduler = AsyncIOScheduler()
 
@@ -23,13 +26,37 @@ async def start_scheduler():
     """
     Event-Funktion beim Start der Anwendung.
     Startet den Scheduler und fügt einen Cron-Job hinzu, um die Funktion "check_and_create_rechnung"
-    von "netzbetreiber" täglich um Mitternacht auszuführen.
+    von "abrechnung" täglich um Mitternacht auszuführen, kurz danach werden die Monatspartitionen der Smart-Meter-Daten
+    für die kommenden Monate angelegt. Zusätzlich werden die Log-Dateien jede Minute
+    in die Tabelle log_eintraege übernommen. Diese Jobs laufen über jobs.fuehre_aus, sodass sie bei mehreren
+    Worker-Prozessen nur von einem ausgeführt werden.
+    Außerdem werden der Worker, der den E-Mail-Postausgang versendet, und der Chat-Hub gestartet, der neue
+    Chatnachrichten an die WebSocket-Clients dieses Prozesses verteilt.
     """
     scheduler.start()
+    email_sender.outbox_worker.starten()
+    chat_hub.hub.starten()
 
     scheduler.add_job(
-        netzbetreiber.check_and_create_rechnung,
-        trigger=CronTrigger(day="*", hour=0, minute=0)
+        jobs.fuehre_aus,
+        args=["rechnungslauf"],
+        trigger=CronTrigger(day="*", hour=0, minute=0),
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.add_job(
+        jobs.fuehre_aus,
+        args=["partitionen"],
+        trigger=CronTrigger(day="*", hour=0, minute=5),
+        max_instances=1,
+        coalesce=True
+    )
+    scheduler.add_job(
+        jobs.fuehre_aus,
+        args=["log_import"],
+        trigger=IntervalTrigger(minutes=1),
+        max_instances=1,
+        coalesce=True
     )
 
 
@@ -37,9 +64,11 @@ async def start_scheduler():
 async def shutdown_scheduler():
     """
     Event-Funktion beim Herunterfahren der Anwendung.
-    Beendet den Scheduler.
+    Beendet den Scheduler, den E-Mail-Worker und den Chat-Hub und meldet die SMTP-Verbindungen ab.
     """
     scheduler.shutdown()
+    await email_sender.outbox_worker.stoppen()
+    await chat_hub.hub.stoppen()
 
 
 @app.get("/")
@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Date, DateTime, Enum, ForeignKey, \
-    Identity, TIMESTAMP, func, UniqueConstraint, Numeric
+    Identity, TIMESTAMP, func, UniqueConstraint, Numeric, Index, Sequence, BigInteger, JSON, CheckConstraint
 from app.database import Base
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import ENUM
@@ -39,6 +39,10 @@ class Nutzer(Base):
     adresse_id = Column(Integer, ForeignKey(f'adresse.adresse_id' if settings.OS == 'Linux' else "Adresse.adresse_id"))
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    __table_args__ = (
+        Index('ix_nutzer_created_at_user_id', 'created_at', 'user_id'),
+        Index('ix_nutzer_rolle_user_id', 'rolle', 'user_id'),
+    )
 
 
 
@@ -70,18 +74,49 @@ class Preisstrukturen(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
 
 
+smartmeter_id_seq = Sequence("dashboard_smartmeter_data_id_seq" if settings.OS == 'Linux'
+                             else "Dashboard_smartmeter_data_id_seq")
+
+
 class DashboardSmartMeterData(Base):
     __tablename__ = "dashboard_smartmeter_data" if settings.OS == 'Linux' else "Dashboard_smartmeter_data"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Die Tabelle ist monatlich nach datum partitioniert (siehe app/partitionen.py), der Partitionsschlüssel
+    # muss deshalb Teil des Primärschlüssels sein
+    id = Column(Integer, smartmeter_id_seq, server_default=smartmeter_id_seq.next_value(), primary_key=True)
     haushalt_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"))
-    datum = Column(DateTime)
+    datum = Column(DateTime, primary_key=True)
     pv_erzeugung = Column(Float)
     soc = Column(Float)
     batterie_leistung = Column(Float)
     zaehler = Column(Float)
     last = Column(Float)
     user_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"))
+    __table_args__ = (
+        Index('ix_smartmeter_haushalt_id_datum', 'haushalt_id', 'datum'),
+        {'postgresql_partition_by': 'RANGE (datum)'},
+    )
+
+
+class DashboardSmartMeterRollup(Base):
+    __tablename__ = "dashboard_smartmeter_rollup" if settings.OS == 'Linux' else "Dashboard_smartmeter_rollup"
+
+    rollup_id = Column(Integer, Identity(), primary_key=True)
+    haushalt_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"),
+                         nullable=False)
+    user_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"),
+                     nullable=False)
+    periode = Column(String, nullable=False)  # MINUTE, HOUR, DAY, WEEK oder MONTH
+    periode_start = Column(DateTime, nullable=False)
+    pv_erzeugung_summe = Column(Float, default=0)
+    soc_summe = Column(Float, default=0)
+    soc_anzahl = Column(Integer, default=0)
+    batterie_leistung_summe = Column(Float, default=0)
+    last_summe = Column(Float, default=0)
+    anzahl = Column(Integer, default=0)
+    __table_args__ = (
+        UniqueConstraint('haushalt_id', 'user_id', 'periode', 'periode_start', name='_smartmeter_rollup_uc'),
+    )
 
 
 class PVAnlage(Base):
@@ -203,6 +238,11 @@ class Rechnungen(Base):
                                                        else "Zahlungsstatus", create_type=False))
     rechnungsperiode_start = Column(Date)
     rechnungsperiode_ende = Column(Date)
+    __table_args__ = (
+        # Jede Periodenrechnung darf pro Empfänger nur einmal existieren, Rechnungen ohne Periode sind nicht betroffen
+        UniqueConstraint('empfaenger_id', 'rechnungsart', 'rechnungsperiode_start', 'rechnungsperiode_ende',
+                         name='_rechnung_periode_uc'),
+    )
 
 
 
@@ -266,4 +306,135 @@ class ChatMessage(Base):
     empfaenger_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"))
     nachricht_inhalt = Column(String, nullable=False)
     timestamp = Column(TIMESTAMP, server_default=func.now())
+    __table_args__ = (
+        # Verlauf und Synchronisation eines Gesprächs, je Richtung ein Index
+        Index('ix_chat_messages_sender_empfaenger_timestamp', 'sender_id', 'empfaenger_id', 'timestamp'),
+        Index('ix_chat_messages_empfaenger_sender_timestamp', 'empfaenger_id', 'sender_id', 'timestamp'),
+        # Synchronisation über alle Gespräche eines Nutzers ab einer nachricht_id
+        Index('ix_chat_messages_sender_nachricht_id', 'sender_id', 'nachricht_id'),
+        Index('ix_chat_messages_empfaenger_nachricht_id', 'empfaenger_id', 'nachricht_id'),
+    )
+
+
+# Zusammenfassung je Gespräch für den Posteingang, genau eine Zeile je Nutzerpaar mit user_a_id <= user_b_id
+class ChatConversation(Base):
+    __tablename__ = 'chat_conversations' if settings.OS == 'Linux' else "Chat_conversations"
+    user_a_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"),
+                       primary_key=True)
+    user_b_id = Column(Integer, ForeignKey('nutzer.user_id' if settings.OS == 'Linux' else "Nutzer.user_id"),
+                       primary_key=True)
+    letzte_nachricht_id = Column(Integer, ForeignKey('chat_messages.nachricht_id' if settings.OS == 'Linux'
+                                                     else "Chat_messages.nachricht_id"), nullable=False)
+    letzte_nachricht_am = Column(TIMESTAMP, nullable=False)
+    ungelesen_a = Column(Integer, nullable=False, default=0)
+    ungelesen_b = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        CheckConstraint('user_a_id <= user_b_id', name='ck_chat_conversations_paar'),
+        Index('ix_chat_conversations_user_a_letzte', 'user_a_id', 'letzte_nachricht_id'),
+        Index('ix_chat_conversations_user_b_letzte', 'user_b_id', 'letzte_nachricht_id'),
+    )
 
+
+class LogEintrag(Base):
+    __tablename__ = 'log_eintraege' if settings.OS == 'Linux' else "Log_eintraege"
+    log_id = Column(BigInteger, Identity(), primary_key=True)
+    timestamp = Column(DateTime, index=True)
+    level = Column(String)
+    name = Column(String)
+    message = Column(String)
+    user_id = Column(Integer)  # ohne ForeignKey, Logs bleiben auch für gelöschte Nutzer erhalten
+    endpoint = Column(String)
+    method = Column(String)
+    success = Column(Boolean)
+    # Herkunft der Zeile in der Log-Datei, macht den Import idempotent
+    datei_kennung = Column(String, nullable=False)
+    datei_offset = Column(BigInteger, nullable=False)
+    __table_args__ = (
+        UniqueConstraint('datei_kennung', 'datei_offset', name='_log_datei_offset_uc'),
+        Index('ix_log_eintraege_endpoint_timestamp', 'endpoint', 'timestamp'),
+        Index('ix_log_eintraege_success_timestamp', 'success', 'timestamp'),
+        Index('ix_log_eintraege_user_id_log_id', 'user_id', 'log_id'),
+    )
+
+
+class LogImportStand(Base):
+    __tablename__ = 'log_import_stand' if settings.OS == 'Linux' else "Log_import_stand"
+    datei_kennung = Column(String, primary_key=True)
+    offset = Column(BigInteger, nullable=False, default=0)
+    aktualisiert_am = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class LogTagesAggregat(Base):
+    __tablename__ = 'log_tagesaggregate' if settings.OS == 'Linux' else "Log_tagesaggregate"
+    # Vom Log-Import gepflegte Zähler für die Übersichten des Admin-Dashboards (siehe app/log_store.py)
+    art = Column(String, primary_key=True)  # gesamt, endpoint, erfolg oder ereignis
+    schluessel = Column(String, primary_key=True)  # Endpunkt, success/fail oder Nachricht, bei gesamt leer
+    tag = Column(Date, primary_key=True)
+    anzahl = Column(BigInteger, nullable=False, default=0)
+
+
+class TokenSperre(Base):
+    __tablename__ = 'token_sperren' if settings.OS == 'Linux' else "Token_sperren"
+    user_id = Column(Integer, primary_key=True)  # ohne ForeignKey, Sperren gelten auch für gelöschte Nutzer
+    gesperrt_ab = Column(DateTime, nullable=False, index=True)
+
+
+class RechnungslaufBatch(Base):
+    __tablename__ = 'rechnungslauf_batches' if settings.OS == 'Linux' else "Rechnungslauf_batches"
+    stichtag = Column(Date, primary_key=True)
+    vertrag_id_von = Column(Integer, primary_key=True)
+    vertrag_id_bis = Column(Integer)  # NULL beim letzten Batch, damit auch nach der Planung angelegte Verträge zählen
+    erstellt = Column(Integer)
+    geplant_am = Column(TIMESTAMP, server_default=func.now())
+    abgeschlossen_am = Column(TIMESTAMP)  # NULL, solange der Batch noch offen ist
+    # Fehlversuche im aktuellen Lauf, ab BATCH_MAX_FEHLVERSUCHE wird der Batch von allen Workern übersprungen
+    fehlversuche = Column(Integer, nullable=False, default=0, server_default="0")
+    __table_args__ = (
+        Index('ix_rechnungslauf_batches_offen', 'stichtag', 'vertrag_id_von',
+              postgresql_where=abgeschlossen_am.is_(None)),
+    )
+
+
+class JobLauf(Base):
+    __tablename__ = 'job_laeufe' if settings.OS == 'Linux' else "Job_laeufe"
+    lauf_id = Column(BigInteger, Identity(), primary_key=True)
+    job = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # laeuft, erfolgreich, fehlgeschlagen oder abgebrochen
+    gestartet_am = Column(DateTime, nullable=False)
+    beendet_am = Column(DateTime)
+    dauer_s = Column(Float)
+    ergebnis = Column(JSON)
+    fehler = Column(String)
+    pid = Column(Integer)
+    ausgeloest_von = Column(Integer)  # user_id des Admins bei manuellem Start, NULL beim Scheduler
+    __table_args__ = (
+        Index('ix_job_laeufe_job_gestartet_am', 'job', 'gestartet_am'),
+    )
+
+
+class GeocodeCache(Base):
+    __tablename__ = 'geocode_cache' if settings.OS == 'Linux' else "Geocode_cache"
+    # Normalisiertes Tupel (strasse, hausnummer, plz, stadt, land), siehe geocoding.cache_schluessel
+    schluessel = Column(String, primary_key=True)
+    latitude = Column(Float)  # NULL bei negativem Eintrag, die Adresse wurde nicht gefunden
+    longitude = Column(Float)
+    abgefragt_am = Column(DateTime, nullable=False)
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox' if settings.OS == 'Linux' else "Email_outbox"
+    email_id = Column(BigInteger, Identity(), primary_key=True)
+    empfaenger = Column(String, nullable=False)
+    betreff = Column(String, nullable=False)
+    inhalt = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="offen")  # offen, sendet, gesendet oder fehlgeschlagen
+    versuche = Column(Integer, nullable=False, default=0)
+    # Bei status "sendet" das Ende der Reservierung, danach wird die E-Mail erneut versendet
+    naechster_versuch_am = Column(DateTime, nullable=False, server_default=func.now())
+    erstellt_am = Column(DateTime, nullable=False, server_default=func.now())
+    gesendet_am = Column(DateTime)
+    letzter_fehler = Column(String)
+    __table_args__ = (
+        Index('ix_email_outbox_offen', 'naechster_versuch_am', 'email_id',
+              postgresql_where=status.in_(["offen", "sendet"])),
+    )
@@ -1,10 +1,15 @@
+import time
+from calendar import timegm
+from collections import OrderedDict
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import or_
+from sqlalchemy import or_, inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
+from sqlalchemy.orm import make_transient_to_detached
 
 from app import schemas, models, database
 from app.config import settings
@@ -14,28 +19,224 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+JWT_CLAIMS = settings.JWT_CLAIMS
+JWT_CLAIMS_TTL_MINUTES = settings.JWT_CLAIMS_TTL_MINUTES
+SPERRLISTE_AKTUALISIERUNG_SEKUNDEN = 10
+NUTZER_CACHE_TTL_SEKUNDEN = 60
+NUTZER_CACHE_GROESSE = 1024
 
 
-def create_access_token(data: dict):
+class NutzerCache:
+    """
+    TTL-begrenzter LRU-Cache der aktiven Nutzer nach user_id, damit get_current_user nicht bei jeder Anfrage
+    die Tabelle nutzer abfragen muss.
+
+    Gespeichert wird eine losgelöste Kopie der Spaltenwerte, die pro Anfrage ohne Datenbankabfrage in die
+    Sitzung übernommen wird. Endpunkte, die einen Nutzer ändern oder löschen, müssen ihn mit entferne aus dem
+    Cache nehmen. Der Cache gilt pro Worker-Prozess; andere Worker sehen die Änderung spätestens nach Ablauf
+    der TTL.
+
+    Args:
+        groesse (int): Die maximale Anzahl gespeicherter Nutzer.
+        ttl (float): Die Gültigkeitsdauer eines Eintrags in Sekunden.
+    """
+
+    def __init__(self, groesse: int = NUTZER_CACHE_GROESSE, ttl: float = NUTZER_CACHE_TTL_SEKUNDEN):
+        self.groesse = groesse
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._eintraege: OrderedDict = OrderedDict()
+        self._spalten = [attr.key for attr in inspect(models.Nutzer).column_attrs]
+
+    def hole(self, user_id: int):
+        """
+        Gibt die zwischengespeicherte Kopie eines Nutzers zurück.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+
+        Returns:
+            models.Nutzer | None: Die losgelöste Kopie oder None, wenn der Nutzer nicht (mehr) im Cache ist.
+        """
+        eintrag = self._eintraege.get(user_id)
+        if eintrag is None or eintrag[0] < time.monotonic():
+            if eintrag is not None:
+                del self._eintraege[user_id]
+            self.misses += 1
+            return None
+        self._eintraege.move_to_end(user_id)
+        self.hits += 1
+        return eintrag[1]
+
+    def speichere(self, user: models.Nutzer, generation: int) -> None:
+        """
+        Speichert eine Kopie eines aus der Datenbank geladenen Nutzers.
+
+        Wurde seit dem Laden (generation) ein Nutzer aus dem Cache entfernt, wird nicht gespeichert, damit
+        ein parallel geänderter Nutzer nicht mit veralteten Werten im Cache landet.
+
+        Args:
+            user (models.Nutzer): Der geladene Nutzer.
+            generation (int): Der Wert von generation vor der Datenbankabfrage.
+        """
+        if generation != self.generation:
+            return
+        kopie = models.Nutzer(**{spalte: getattr(user, spalte) for spalte in self._spalten})
+        make_transient_to_detached(kopie)
+        self._eintraege[user.user_id] = (time.monotonic() + self.ttl, kopie)
+        self._eintraege.move_to_end(user.user_id)
+        while len(self._eintraege) > self.groesse:
+            self._eintraege.popitem(last=False)
+
+    def entferne(self, user_id: int) -> None:
+        """
+        Entfernt einen Nutzer aus dem Cache, z. B. nach einer Änderung oder Deaktivierung.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+        """
+        self.generation += 1
+        self._eintraege.pop(user_id, None)
+
+    def statistik(self) -> dict:
+        """
+        Gibt die Kennzahlen des Caches zurück.
+
+        Returns:
+            dict: Anzahl der Einträge, Hits, Misses, Hit-Rate, Größe und TTL.
+        """
+        anfragen = self.hits + self.misses
+        return {"eintraege": len(self._eintraege), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / anfragen, 4) if anfragen else 0.0,
+                "groesse": self.groesse, "ttl_s": self.ttl}
+
+
+nutzer_cache = NutzerCache()
+
+
+class TokenSperrliste:
+    """
+    Sperrliste für die Claims in JWTs, z. B. nach einer Deaktivierung oder Rollenänderung.
+
+    Für jeden gesperrten Nutzer wird der Zeitpunkt der Sperre gespeichert; den Claims aller vorher
+    ausgestellten Tokens wird nicht mehr vertraut und der Nutzer wird wieder über die Datenbank geprüft.
+    Die Sperren stehen in der Tabelle token_sperren und werden höchstens alle
+    SPERRLISTE_AKTUALISIERUNG_SEKUNDEN neu geladen, sodass sie auch in anderen Worker-Prozessen greifen.
+    Geladen werden nur Sperren, die jünger als die Gültigkeit der Claims sind.
+    """
+
+    def __init__(self):
+        self._sperren = {}
+        self._geladen_am = None
+
+    async def aktualisiere(self, db: AsyncSession) -> None:
+        """
+        Lädt die Sperren aus der Datenbank, wenn der letzte Ladevorgang länger als
+        SPERRLISTE_AKTUALISIERUNG_SEKUNDEN zurückliegt.
+
+        Args:
+            db (AsyncSession): Die Datenbanksitzung.
+        """
+        jetzt = time.monotonic()
+        if self._geladen_am is not None and jetzt - self._geladen_am < SPERRLISTE_AKTUALISIERUNG_SEKUNDEN:
+            return
+        self._geladen_am = jetzt
+        grenze = datetime.utcnow() - timedelta(minutes=JWT_CLAIMS_TTL_MINUTES)
+        result = await db.execute(select(models.TokenSperre).where(models.TokenSperre.gesperrt_ab >= grenze))
+        self._sperren = {sperre.user_id: sperre.gesperrt_ab for sperre in result.scalars().all()}
+
+    def sperre(self, user_id: int, gesperrt_ab: datetime) -> None:
+        """
+        Trägt eine Sperre sofort in diesem Worker-Prozess ein.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+            gesperrt_ab (datetime): Der Zeitpunkt der Sperre (UTC).
+        """
+        self._sperren[user_id] = max(gesperrt_ab, self._sperren.get(user_id, gesperrt_ab))
+
+    def ist_gesperrt(self, user_id: int, ausgestellt_am: datetime) -> bool:
+        """
+        Prüft, ob den Claims eines Tokens wegen einer Sperre nicht mehr vertraut werden darf.
+
+        Args:
+            user_id (int): Die ID des Nutzers.
+            ausgestellt_am (datetime): Die Ausstellungszeit des Tokens (UTC).
+
+        Returns:
+            bool: True, wenn der Token vor oder in derselben Sekunde wie die Sperre ausgestellt wurde.
+        """
+        gesperrt_ab = self._sperren.get(user_id)
+        return gesperrt_ab is not None and ausgestellt_am <= gesperrt_ab
+
+
+token_sperrliste = TokenSperrliste()
+
+
+async def invalidiere_nutzer(db: AsyncSession, user_id: int) -> None:
+    """
+    Entfernt einen geänderten, deaktivierten oder gelöschten Nutzer aus dem nutzer_cache und sperrt die Claims
+    seiner bisher ausgestellten Tokens. Muss nach dem Commit der Änderung aufgerufen werden.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        user_id (int): Die ID des Nutzers.
+    """
+    nutzer_cache.entferne(user_id)
+    gesperrt_ab = datetime.utcnow().replace(microsecond=0)
+    token_sperrliste.sperre(user_id, gesperrt_ab)
+    stmt = insert(models.TokenSperre).values(user_id=user_id, gesperrt_ab=gesperrt_ab)
+    await db.execute(stmt.on_conflict_do_update(index_elements=["user_id"],
+                                                set_={"gesperrt_ab": stmt.excluded.gesperrt_ab}))
+    await db.commit()
+
+
+def create_access_token(data: dict, rolle: models.Rolle = None):
     """
     Erzeugt einen JWT (JSON Web Token) für die angegebenen Daten.
 
+    Wird eine Rolle übergeben, werden zusätzlich die Rolle, die Ausstellungszeit (iat) und das Ende der
+    Gültigkeit der Claims (cexp) in den Token geschrieben. get_current_claims kann dann ohne Datenbankabfrage
+    autorisieren, bis cexp erreicht ist oder der Nutzer gesperrt wird.
+
     Args:
         data (dict): Die Daten, die im Token gespeichert werden sollen.
+        rolle (models.Rolle): Die Rolle des Nutzers für den Claims-Modus.
 
     Returns:
         str: Der erstellte JWT.
     """
     to_encode = data.copy()
 
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    jetzt = datetime.utcnow()
+    expire = jetzt + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
+    if rolle is not None:
+        to_encode.update({"rolle": rolle.value, "iat": jetzt,
+                          "cexp": timegm((jetzt + timedelta(minutes=JWT_CLAIMS_TTL_MINUTES)).utctimetuple())})
 
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     return encoded_jwt
 
 
+def token_restlaufzeit(token: str) -> float:
+    """
+    Gibt die verbleibende Gültigkeit eines bereits geprüften JWTs in Sekunden zurück, etwa um eine
+    WebSocket-Verbindung bei Ablauf des Tokens zu schließen.
+
+    Args:
+        token (str): Der JWT des Benutzers.
+
+    Returns:
+        float: Die Sekunden bis zum Ablauf (exp), höchstens 0 bei abgelaufenen Tokens.
+    """
+    ablauf = jwt.get_unverified_claims(token).get("exp", 0)
+    return ablauf - timegm(datetime.utcnow().utctimetuple())
+
+
 def verify_access_token(token: str, credentials_exception):
     """
     Überprüft einen JWT (JSON Web Token) und gibt die darin enthaltenen Daten zurück, wenn der Token gültig ist.
@@ -65,7 +266,7 @@ def verify_access_token(token: str, credentials_exception):
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db_async)):
     """
-    Holt den aktuellen Benutzer anhand des JWTs aus der Datenbank.
+    Holt den aktuellen Benutzer anhand des JWTs aus dem nutzer_cache oder der Datenbank.
 
     Args:
         token (str): Der JWT des Benutzers.
@@ -79,6 +280,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
                                           headers={"WWW-Authenticate": "Bearer"})
 
     token_data = verify_access_token(token, credentials_exception)
+    cached_user = nutzer_cache.hole(token_data.id)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+
+    generation = nutzer_cache.generation
     stmt = (select(models.Nutzer).where(models.Nutzer.user_id == token_data.id)
             .where(or_(models.Nutzer.is_active == True, models.Nutzer.is_active.is_(None))))
     result = await db.execute(stmt)
@@ -89,4 +295,43 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
                             detail="Nutzer nicht gefunden oder bereits deaktiviert",
                             headers={"WWW-Authenticate": "Bearer"})
 
+    nutzer_cache.speichere(user, generation)
     return user
+
+
+async def get_current_claims(token: str = Depends(oauth2_scheme),
+                             db: AsyncSession = Depends(database.get_db_async)) -> schemas.TokenClaims:
+    """
+    Autorisiert anhand der Claims im JWT, ohne den Nutzer aus der Datenbank zu laden.
+
+    Das Ergebnis hat wie models.Nutzer die Attribute user_id und rolle und kann daher an die Rollenprüfungen
+    der Router übergeben werden. Enthält der Token keine Claims, sind sie abgelaufen (cexp) oder ist der Nutzer
+    seit der Ausstellung gesperrt, wird der Nutzer wie bei get_current_user geprüft.
+
+    Args:
+        token (str): Der JWT des Benutzers.
+        db (AsyncSession): Die Datenbankverbindung, nur für die Sperrliste und die Rückfallprüfung.
+
+    Returns:
+        schemas.TokenClaims: Die ID und die Rolle des Nutzers.
+    """
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                          detail="Could not validate credentials",
+                                          headers={"WWW-Authenticate": "Bearer"})
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+    except JWTError:
+        raise credentials_exception
+
+    user_id = payload.get("user_id")
+    rolle = payload.get("rolle")
+    if user_id is None:
+        raise credentials_exception
+
+    if rolle is not None and payload.get("cexp", 0) > timegm(datetime.utcnow().utctimetuple()):
+        await token_sperrliste.aktualisiere(db)
+        if not token_sperrliste.ist_gesperrt(user_id, datetime.utcfromtimestamp(payload.get("iat", 0))):
+            return schemas.TokenClaims(user_id=user_id, rolle=rolle)
+
+    user = await get_current_user(token, db)
+    return schemas.TokenClaims(user_id=user.user_id, rolle=user.rolle)
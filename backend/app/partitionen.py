@@ -0,0 +1,240 @@
+import asyncio
+from datetime import date, datetime
+from typing import Iterable, List
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app import models
+from app.database import engine
+
+TABELLE = models.DashboardSmartMeterData.__tablename__
+ALTE_TABELLE = f"{TABELLE}_unpartitioniert"
+# So viele Monate ab dem aktuellen legt der tägliche Job im Voraus an
+VORLAUF_MONATE = 2
+
+
+def _quote(name: str) -> str:
+    """
+    Setzt einen Tabellennamen in Anführungszeichen, damit die Groß- und Kleinschreibung erhalten bleibt.
+
+    Args:
+        name (str): Der Name der Tabelle.
+
+    Returns:
+        str: Der in Anführungszeichen gesetzte Name.
+    """
+    return f'"{name}"'
+
+
+def monatsbeginn(tag) -> date:
+    """
+    Gibt den ersten Tag des Monats zurück, in den ein Datum fällt.
+
+    Args:
+        tag (date | datetime): Das Datum.
+
+    Returns:
+        date: Der erste Tag des Monats.
+    """
+    return date(tag.year, tag.month, 1)
+
+
+def naechster_monat(monat: date) -> date:
+    """
+    Gibt den ersten Tag des Folgemonats zurück.
+
+    Args:
+        monat (date): Der erste Tag eines Monats.
+
+    Returns:
+        date: Der erste Tag des Folgemonats.
+    """
+    return date(monat.year + monat.month // 12, monat.month % 12 + 1, 1)
+
+
+def partitionsname(monat: date) -> str:
+    """
+    Gibt den Namen der Monatspartition von dashboard_smartmeter_data zurück.
+
+    Args:
+        monat (date): Ein Datum im Monat der Partition.
+
+    Returns:
+        str: Der Name der Partition, z. B. dashboard_smartmeter_data_2023_01.
+    """
+    return f"{TABELLE}_{monat.year:04d}_{monat.month:02d}"
+
+
+async def stelle_partitionen_sicher(conn, monate: Iterable[date]) -> List[str]:
+    """
+    Stellt sicher, dass für alle angegebenen Monate eine Partition existiert, bevor Daten importiert werden.
+
+    Vorhandene Partitionen werden über to_regclass erkannt, damit für sie kein DDL und damit keine
+    Sperre auf der Elterntabelle anfällt.
+
+    Args:
+        conn (AsyncSession | AsyncConnection): Die Sitzung oder Verbindung, auf der die Partitionen angelegt werden.
+        monate (Iterable[date]): Daten in den Monaten, für die eine Partition existieren muss.
+
+    Returns:
+        List[str]: Die Namen der neu angelegten Partitionen.
+    """
+    neu = []
+    for monat in sorted({monatsbeginn(m) for m in monate}):
+        name = partitionsname(monat)
+        vorhanden = await conn.execute(text("SELECT to_regclass(:name)"), {"name": _quote(name)})
+        if vorhanden.scalar() is not None:
+            continue
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_quote(name)} PARTITION OF {_quote(TABELLE)} "
+            f"FOR VALUES FROM ('{monat.isoformat()}') TO ('{naechster_monat(monat).isoformat()}')"
+        ))
+        neu.append(name)
+    return neu
+
+
+async def lege_partitionen_an(monate: Iterable[date]) -> List[str]:
+    """
+    Legt fehlende Monatspartitionen jeweils in einer eigenen, kurzen Transaktion an.
+
+    CREATE TABLE ... PARTITION OF sperrt die Elterntabelle exklusiv. Über eigene Transaktionen wird die Sperre
+    sofort wieder freigegeben, statt bis zum Ende eines Imports gehalten zu werden. Legt ein gleichzeitiger Upload
+    dieselbe Partition an, schlägt das CREATE eventuell fehl; existiert die Partition danach, wird der Fehler
+    ignoriert. Die Funktion darf nur aufgerufen werden, solange die Sitzung des Aufrufers noch keine Sperre
+    auf dashboard_smartmeter_data hält, sonst wartet das CREATE auf diese Sitzung.
+
+    Args:
+        monate (Iterable[date]): Daten in den Monaten, für die eine Partition existieren muss.
+
+    Returns:
+        List[str]: Die Namen der neu angelegten Partitionen.
+    """
+    neu = []
+    for monat in sorted({monatsbeginn(m) for m in monate}):
+        try:
+            async with engine.begin() as conn:
+                neu += await stelle_partitionen_sicher(conn, [monat])
+        except exc.DBAPIError:
+            async with engine.connect() as conn:
+                vorhanden = await conn.scalar(text("SELECT to_regclass(:name)"),
+                                              {"name": _quote(partitionsname(monat))})
+            if vorhanden is None:
+                raise
+    return neu
+
+
+async def lege_kommende_partitionen_an() -> dict:
+    """
+    Legt die Partitionen des aktuellen und der nächsten VORLAUF_MONATE Monate an, damit Uploads aktueller Daten
+    keine Partitionen anlegen müssen. Wird täglich über jobs.fuehre_aus ausgeführt.
+
+    Returns:
+        dict: Die Namen der neu angelegten Partitionen.
+    """
+    monat = monatsbeginn(date.today())
+    monate = [monat]
+    for _ in range(VORLAUF_MONATE):
+        monat = naechster_monat(monat)
+        monate.append(monat)
+    return {"angelegt": await lege_partitionen_an(monate)}
+
+
+async def liste_partitionen(db: AsyncSession) -> List[dict]:
+    """
+    Listet die angehängten Monatspartitionen von dashboard_smartmeter_data mit ihren Grenzen auf.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+
+    Returns:
+        List[dict]: Name und Partitionsgrenzen je Partition, nach Namen sortiert.
+    """
+    result = await db.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:tabelle) ORDER BY c.relname"
+    ), {"tabelle": _quote(TABELLE)})
+    return [{"partition": name, "grenzen": grenzen} for name, grenzen in result.all()]
+
+
+async def haenge_partition_ab(db: AsyncSession, monat: date) -> str:
+    """
+    Hängt die Partition eines Monats von dashboard_smartmeter_data ab.
+
+    Die Partition bleibt als eigenständige Tabelle erhalten und kann archiviert (z. B. mit pg_dump)
+    oder gelöscht werden. Die Rollups des Monats bleiben unverändert. Das Commit erfolgt durch den Aufrufer.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        monat (date): Ein Datum im abzuhängenden Monat.
+
+    Returns:
+        str: Der Name der abgehängten Tabelle.
+
+    Raises:
+        ValueError: Wenn für den Monat keine Partition existiert.
+    """
+    name = partitionsname(monat)
+    partitionen = [p["partition"] for p in await liste_partitionen(db)]
+    if name not in partitionen:
+        raise ValueError(f"Partition {name} existiert nicht")
+    await db.execute(text(f"ALTER TABLE {_quote(TABELLE)} DETACH PARTITION {_quote(name)}"))
+    return name
+
+
+async def migriere_zu_partitionen(conn: AsyncConnection) -> int:
+    """
+    Wandelt eine bestehende, nicht partitionierte dashboard_smartmeter_data in die partitionierte Form um.
+
+    Die alte Tabelle wird umbenannt, die neue Tabelle samt Index (haushalt_id, datum) aus dem Modell angelegt,
+    für jeden vorhandenen Monat eine Partition erstellt und die Daten übernommen. Die bestehende id-Sequenz
+    wird weiterverwendet. Zeilen ohne datum können nicht übernommen werden. Ist die Tabelle bereits
+    partitioniert, passiert nichts.
+
+    Args:
+        conn (AsyncConnection): Eine Verbindung mit offener Transaktion.
+
+    Returns:
+        int: Die Anzahl der übernommenen Zeilen.
+    """
+    relkind = await conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:tabelle)"),
+                                 {"tabelle": _quote(TABELLE)})
+    art = relkind.scalar()
+    if art is None or art == "p":
+        return 0
+
+    sequenz = models.smartmeter_id_seq.name
+    await conn.execute(text(f"ALTER SEQUENCE IF EXISTS {_quote(sequenz)} OWNED BY NONE"))
+    await conn.execute(text(f"ALTER TABLE {_quote(TABELLE)} ALTER COLUMN id DROP DEFAULT"))
+    await conn.execute(text(f"ALTER TABLE {_quote(TABELLE)} RENAME TO {_quote(ALTE_TABELLE)}"))
+    await conn.execute(text(f"ALTER INDEX IF EXISTS {_quote(TABELLE + '_pkey')} "
+                            f"RENAME TO {_quote(ALTE_TABELLE + '_pkey')}"))
+    await conn.execute(text(f"DROP INDEX IF EXISTS {_quote('ix_' + TABELLE + '_id')}"))
+
+    await conn.run_sync(lambda sync_conn: models.DashboardSmartMeterData.__table__.create(sync_conn,
+                                                                                         checkfirst=True))
+
+    monate = await conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', datum) FROM {_quote(ALTE_TABELLE)} WHERE datum IS NOT NULL"
+    ))
+    await stelle_partitionen_sicher(conn, [m for (m,) in monate.all()])
+
+    spalten = "id, haushalt_id, datum, pv_erzeugung, soc, batterie_leistung, zaehler, last, user_id"
+    result = await conn.execute(text(
+        f"INSERT INTO {_quote(TABELLE)} ({spalten}) "
+        f"SELECT {spalten} FROM {_quote(ALTE_TABELLE)} WHERE datum IS NOT NULL"
+    ))
+    await conn.execute(text(f"SELECT setval('{_quote(sequenz)}', "
+                            f"COALESCE((SELECT max(id) FROM {_quote(TABELLE)}), 0) + 1, false)"))
+    await conn.execute(text(f"DROP TABLE {_quote(ALTE_TABELLE)}"))
+    return result.rowcount
+
+
+async def _main():
+    async with engine.begin() as conn:
+        zeilen = await migriere_zu_partitionen(conn)
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {zeilen} Zeilen in die partitionierte Tabelle {TABELLE} übernommen")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,17 +1,17 @@
+import os
 import traceback
-from fastapi import APIRouter, Depends, status, HTTPException, Response
+from fastapi import APIRouter, Depends, status, HTTPException, Response, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, exc
 from sqlalchemy import exc
 from datetime import datetime, date, timedelta
-from app import models, schemas, database, oauth
+from app import models, schemas, database, oauth, partitionen, log_store, jobs
+from collections import Counter, defaultdict
+from typing import Dict, Union, List, Any, Optional
 import json
-from pathlib import Path
-from collections import defaultdict, Counter
-from typing import Dict, Union, List, Any
 import logging
 from logging.config import dictConfig
-from app.logger import LogConfig
+from app.logger import LogConfig, log_eintrag, verworfene_log_eintraege
 from app.config import Settings
 import csv
 import io
@@ -19,6 +19,9 @@ from fastapi.responses import StreamingResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+LOGS_SEITENGROESSE = 1000
+LOGS_MAX_SEITENGROESSE = 10000
+
 dictConfig(LogConfig().dict())
 logger = logging.getLogger("GreenEcoHub")
 
@@ -36,58 +39,60 @@ async def check_admin_role(current_user: models.Nutzer, method: str, endpoint: s
         HTTPException: Wenn der Benutzer kein Administrator ist.
     """
     if current_user.rolle != models.Rolle.Admin:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Admin",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nur Admins haben Zugriff auf diese Daten")
 
 
-async def check_log_file_existence(log_file_path: Path, current_user_id: int, endpoint: str) -> None:
+async def aktualisiere_log_store(db: AsyncSession, current_user_id: int, endpoint: str) -> None:
     """
-    Überprüft, ob die Protokolldatei unter dem angegebenen Pfad existiert.
+    Übernimmt neu geschriebene Log-Zeilen in die Tabelle log_eintraege, bevor eine Auswertung abgefragt wird.
+
+    Schlägt der Import fehl, wird der Fehler protokolliert und mit dem bisherigen Stand geantwortet.
 
     Args:
-        log_file_path (Path): Der Pfad der Protokolldatei.
+        db (AsyncSession): Die Datenbanksitzung.
         current_user_id (int): Die ID des aktuellen Benutzers.
         endpoint (str): Der Endpunkt, auf den zugegriffen wird.
-
-    Raises:
-        HTTPException: Wenn die Protokolldatei nicht existiert.
     """
-    if not log_file_path.exists():
-        logging_error = schemas.LoggingSchema(
+    try:
+        await log_store.importiere_logs(db)
+    except Exception as e:
+        await db.rollback()
+        logging_error = log_eintrag(
             user_id=current_user_id,
             endpoint=endpoint,
             method="GET",
-            message="Log-Datei existiert nicht",
+            message=f"Fehler beim Import der Log-Dateien: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
-        raise HTTPException(status_code=404, detail="Log-Datei nicht gefunden")
+        logger.error(logging_error)
 
 
-def handle_json_decode_error(e: Exception, current_user_id: int, endpoint: str) -> None:
+async def lies_tagesaggregate(db: AsyncSession, art: str, schluessel: Optional[str] = None) -> List[tuple]:
     """
-    Behandelt JSON-Dekodierungsfehler.
+    Liest die vom Log-Import gepflegten Tagesaggregate einer Art, nach Schlüssel und Datum sortiert.
 
     Args:
-        e (Exception): Die Ausnahme, die ausgelöst wurde.
-        current_user_id (int): Die ID des aktuellen Benutzers.
-        endpoint (str): Der Endpunkt, auf den zugegriffen wird.
+        db (AsyncSession): Die Datenbanksitzung.
+        art (str): Die Art der Aggregate, z. B. log_store.ENDPOINT.
+        schluessel (Optional[str]): Nur Aggregate mit diesem Schlüssel, z. B. log_store.EREIGNIS_LOGIN.
+
+    Returns:
+        List[tuple]: Schlüssel, Datum und Anzahl je Aggregat.
     """
-    logging_error = schemas.LoggingSchema(
-        user_id=current_user_id,
-        endpoint=endpoint,
-        method="GET",
-        message=f"Fehler beim Parsen der Log-Zeile: {str(e)}",
-        success=False
-    )
-    logger.error(logging_error.dict())
+    aggregat = models.LogTagesAggregat
+    query = select(aggregat.schluessel, aggregat.tag, aggregat.anzahl).where(aggregat.art == art)
+    if schluessel is not None:
+        query = query.where(aggregat.schluessel == schluessel)
+    result = await db.execute(query.order_by(aggregat.schluessel, aggregat.tag))
+    return result.all()
 
 
 @router.get("/dateUserOverview", status_code=status.HTTP_200_OK)
@@ -129,14 +134,14 @@ async def get_users(current_user: models.Nutzer = Depends(oauth.get_current_user
             yesterday_counter = Counter(yesterday_results)
             today_counter = Counter(today_results)
             formatted_data = {0: yesterday_counter, 1: today_counter}
-            logging_info = schemas.LoggingSchema(
+            logging_info = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/admin/userOverview",
                 method="GET",
                 message="Rollenübersicht erfolgreich abgerufen",
                 success=True
             )
-            logger.info(logging_info.dict())
+            logger.info(logging_info)
             return formatted_data
 
         except exc.IntegrityError as e:
@@ -146,255 +151,175 @@ async def get_users(current_user: models.Nutzer = Depends(oauth.get_current_user
             else:
                 logging_msg = f"Error beim User Abfragen: {e.orig}"
                 msg = "Es gab einen Fehler bei der user Abfrage."
-            logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/", method="GET",
-                                                message=logging_msg, success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=0, endpoint="/users/", method="GET",
+                                      message=logging_msg, success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
 
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/admin/userOverview",
             method="GET",
             message=f"Fehler beim Abrufen der Rollenübersicht: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Fehler beim Abrufen der Rollenübersicht")
 
 
 @router.get("/logOverview", status_code=status.HTTP_200_OK,
             response_model=List[schemas.BarChartData])
-async def get_log_overview(current_user: models.Nutzer = Depends(oauth.get_current_user)) \
+async def get_log_overview(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                           db: AsyncSession = Depends(database.get_db_async)) \
         -> List[schemas.BarChartData]:
     """
     Gibt einen Überblick über die Protokollaktivitäten nach Datum.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext stammt.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
         List[schemas.BarChartData]: Eine nach Datum zusammengefasste Liste von Protokollaktivitäten.
-
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff auf die Protokolldatei oder der Verarbeitung
-                       ihres Inhalts gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/logOverview")
-
-    log_file_path = Path("logs/server.log")
-    await check_log_file_existence(log_file_path, current_user.user_id, "/admin/logOverview")
-
-    activity_count = defaultdict(int)
-    with open(log_file_path, "r") as file:
-        for line in file:
-            try:
-                log_entry = json.loads(line)
-                date_str = log_entry["timestamp"].split(" ")[0]
-                date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-                activity_count[date] += 1
-            except (IndexError, ValueError) as e:
-                handle_json_decode_error(e, current_user.user_id, "/admin/logOverview")
-                continue
-
-    formatted_data = [{"date": date, "value": count} for date, count in activity_count.items()]
-    logging_obj = schemas.LoggingSchema(
+    aggregate = await lies_tagesaggregate(db, log_store.GESAMT)
+    formatted_data = [{"date": datum.strftime("%d.%m.%Y"), "value": count} for _, datum, count in aggregate]
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/admin/logOverview",
         method="GET",
         message="Log-Übersicht erfolgreich abgerufen",
         success=True)
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
     return formatted_data
 
 
 @router.get("/endpointOverview", status_code=status.HTTP_200_OK, response_model=List[Dict[str, Any]])
-async def get_endpoint_overview(current_user: models.Nutzer = Depends(oauth.get_current_user)) -> List[Dict[str, Any]]:
+async def get_endpoint_overview(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                                db: AsyncSession = Depends(database.get_db_async)) \
+        -> List[Dict[str, Any]]:
     """
     Gibt einen Überblick über die Endpunktaktivitäten, zusammengefasst nach Datum.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext stammt.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
         List[Dict[str, Any]]: Eine Liste von Endpunktaktivitäten, die jeweils die Endpunkt-ID und Datenpunkte für
         die Aktivität nach Datum enthalten.
-
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff auf die Protokolldatei oder der Verarbeitung ihres Inhalts gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/endpointOverview")
-    log_file_path = Path("logs/server.log")
-    await check_log_file_existence(log_file_path, current_user.user_id, "/admin/endpointOverview")
+    endpoint_activity = defaultdict(list)
+    for endpoint, datum, count in await lies_tagesaggregate(db, log_store.ENDPOINT):
+        endpoint_activity[endpoint].append({"x": datum.strftime("%d.%m.%Y"), "y": count})
 
-    endpoint_activity = defaultdict(Counter)
-    with open(log_file_path, "r") as file:
-        for line in file:
-            try:
-                log_entry = json.loads(line)
-                date_str = log_entry["timestamp"].split(" ")[0]
-                date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-                endpoint = log_entry["endpoint"]
-                endpoint_activity[endpoint][date] += 1
-            except (KeyError, json.JSONDecodeError) as e:
-                handle_json_decode_error(e, current_user.user_id, "/admin/endpointOverview")
-                continue  # Ungültige Zeilen werden automatisch übersprungen
-
-    formatted_data = [{"id": endpoint, "data":
-        [{"x": date, "y": count} for date, count in dates.items()]} for endpoint, dates in endpoint_activity.items()]
-    logging_info = schemas.LoggingSchema(
+    formatted_data = [{"id": endpoint, "data": data} for endpoint, data in endpoint_activity.items()]
+    logging_info = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/admin/endpointOverview",
         method="GET",
         message="Endpoint-Übersicht erfolgreich abgerufen",
         success=True
     )
-    logger.info(logging_info.dict())
+    logger.info(logging_info)
     return formatted_data
 
 
 @router.get("/successOverview", status_code=status.HTTP_200_OK,
             response_model=Dict[str, List[Dict[str, Union[str, int]]]])
-async def get_success_overview(current_user: models.Nutzer = Depends(oauth.get_current_user)) \
+async def get_success_overview(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                               db: AsyncSession = Depends(database.get_db_async)) \
         -> Dict[str, List[Dict[str, Union[str, int]]]]:
     """
     Verschafft einen Überblick über erfolgreiche und fehlgeschlagene Anfragen.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext stammt.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
         Dict[str, List[Dict[str, Union[str, int]]]]: Ein Wörterbuch mit separaten Listen von erfolgreichen
                                                      und fehlgeschlagenen Anfragen, zusammengefasst nach Datum.
-
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff auf die Protokolldatei oder der Verarbeitung ihres Inhalts gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/successOverview")
-    log_file_path = Path("logs/server.log")
-    await check_log_file_existence(log_file_path, current_user.user_id, "/admin/successOverview")
-
     success_activity = defaultdict(lambda: {'success': 0, 'fail': 0})
-    with open(log_file_path, "r") as file:
-        for line in file:
-            try:
-                log_entry = json.loads(line)
-                date_str = log_entry["timestamp"].split(" ")[0]
-                date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-                success_flag = log_entry["success"]
-                if success_flag:
-                    success_activity[date]['success'] += 1
-                else:
-                    success_activity[date]['fail'] += 1
-            except json.JSONDecodeError as e:
-                handle_json_decode_error(e, current_user.user_id, "/admin/successOverview")
-                continue  # Ungültige Zeilen werden automatisch übersprungen
+    for art, datum, count in sorted(await lies_tagesaggregate(db, log_store.ERFOLG), key=lambda zeile: zeile[1]):
+        success_activity[datum.strftime("%d.%m.%Y")][art] += count
 
     success_data = [{"date": date, "value": data['success']} for date, data in success_activity.items()]
     fail_data = [{"date": date, "value": data['fail']} for date, data in success_activity.items()]
 
-    logging_info = schemas.LoggingSchema(
+    logging_info = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/admin/successOverview",
         method="GET",
         message="Erfolgsübersicht erfolgreich abgerufen",
         success=True
     )
-    logger.info(logging_info.dict())
+    logger.info(logging_info)
 
     return {"success": success_data, "fail": fail_data}
 
 
 @router.get("/registrationOverview", status_code=status.HTTP_200_OK, response_model=List[schemas.BarChartData])
-async def get_registration_overview(current_user: models.Nutzer = Depends(oauth.get_current_user)) \
+async def get_registration_overview(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                                    db: AsyncSession = Depends(database.get_db_async)) \
         -> List[schemas.ChartData]:
     """
     Gibt einen Überblick über die Benutzerregistrierungen nach Datum.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext stammt.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
         List[schemas.ChartData]: Eine Liste der Anzahl der Benutzerregistrierungen, zusammengefasst nach Datum.
-
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff auf die Protokolldatei oder der Verarbeitung
-                       ihres Inhalts gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/registrationOverview")
-    log_file_path = Path("logs/server.log")
-    await check_log_file_existence(log_file_path, current_user.user_id, "/admin/registrationOverview")
-
-    registration_count = defaultdict(int)
-    with open(log_file_path, "r") as file:
-        for line in file:
-            try:
-                log_entry = json.loads(line)
-                if log_entry.get("message") == "User registriert":
-                    date_str = log_entry["timestamp"].split(" ")[0]
-                    date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-
-                    registration_count[date] += 1
-            except(IndexError, json.JSONDecodeError) as e:
-                handle_json_decode_error(e, current_user.user_id, "/admin/registrationOverview")
-                continue
-
-    formatted_data = [{"date": date, "value": count} for date, count in registration_count.items()]
-    logging_info = schemas.LoggingSchema(
+    aggregate = await lies_tagesaggregate(db, log_store.EREIGNIS, log_store.EREIGNIS_REGISTRIERUNG)
+    formatted_data = [{"date": datum.strftime("%d.%m.%Y"), "value": count} for _, datum, count in aggregate]
+    logging_info = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/admin/registrationOverview",
         method="GET",
         message="Registrierungsübersicht erfolgreich abgerufen",
         success=True
     )
-    logger.info(logging_info.dict())
+    logger.info(logging_info)
     return formatted_data
 
 
 @router.get("/loginOverview", status_code=status.HTTP_200_OK,
             response_model=List[schemas.BarChartData])
-async def get_login_overview(current_user: models.Nutzer = Depends(oauth.get_current_user)) \
+async def get_login_overview(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                             db: AsyncSession = Depends(database.get_db_async)) \
         -> List[schemas.ChartData]:
     """
     Übersicht der Benutzeranmeldungen nach Datum.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext stammt.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
         List[schemas.ChartData]: Eine Liste der Anzahl der Benutzeranmeldungen, zusammengefasst nach Datum.
-
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff auf die Protokolldatei oder der Verarbeitung ihres Inhalts gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/loginOverview")
-    log_file_path = Path("logs/server.log")
-    await check_log_file_existence(log_file_path, current_user.user_id, "/admin/loginOverview")
-
-    login_count = defaultdict(int)
-    with open(log_file_path, "r") as file:
-        for line in file:
-            try:
-                log_entry = json.loads(line)
-                if log_entry.get("message") == "User eingeloggt":
-                    date_str = log_entry["timestamp"].split(" ")[0]
-                    date = datetime.strptime(date_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-                    login_count[date] += 1
-            except(IndexError, json.JSONDecodeError) as e:
-                handle_json_decode_error(e, current_user.user_id, "/admin/loginOverview")
-                continue
-
-    formatted_data = [{"date": date, "value": count} for date, count in login_count.items()]
-    logging_info = schemas.LoggingSchema(
+    aggregate = await lies_tagesaggregate(db, log_store.EREIGNIS, log_store.EREIGNIS_LOGIN)
+    formatted_data = [{"date": datum.strftime("%d.%m.%Y"), "value": count} for _, datum, count in aggregate]
+    logging_info = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/admin/loginOverview",
         method="GET",
         message="Login-Übersicht erfolgreich abgerufen",
         success=True
     )
-    logger.info(logging_info.dict())
+    logger.info(logging_info)
     return formatted_data
 
 
@@ -429,14 +354,14 @@ async def get_user_overview(current_user: models.Nutzer = Depends(oauth.get_curr
             role_count = Counter(users_role)
 
             formatted_data = [{"id": role, "label": role, "value": count} for role, count in role_count.items()]
-            logging_info = schemas.LoggingSchema(
+            logging_info = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/admin/userOverview",
                 method="GET",
                 message="Rollenübersicht erfolgreich abgerufen",
                 success=True
             )
-            logger.info(logging_info.dict())
+            logger.info(logging_info)
             return formatted_data
 
         except exc.IntegrityError as e:
@@ -446,87 +371,157 @@ async def get_user_overview(current_user: models.Nutzer = Depends(oauth.get_curr
             else:
                 logging_msg = f"Error beim User Abfragen: {e.orig}"
                 msg = "Es gab einen Fehler bei der user Abfrage."
-            logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/", method="GET",
-                                                message=logging_msg, success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=0, endpoint="/users/", method="GET",
+                                      message=logging_msg, success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/admin/userOverview",
             method="GET",
             message=f"Fehler beim Abrufen der Rollenübersicht: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Fehler beim Abrufen der Rollenübersicht")
 
 
+def log_eintrag_zu_dict(eintrag: models.LogEintrag) -> Dict[str, Any]:
+    """
+    Wandelt einen LogEintrag in das Format von schemas.LogEntry um.
+
+    Args:
+        eintrag (models.LogEintrag): Der Log-Eintrag aus der Datenbank.
+
+    Returns:
+        Dict[str, Any]: Der Log-Eintrag mit dem Zeitstempel im Format der Log-Datei.
+    """
+    return {
+        "log_id": eintrag.log_id,
+        "timestamp": log_store.formatiere_zeitstempel(eintrag.timestamp),
+        "level": eintrag.level,
+        "name": eintrag.name,
+        "message": eintrag.message,
+        "user_id": eintrag.user_id,
+        "endpoint": eintrag.endpoint,
+        "method": eintrag.method,
+        "success": eintrag.success,
+    }
+
+
 @router.get("/logs", status_code=status.HTTP_200_OK, response_model=List[schemas.LogEntry])
-async def get_logs(current_user: models.Nutzer = Depends(oauth.get_current_user)) -> List[schemas.LogEntry]:
+async def get_logs(response: Response,
+                   cursor: Optional[int] = Query(None, description="log_id des letzten Eintrags der vorherigen Seite"),
+                   limit: Optional[int] = Query(None, ge=1, le=LOGS_MAX_SEITENGROESSE),
+                   absteigend: bool = Query(False, description="Neueste Einträge zuerst"),
+                   level: Optional[str] = Query(None),
+                   endpoint: Optional[str] = Query(None),
+                   user_id: Optional[int] = Query(None),
+                   success: Optional[bool] = Query(None),
+                   von: Optional[datetime] = Query(None, description="Frühester Zeitstempel (inklusive)"),
+                   bis: Optional[datetime] = Query(None, description="Spätester Zeitstempel (exklusive)"),
+                   stream: bool = Query(False, description="Einträge als NDJSON streamen"),
+                   current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                   db: AsyncSession = Depends(database.get_db_async)):
     """
-    Alle Protokolleinträge abrufen.
+    Protokolleinträge seitenweise und gefiltert abrufen.
+
+    Die Einträge werden nach log_id sortiert, mit absteigend=true die neuesten zuerst. Für die nächste Seite wird
+    die log_id des letzten Eintrags als cursor übergeben, sie steht zusätzlich im Header X-Next-Cursor, solange weitere Einträge folgen können.
+    Mit stream=true werden alle passenden Einträge ab dem cursor zeilenweise als NDJSON gestreamt,
+    ohne limit unbegrenzt.
 
     Args:
-        current_user (models.Nutzer): Das Benutzerobjekt, das aus dem aktuellen Anfragekontext bezogen wird.
+        response (Response): Die Antwort, in der der Header X-Next-Cursor gesetzt wird.
+        cursor (Optional[int]): Es werden nur Einträge mit größerer (absteigend: kleinerer) log_id zurückgegeben.
+        limit (Optional[int]): Die maximale Anzahl der Einträge, standardmäßig LOGS_SEITENGROESSE.
+        absteigend (bool): Ob die neuesten Einträge zuerst zurückgegeben werden.
+        level (Optional[str]): Filter auf das Log-Level, z. B. ERROR.
+        endpoint (Optional[str]): Filter auf den Endpunkt.
+        user_id (Optional[int]): Filter auf den Nutzer.
+        success (Optional[bool]): Filter auf erfolgreiche bzw. fehlgeschlagene Anfragen.
+        von (Optional[datetime]): Frühester Zeitstempel (inklusive).
+        bis (Optional[datetime]): Spätester Zeitstempel (exklusive).
+        stream (bool): Ob die Einträge als NDJSON gestreamt werden.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung.
 
     Returns:
-        List[schemas.LogEntry]: Eine Liste von Protokolleinträgen.
+        List[schemas.LogEntry] | StreamingResponse: Eine Seite von Protokolleinträgen oder der NDJSON-Stream.
 
     Raises:
-        HTTPException: Wenn es ein Problem mit dem Zugriff oder der Verarbeitung der Protokolldatei gibt.
+        HTTPException: Wenn es ein Problem beim Abrufen der Protokolleinträge gibt.
     """
     await check_admin_role(current_user, method="GET", endpoint="/logs")
+    await aktualisiere_log_store(db, current_user.user_id, "/admin/logs")
+
+    stmt = (
+        select(models.LogEintrag)
+        .where(models.LogEintrag.timestamp.isnot(None), models.LogEintrag.level.isnot(None),
+               models.LogEintrag.name.isnot(None), models.LogEintrag.user_id.isnot(None),
+               models.LogEintrag.endpoint.isnot(None), models.LogEintrag.method.isnot(None),
+               models.LogEintrag.message.isnot(None), models.LogEintrag.success.isnot(None))
+        .order_by(models.LogEintrag.log_id.desc() if absteigend else models.LogEintrag.log_id)
+    )
+    if cursor is not None:
+        stmt = stmt.where(models.LogEintrag.log_id < cursor if absteigend else models.LogEintrag.log_id > cursor)
+    if level is not None:
+        stmt = stmt.where(models.LogEintrag.level == level.upper())
+    if endpoint is not None:
+        stmt = stmt.where(models.LogEintrag.endpoint == endpoint)
+    if user_id is not None:
+        stmt = stmt.where(models.LogEintrag.user_id == user_id)
+    if success is not None:
+        stmt = stmt.where(models.LogEintrag.success == success)
+    if von is not None:
+        stmt = stmt.where(models.LogEintrag.timestamp >= von)
+    if bis is not None:
+        stmt = stmt.where(models.LogEintrag.timestamp < bis)
+
+    if stream:
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        async def ndjson_zeilen():
+            try:
+                result = await db.stream(stmt.execution_options(yield_per=LOGS_SEITENGROESSE))
+                async for eintrag in result.scalars():
+                    yield json.dumps(log_eintrag_zu_dict(eintrag)) + "\n"
+            except Exception as e:
+                logging_error = log_eintrag(
+                    user_id=current_user.user_id,
+                    endpoint="/admin/logs",
+                    method="GET",
+                    message=f"Fehler beim Streamen der Logs: {str(e)}",
+                    success=False
+                )
+                logger.error(logging_error)
+                raise
+
+        return StreamingResponse(ndjson_zeilen(), media_type="application/x-ndjson")
+
+    limit = limit or LOGS_SEITENGROESSE
     try:
-        log_file_path = Path("logs/server.log")
-
-        if not log_file_path.exists() or log_file_path.stat().st_size == 0:
-            logging_error = schemas.LoggingSchema(
-                user_id=current_user.user_id,
-                endpoint="/admin/logs",
-                method="GET",
-                message="Log-Datei existiert nicht oder ist leer",
-                success=False
-            )
-            logger.error(logging_error.dict())
-
-        logs = []
-        with open(log_file_path, 'r') as file:
-            for (ind, line) in enumerate(file):
-                try:
-                    log_entry = json.loads(line)
-                    log_entry["log_id"] = ind
-                    try:
-                        schemas.LogEntry.from_orm(log_entry)
-                        logs.append(log_entry)
-                    except Exception as e:
-                        logging_error = schemas.LoggingSchema(
-                            user_id=current_user.user_id,
-                            endpoint="/admin/logs",
-                            method="GET",
-                            message=f"Validierungsfehler: {str(e)}",
-                            success=False
-                        )
-                        logger.error(logging_error.dict())
-                        continue
-                except json.JSONDecodeError as e:
-                    handle_json_decode_error(e, current_user.user_id, "/admin/logs")
-                    continue
-
-        return logs
+        result = await db.execute(stmt.limit(limit))
+        logs = [log_eintrag_zu_dict(eintrag) for eintrag in result.scalars().all()]
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/admin/logs",
             method="GET",
             message=f"Fehler beim Abrufen der Logs: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fehler beim Abrufen der Logs")
 
+    if len(logs) == limit:
+        response.headers["X-Next-Cursor"] = str(logs[-1]["log_id"])
+    return logs
+
 
 @router.post("/kalendereintrag", status_code=status.HTTP_201_CREATED)
 async def create_kalender_eintrag(eintrag: schemas.KalenderEintragCreate,
@@ -564,25 +559,25 @@ async def create_kalender_eintrag(eintrag: schemas.KalenderEintragCreate,
         await db.commit()
         await db.refresh(db_eintrag)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kalendereintrag/",
             method="POST",
             message="Neuer Kalendereintrag erstellt",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return db_eintrag
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kalendereintrag",
             method="POST",
             message=f"Fehler beim Erstellen eines Kalendereintrags: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -608,14 +603,14 @@ async def get_kalendereintraege(db: AsyncSession = Depends(database.get_db_async
         result = await db.execute(stmt)
         eintraege = result.scalars().all()
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kalendereintrag/",
             method="GET",
             message="Alle Kalendereinträge erfolgreich abgerufen",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return [{
             "beschreibung": eintrag.beschreibung,
@@ -625,14 +620,14 @@ async def get_kalendereintraege(db: AsyncSession = Depends(database.get_db_async
         } for eintrag in eintraege]
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kalendereintrag/",
             method="GET",
             message=f"Fehler beim Abrufen von Kalendereinträgen: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -658,35 +653,35 @@ async def get_kalendereintrag(eintrag_id: int, db: AsyncSession = Depends(databa
     try:
         db_eintrag = await db.get(models.Kalendereintrag, eintrag_id)
         if db_eintrag is None:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kalendereintrag/{eintrag_id}",
                 method="GET",
                 message=f"Kalendereintrag {eintrag_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Kalendereintrag nicht gefunden")
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="GET",
             message=f"Kalendereintrag {eintrag_id} erfolgreich abgerufen",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return db_eintrag
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="GET",
             message=f"Fehler beim Abrufen des Kalendereintrags {eintrag_id}: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -713,14 +708,14 @@ async def update_kalendereintrag(eintrag_id: int, eintrag_data: schemas.Kalender
     try:
         db_eintrag = await db.get(models.Kalendereintrag, eintrag_id)
         if db_eintrag is None:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kalendereintrag/{eintrag_id}",
                 method="PUT",
                 message=f"Kalendereintrag {eintrag_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Kalendereintrag nicht gefunden")
 
         for key, value in eintrag_data.dict().items():
@@ -729,25 +724,25 @@ async def update_kalendereintrag(eintrag_id: int, eintrag_data: schemas.Kalender
         await db.commit()
         await db.refresh(db_eintrag)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="PUT",
             message=f"Kalendereintrag {eintrag_id} aktualisiert",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return db_eintrag
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="PUT",
             message=f"Fehler beim Aktualisieren des Kalendereintrags {eintrag_id}: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -772,43 +767,43 @@ async def delete_kalendereintrag(eintrag_id: int, db: AsyncSession = Depends(dat
     try:
         db_eintrag = await db.get(models.Kalendereintrag, eintrag_id)
         if db_eintrag is None:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kalendereintrag/{eintrag_id}",
                 method="DELETE",
                 message=f"Kalendereintrag {eintrag_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Kalendereintrag nicht gefunden")
 
         await db.delete(db_eintrag)
         await db.commit()
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="PUT",
             message=f"Kalendereintrag {eintrag_id} gelöscht",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kalendereintrag/{eintrag_id}",
             method="DELETE",
             message=f"Fehler beim Löschen des Kalendereintrags {eintrag_id}: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/download_reports_dashboard", status_code=status.HTTP_200_OK)
-async def download_reports_dashboard(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_dashboard(db: AsyncSession = Depends(database.get_db_async_readonly),
                                      current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Ladet einen Dashboard-Bericht herunter, der verschiedene Metriken zusammenfasst, darunter die Gesamtzahl der Nutzer,
@@ -830,13 +825,10 @@ async def download_reports_dashboard(db: AsyncSession = Depends(database.get_db_
         # Gesamtanzahl Nutzer
         total_users = await db.execute(select(func.count(models.Nutzer.user_id)))
 
-        # Anzahl Backend Aufrufe 
-        backend_calls = 0
-        with open("logs/server.log", "r") as file:
-            for line in file:
-                log_entry = json.loads(line)
-                if log_entry.get("level") == "INFO":
-                    backend_calls += 1
+        # Anzahl Backend Aufrufe, die Logs werden minütlich vom Scheduler importiert, da die Sitzung auf der
+        # Replica nicht schreiben darf
+        backend_calls = await db.execute(
+            select(func.count(models.LogEintrag.log_id)).where(models.LogEintrag.level == "INFO"))
         # Neue Kontaktanfragen für Energieausweise und PVAnlagen
         new_energy_requests = await db.execute(select(func.count(models.Energieausweise.energieausweis_id)).where(
             models.Energieausweise.ausweis_status == "AnfrageGestellt"))
@@ -864,7 +856,7 @@ async def download_reports_dashboard(db: AsyncSession = Depends(database.get_db_
 
         # Schreiben der Daten
         writer.writerow(["Gesamtanzahl Nutzer", total_users.scalar()])
-        writer.writerow(["Backend Aufrufe", backend_calls])
+        writer.writerow(["Backend Aufrufe", backend_calls.scalar()])
         writer.writerow(["Neue Energieanfragen", new_energy_requests.scalar()])
         writer.writerow(["Neue PV Anfragen", new_pv_requests.scalar()])
         writer.writerow(["Anzahl Admins", admin_count.scalar()])
@@ -884,7 +876,7 @@ async def download_reports_dashboard(db: AsyncSession = Depends(database.get_db_
 
 
 @router.get("/download_reports_vertrag", status_code=status.HTTP_200_OK)
-async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_async_readonly),
                                    current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Ladet einen Bericht über alle Verträge im CSV-Format herunter.
@@ -938,7 +930,7 @@ async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_as
 
 
 @router.get("/download_reports_rechnungen", status_code=status.HTTP_200_OK)
-async def download_reports_rechnung(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_rechnung(db: AsyncSession = Depends(database.get_db_async_readonly),
                                     current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Ladet einen Bericht mit allen Rechnungen im CSV-Format herunter.
@@ -996,7 +988,7 @@ async def download_reports_rechnung(db: AsyncSession = Depends(database.get_db_a
 
 
 @router.get("/download_reports_energieausweise", status_code=status.HTTP_200_OK)
-async def download_reports_eausweis(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_eausweis(db: AsyncSession = Depends(database.get_db_async_readonly),
                                     current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Ladet einen Bericht über alle Energieausweise im CSV-Format herunter.
@@ -1073,6 +1065,7 @@ async def activate_user(user_id: int, db: AsyncSession = Depends(database.get_db
     if user_to_activate:
         user_to_activate.is_active = True
         await db.commit()
+        oauth.nutzer_cache.entferne(user_id)
         return {"message": f"User with ID {user_id} has been activated."}
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nutzer nicht gefunden.")
@@ -1097,6 +1090,195 @@ async def deactivate_user(user_id: int, db: AsyncSession = Depends(database.get_
     if user_to_deactivate:
         user_to_deactivate.is_active = False
         await db.commit()
+        await oauth.invalidiere_nutzer(db, user_id)
         return {"message": f"User with ID {user_id} has been deactivated."}
     else:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nutzer nicht gefunden.")
+
+
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+async def get_db_pool_statistik(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Gibt den Zustand und die Kennzahlen des Connection-Pools dieses Worker-Prozesses zurück.
+
+    Args:
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        dict: Ausgegebene und freie Verbindungen, Overflow, Wartezeiten und Timeouts des Pools sowie der Zustand
+        der Replica.
+    """
+    await check_admin_role(current_user, "GET", "/db-pool")
+    return {"pid": os.getpid(), **database.engine.pool.statistik(), "replica": database.replica_status.statistik()}
+
+
+@router.get("/nutzer-cache", status_code=status.HTTP_200_OK)
+async def get_nutzer_cache_statistik(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Gibt die Kennzahlen des Nutzer-Caches von get_current_user in diesem Worker-Prozess zurück.
+
+    Args:
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        dict: Anzahl der Einträge, Hits, Misses, Hit-Rate, Größe und TTL des Caches.
+    """
+    await check_admin_role(current_user, "GET", "/nutzer-cache")
+    return oauth.nutzer_cache.statistik()
+
+
+@router.get("/logging", status_code=status.HTTP_200_OK)
+async def get_logging_statistik(current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Gibt die Anzahl der Log-Records zurück, die dieser Worker-Prozess wegen voller Log-Queue verworfen hat.
+
+    Args:
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        dict: Die Prozess-ID und die Anzahl der verworfenen Log-Records seit dem Start des Prozesses.
+    """
+    await check_admin_role(current_user, "GET", "/logging")
+    return {"pid": os.getpid(), "verworfen": verworfene_log_eintraege()}
+
+
+@router.get("/jobs", status_code=status.HTTP_200_OK, response_model=List[schemas.JobUebersicht])
+async def get_jobs(db: AsyncSession = Depends(database.get_db_async),
+                   current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Gibt alle geplanten Jobs mit ihrem jeweils letzten Lauf zurück.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        List[schemas.JobUebersicht]: Name und letzter Lauf jedes Jobs.
+    """
+    await check_admin_role(current_user, "GET", "/jobs")
+    uebersicht = []
+    for name in jobs.JOBS:
+        letzter_lauf = await db.scalar(select(models.JobLauf).where(models.JobLauf.job == name)
+                                       .order_by(models.JobLauf.gestartet_am.desc()).limit(1))
+        uebersicht.append(schemas.JobUebersicht(job=name, letzter_lauf=letzter_lauf))
+    return {"success": success_data, "fail": fail_data}
+
+
+@router.get("/jobs/{job}/laeufe", status_code=status.HTTP_200_OK, response_model=List[schemas.JobLaufResponse])
+async def get_job_laeufe(job: str, limit: int = Query(20, ge=1, le=500),
+                         db: AsyncSession = Depends(database.get_db_async),
+                         current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Gibt die letzten Läufe eines Jobs mit Dauer und Ergebnis zurück, der neueste zuerst.
+
+    Args:
+        job (str): Der Name des Jobs.
+        limit (int): Die maximale Anzahl der Läufe.
+        db (AsyncSession): Die Datenbanksitzung.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        List[schemas.JobLaufResponse]: Die Läufe des Jobs.
+
+    Raises:
+        HTTPException: Wenn der Job nicht existiert.
+    """
+    await check_admin_role(current_user, "GET", "/jobs/{job}/laeufe")
+    if job not in jobs.JOBS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job nicht gefunden")
+    result = await db.execute(select(models.JobLauf).where(models.JobLauf.job == job)
+                              .order_by(models.JobLauf.gestartet_am.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.post("/jobs/{job}/ausfuehren", status_code=status.HTTP_200_OK, response_model=schemas.JobLaufResponse)
+async def job_ausfuehren(job: str, current_user: schemas.TokenClaims = Depends(oauth.get_current_claims)):
+    """
+    Startet einen Job sofort und wartet auf sein Ergebnis.
+
+    Args:
+        job (str): Der Name des Jobs.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+
+    Returns:
+        schemas.JobLaufResponse: Der protokollierte Lauf.
+
+    Raises:
+        HTTPException: Wenn der Job nicht existiert oder gerade von einem anderen Prozess ausgeführt wird.
+    """
+    await check_admin_role(current_user, "POST", "/jobs/{job}/ausfuehren")
+    if job not in jobs.JOBS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job nicht gefunden")
+    lauf = await jobs.fuehre_aus(job, ausgeloest_von=current_user.user_id)
+    if lauf is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job wird bereits ausgeführt")
+    logging_obj = log_eintrag(
+        user_id=current_user.user_id,
+        endpoint=f"/admin/jobs/{job}/ausfuehren",
+        method="POST",
+        message=f"Job {job} manuell gestartet: {lauf.status}",
+        success=lauf.status == jobs.ERFOLGREICH
+    )
+    logger.info(logging_obj)
+    return lauf
+
+
+@router.get("/smartmeter-partitionen", status_code=status.HTTP_200_OK)
+async def get_smartmeter_partitionen(db: AsyncSession = Depends(database.get_db_async),
+                                     current_user: models.Nutzer = Depends(oauth.get_current_user)):
+    """
+    Listet die Monatspartitionen der Smart-Meter-Daten auf.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        current_user (models.Nutzer): Das aus dem aktuellen Anfragekontext erhaltene Benutzerobjekt.
+
+    Returns:
+        List[dict]: Name und Partitionsgrenzen je Partition.
+    """
+    await check_admin_role(current_user, "GET", "/smartmeter-partitionen")
+    return await partitionen.liste_partitionen(db)
+
+
+@router.put("/smartmeter-partitionen/{monat}/abhaengen", status_code=status.HTTP_200_OK)
+async def detach_smartmeter_partition(monat: str, db: AsyncSession = Depends(database.get_db_async),
+                                      current_user: models.Nutzer = Depends(oauth.get_current_user)):
+    """
+    Hängt die Partition eines Monats von den Smart-Meter-Daten ab, damit sie archiviert oder gelöscht werden kann.
+
+    Args:
+        monat (str): Der Monat im Format YYYY-MM.
+        db (AsyncSession): Die Datenbanksitzung.
+        current_user (models.Nutzer): Das aus dem aktuellen Anfragekontext erhaltene Benutzerobjekt.
+
+    Returns:
+        dict: Eine Nachricht mit dem Namen der abgehängten Tabelle.
+
+    Raises:
+        HTTPException: Wenn das Format ungültig ist oder keine Partition für den Monat existiert.
+    """
+    await check_admin_role(current_user, "PUT", "/smartmeter-partitionen/{monat}/abhaengen")
+    try:
+        monatsbeginn = datetime.strptime(monat, "%Y-%m").date()
+        tabelle = await partitionen.haenge_partition_ab(db, monatsbeginn)
+        await db.commit()
+    except ValueError as e:
+        logging_error = log_eintrag(
+            user_id=current_user.user_id,
+            endpoint="/admin/smartmeter-partitionen/{monat}/abhaengen",
+            method="PUT",
+            message=f"Partition konnte nicht abgehängt werden: {str(e)}",
+            success=False
+        )
+        logger.error(logging_error)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    logging_info = log_eintrag(
+        user_id=current_user.user_id,
+        endpoint="/admin/smartmeter-partitionen/{monat}/abhaengen",
+        method="PUT",
+        message=f"Partition {tabelle} abgehängt",
+        success=True
+    )
+    logger.info(logging_info)
+    return {"message": f"Partition {tabelle} wurde abgehängt und kann archiviert werden."}
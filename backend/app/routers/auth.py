@@ -7,7 +7,7 @@ import logging
 from app import models, schemas, database, config
 from app import schemas, database, models, hashing, oauth
 
-from app.logger import LogConfig
+from app.logger import LogConfig, log_eintrag
 
 dictConfig(LogConfig().dict())
 logger = logging.getLogger("GreenEcoHub")
@@ -37,27 +37,28 @@ async def login(user_creds: schemas.NutzerLogin, db: AsyncSession = Depends(data
         res = await db.execute(stmt)
         db_user = res.scalars().first()
         if db_user is None:
-            logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/auth/login", method="POST",
-                                                message="User not found", success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=0, endpoint="/auth/login", method="POST",
+                                      message="User not found", success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nutzer nicht gefunden")
 
         if not db_user.is_active:
-            logging_obj = schemas.LoggingSchema(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
-                                                message="User not active", success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
+                                      message="User not active", success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nutzer ist nicht aktiviert")
 
-        if not hashing.Hashing.verify_password(user_creds.passwort, db_user.passwort):
-            logging_obj = schemas.LoggingSchema(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
-                                                message="Wrong password", success=False)
-            logger.error(logging_obj.dict())
+        if not await hashing.Hashing.verify_password_async(user_creds.passwort, db_user.passwort):
+            logging_obj = log_eintrag(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
+                                      message="Wrong password", success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Passwort falsch")
 
-        access_token = oauth.create_access_token(data={"user_id": db_user.user_id})
-        logging_obj = schemas.LoggingSchema(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
-                                            message="User eingeloggt", success=True)
-        logger.info(logging_obj.dict())
+        access_token = oauth.create_access_token(data={"user_id": db_user.user_id},
+                                                   rolle=db_user.rolle if oauth.JWT_CLAIMS else None)
+        logging_obj = log_eintrag(user_id=db_user.user_id, endpoint="/auth/login", method="POST",
+                                  message="User eingeloggt", success=True)
+        logger.info(logging_obj)
         return {"access_token": access_token}
 
     except exc.IntegrityError as e:
@@ -68,9 +69,9 @@ async def login(user_creds: schemas.NutzerLogin, db: AsyncSession = Depends(data
             logging_msg = f"Es gab folgenden Fehler: {e.orig}"
             msg = "Es gab einen Fehler bei der Registrierung."
 
-        logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/auth/login", method="POST",
-                                            message=logging_msg, success=False)
-        logger.error(logging_obj.dict())
+        logging_obj = log_eintrag(user_id=0, endpoint="/auth/login", method="POST",
+                                  message=logging_msg, success=False)
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
 
@@ -7,8 +7,7 @@ from typing import List, Union
 from app import models, schemas, database, oauth, types
 import logging
 from logging.config import dictConfig
-from app.logger import LogConfig
-from app.schemas import LoggingSchema
+from app.logger import LogConfig, log_eintrag
 
 router = APIRouter(prefix="/energieberatende", tags=["Energieberatende"])
 
@@ -29,14 +28,14 @@ async def check_energieberatende_role(current_user: models.Nutzer, method: str,
         HTTPException: Wenn der aktuelle Benutzer nicht die Rolle 'Energieberater' hat.
     """
     if current_user.rolle != models.Rolle.Energieberatende:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Energieberatender",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Nur Energieberatende haben Zugriff auf diese Daten")
 
@@ -58,14 +57,14 @@ def log_and_raise_http_exception(user_id: int, endpoint: str, method: str, messa
     Raises:
         HTTPException: Mit dem angegebenen Statuscode und der Detailmeldung.
     """
-    logging_obj = schemas.LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=user_id,
         endpoint=endpoint,
         method=method,
         message=message,
         success=success
     )
-    logger.error(logging_obj.dict()) if not success else logger.info(logging_obj.dict())
+    logger.error(logging_obj) if not success else logger.info(logging_obj)
     raise HTTPException(status_code=status_code, detail=detail)
 
 
@@ -593,52 +592,52 @@ async def zusatzdaten_eingeben(energieausweis_id: int,
         energieausweis.massnahmen_id = neue_massnahme.massnahmen_id
         await db.commit()
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/daten-erfassung/{energieausweis_id}",
             method="POST",
             message=f"Die Daten für energieausweis_id wurden erfolgreich erfasst: {energieausweis_id}",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return {
             "message": f"Daten für Energieausweis {energieausweis_id} und zugehörige Massnahmen erfolgreich erfasst."}
 
     except ValueError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/daten-erfassung/{energieausweis_id}",
             method="POST",
             message=str(e),
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/daten-erfassung/{energieausweis_id}",
             method="POST",
             message=f"Datenbankfehler aufgetreten: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
     except Exception as e:
         await db.rollback()
         if isinstance(e, HTTPException):
             raise e
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/daten-erfassung/{energieausweis_id}",
             method="POST",
             message=f"Unerwarteter Fehler: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Unerwarteter Fehler aufgetreten") from e
 
@@ -667,14 +666,14 @@ async def energieausweis_erstellen(energieausweis_id: int, erstellen_data: schem
     try:
         energieausweis = await db.get(models.Energieausweise, energieausweis_id)
         if not energieausweis:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/energieausweis-erstellen/{energieausweis_id}",
                 method="POST",
                 message=f"Energieausweis nicht gefunden für: {energieausweis_id}",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Energieausweis nicht gefunden.")
 
         result = await db.execute(select(models.PVAnlage).where(models.PVAnlage.energieausweis_id == energieausweis_id))
@@ -687,14 +686,14 @@ async def energieausweis_erstellen(energieausweis_id: int, erstellen_data: schem
                         any(anlage.prozess_status == models.ProzessStatus.AusweisAngefordert for anlage in anlagen)
 
         if not condition_met:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/energieausweis-erstellen/{energieausweis_id}",
                 method="POST",
                 message=f"Ausweis Status ist nicht 'AusweisAngefordert'. für id: {energieausweis_id}",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
                                 detail="AusweisStatus ist nicht 'AnfrageGestellt' oder kein zugehöriger "
                                        "PVAnlage-Prozessstatus ist 'AusweisAngefordert'.")
@@ -718,14 +717,14 @@ async def energieausweis_erstellen(energieausweis_id: int, erstellen_data: schem
 
         await create_rechnung(empfaenger_id=energieausweis.haushalt_id, steller_id=current_user.user_id, db=db)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/energieausweis-erstellen/{energieausweis_id}",
             method="POST",
             message=f"Energieausweis erfolgreich aktualisiert für id: {energieausweis_id}",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return schemas.EnergieausweisCreateResponse(message="Energieausweis erfolgreich erstellt "
                                                             "und AusweisStatus aktualisiert",
@@ -733,28 +732,28 @@ async def energieausweis_erstellen(energieausweis_id: int, erstellen_data: schem
 
     except SQLAlchemyError as e:
         await db.rollback()
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/energieausweis-erstellen/{energieausweis_id}",
             method="POST",
             message=f"Datenbankfehler aufgetreten: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler") from e
     except HTTPException as http_ex:
         await db.rollback()
         raise http_ex
     except Exception as e:
         await db.rollback()
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/energieausweis-erstellen/{energieausweis_id}",
             method="POST",
             message=f"Unerwarteter Fehler: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Unexpected error occurred: {e}") from e
 
@@ -787,37 +786,37 @@ async def abnahmebestaetigung_fuer_pvanlagen(anlage_id: int,
     try:
         pv_anlage = await db.get(models.PVAnlage, anlage_id)
         if not pv_anlage:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/abnahme-pvanlage/{anlage_id}",
                 method="PUT",
                 message=f"PV-Anlage mit id {anlage_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PV-Anlage nicht gefunden")
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/abnahme-pvanlage/{anlage_id}",
             method="PUT",
             message=f"Datenbankfehler beim Abrufen der PV-Anlage: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="PV-Anlage konnte nicht abgerufen werden")
 
     empty_fields = [field for field, value in vars(pv_anlage).items() if value is None]
     if empty_fields:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/abnahme-pvanlage/{anlage_id}",
             method="PUT",
             message=f"PV-Anlage {anlage_id} hat fehlende Attribute: {empty_fields}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
                             detail=f"Nicht alle erforderlichen Attribute der PV-Anlage sind ausgefüllt: {empty_fields}")
 
@@ -827,25 +826,25 @@ async def abnahmebestaetigung_fuer_pvanlagen(anlage_id: int,
         await db.commit()
         await db.refresh(pv_anlage)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/abnahme-pvanlage/{anlage_id}",
             method="PUT",
             message=f"PV-Anlage {anlage_id} Status aktualisiert auf 'Abgenommen'",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
     except SQLAlchemyError as e:
         await db.rollback()
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/abnahme-pvanlage/{anlage_id}",
             method="PUT",
             message=f"Datenbankfehler beim Aktualisieren der PV-Anlage: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail=f"Aktualisierung der PV-Anlage fehlgeschlagen")
 
     response = schemas.PVAnlageAbnahmeResponse(
@@ -14,7 +14,7 @@ from sqlalchemy.orm import selectinload
 from app import models, schemas, database, oauth, types
 import logging
 from logging.config import dictConfig
-from app.logger import LogConfig
+from app.logger import LogConfig, log_eintrag
 from app.schemas import *
 import csv
 import io
@@ -41,14 +41,14 @@ async def check_haushalt_role(current_user: models.Nutzer, method: str, endpoint
         HTTPException: Wenn der Nutzer keine Berechtigung hat.
     """
     if current_user.rolle != models.Rolle.Haushalte:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Haushalt",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Haushalte haben Zugriff auf diese Daten")
 
 
@@ -65,14 +65,14 @@ async def check_haushalt_or_solarteur_role(current_user: models.Nutzer, method:
         HTTPException: Wenn der Nutzer keine Berechtigung hat.
     """
     if current_user.rolle != models.Rolle.Haushalte and current_user.rolle != models.Rolle.Solarteure:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Haushalt",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Haushalte oder Solarteure haben Zugriff auf diese Daten")
 
 async def check_haushalt_or_solarteur_role_or_berater(current_user: models.Nutzer, method: str, endpoint: str):
@@ -89,14 +89,14 @@ async def check_haushalt_or_solarteur_role_or_berater(current_user: models.Nutze
     """
     if current_user.rolle != models.Rolle.Haushalte and current_user.rolle != models.Rolle.Solarteure \
             and current_user.rolle != models.Rolle.Energieberatende:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Haushalt",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Haushalte oder Solarteure haben Zugriff auf diese Daten")
 
 @router.post("/angebot-anfordern", status_code=status.HTTP_201_CREATED, response_model=schemas.PVAnforderungResponse)
@@ -131,14 +131,14 @@ async def pv_installationsangebot_anfordern(db: AsyncSession = Depends(database.
         await db.commit()
         await db.refresh(pv_anlage)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebot-anfordern",
             method="POST",
             message="PV-Installationsangebot erfolgreich angefordert",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return schemas.PVAnforderungResponse(
             anlage_id=pv_anlage.anlage_id,
@@ -146,14 +146,14 @@ async def pv_installationsangebot_anfordern(db: AsyncSession = Depends(database.
         )
 
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/admin/userOverview",
             method="GET",
             message=f"Internet Serverfehler: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Internet Serverfehler")
 
@@ -178,14 +178,14 @@ async def get_pv_anlage(db: AsyncSession = Depends(database.get_db_async),
         pv_anlagen = result.scalars().all()
 
         if not pv_anlagen:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/angebot-anfordern",
                 method="GET",
                 message="Keine PV-Anlage gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             return []
 
         response = [{
@@ -202,14 +202,14 @@ async def get_pv_anlage(db: AsyncSession = Depends(database.get_db_async),
         if isinstance(e, HTTPException):
             raise e
         
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebot-anfordern",
             method="GET",
             message=f"Internet Serverfehler: {str(e)}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Internet Serverfehler")
 
@@ -235,25 +235,25 @@ async def get_tarifantrag(tarif_id: int, db: AsyncSession = Depends(database.get
         result = await db.execute(query)
         tarif = result.scalar_one_or_none()
         if not tarif:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/vertrag-preview",
                 method="GET",
                 message="Tarif nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarif nicht gefunden")
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/vertrag-preview",
             method="GET",
             message=f"Fehler beim Abrufen des Tarifs: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fehler beim Abrufen des Tarifs")
 
     try:
@@ -269,14 +269,14 @@ async def get_tarifantrag(tarif_id: int, db: AsyncSession = Depends(database.get
         return response
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Fehler bei der Vertragserstellung {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler bei der Vertragserstellung: {e}")
 
@@ -305,25 +305,25 @@ async def tarifantrag(tarif_id: int,
         result = await db.execute(query)
         tarif = result.scalar_one_or_none()
         if not tarif:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/tarifantrag",
                 method="POST",
                 message="Tarif nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarif nicht gefunden")
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/tarifantrag",
             method="POST",
             message=f"Fehler beim Abrufen des Tarifs: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fehler beim Abrufen des Tarifs")
 
     beginn_datum = date.today()
@@ -343,14 +343,14 @@ async def tarifantrag(tarif_id: int,
         db.add(vertrag)
         await db.commit()
         await db.refresh(vertrag)
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Vertrag {vertrag.vertrag_id} erfolgreich erstellt für Nutzer ID {user_id}",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
         return schemas.VertragResponse(
             vertrag_id=vertrag.vertrag_id,
             user_id=vertrag.user_id,
@@ -362,27 +362,27 @@ async def tarifantrag(tarif_id: int,
         )
 
     except sqlalchemy.exc.IntegrityError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=user_id,
             endpoint="/tarifantrag",
             method="POST",
             message=f"Tarif für user bereits vorhanden: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail=f"Tarif {tarif_id} für user {user_id}existiert für user bereits")
 
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Fehler bei der Vertragserstellung {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler bei der Vertragserstellung: {e}")
 
@@ -425,25 +425,25 @@ async def kontakt_aufnehmen_energieberatenden(anlage_id: int = Query(None, descr
         await db.commit()
 
         if anlage_id and anlage_id not in [a.anlage_id for a in anlagen]:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/kontaktaufnahme-energieberatenden",
                 method="POST",
                 message=f"Anlage {anlage_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f"Anlage {anlage_id} nicht gefunden oder gehört nicht zum Haushalt")
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kontaktaufnahme-energieberatenden",
             method="POST",
             message=f"Energieausweis Anfrage {neue_anfrage.energieausweis_id} erfolgreich erstellt",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return schemas.EnergieausweisAnfrageResponse(
             energieausweis_id=neue_anfrage.energieausweis_id,
@@ -452,14 +452,14 @@ async def kontakt_aufnehmen_energieberatenden(anlage_id: int = Query(None, descr
         )
 
     except exc.IntegrityError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kontaktaufnahme-energieberatenden",
             method="POST",
             message=f"IntegrityError encountered: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=409, detail="Konflikt beim Erstellen der Energieausweis Anfrage")
 
     except Exception as e:
@@ -467,14 +467,14 @@ async def kontakt_aufnehmen_energieberatenden(anlage_id: int = Query(None, descr
         if isinstance(e, HTTPException):
             raise e
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kontaktaufnahme-energieberatenden",
             method="POST",
             message=f"Unexpected error: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
 
@@ -499,14 +499,14 @@ async def ueberpruefung_angebote(current_user: models.Nutzer = Depends(oauth.get
         angebote = result.scalars().all()
 
         if not angebote:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/angebotsueberpruefung",
                 method="GET",
                 message=f"Keine Angebote für Haushalt {current_user.user_id} gefunden.",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             return []
 
         response_list = [schemas.AngebotResponse(
@@ -517,37 +517,37 @@ async def ueberpruefung_angebote(current_user: models.Nutzer = Depends(oauth.get
             created_at=angebot.created_at
         ) for angebot in angebote]
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Angebote erfolgreich abgerufen für Haushalt {current_user.user_id}.",
             success=False
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return response_list
 
     except sqlalchemy.exc.SQLAlchemyError as db_exc:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Datenbankfehler für Haushalt: {current_user.user_id}: {db_exc}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Datenbankfehler bei der Abfrage von Angeboten")
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebotsueberpruefung",
             method="GET",
             message=f"Unerwarteter Fehler für Haushalt {current_user.user_id}: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Unerwarteter Fehler bei der Abfrage von Angeboten")
 
@@ -683,14 +683,14 @@ async def daten_freigabe(freigabe_daten: schemas.HaushaltsDatenFreigabe,
     haushaltsdaten = await db.execute(select(models.Haushalte).where(models.Haushalte.user_id == user_id))
     haushalt = haushaltsdaten.scalars().first()
     if not haushalt:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/datenfreigabe",
             method="POST",
             message="Kein Haushaltsdatensatz gefunden",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Kein Haushaltsdatensatz gefunden")
     try:
         dashboard_agg_result = await db.execute(
@@ -711,14 +711,14 @@ async def daten_freigabe(freigabe_daten: schemas.HaushaltsDatenFreigabe,
         )
 
     except ValidationError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/datenfreigabe",
             method="POST",
             message=f"Validierungsfehler: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=f"Keine Dashboard Daten: {e}")
 
     try:        
@@ -739,25 +739,25 @@ async def daten_freigabe(freigabe_daten: schemas.HaushaltsDatenFreigabe,
                 await db.refresh(pv[0])
     except SQLAlchemyError as e:
         await db.rollback()
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/datenfreigabe",
             method="POST",
             message=f"Fehler beim Aktualisieren der Haushaltsdaten: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Aktualisieren der Haushaltsdaten: {e}")
 
-    logging_obj = schemas.LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/datenfreigabe",
         method="POST",
         message="Haushaltsdaten und Dashboard-Daten erfolgreich freigegeben",
         success=True
     )
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
 
     return schemas.HaushaltsDatenFreigabeResponse(
         message="Haushaltsdaten und Dashboard-Daten erfolgreich freigegeben",
@@ -878,26 +878,26 @@ async def get_haushalt_daten(haushalt_id: int,
         result = await db.execute(stmt)
         haushalt = result.first()
         if not haushalt:
-            logging_error = LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/haushalt-daten/{haushalt_id}",
                 method="GET",
                 message=f"Keine Haushaltsdaten für Haushalt {haushalt_id} gefunden",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f"Keine Haushaltsdaten für Haushalt {haushalt_id} gefunden")
         haushalt = haushalt[0]
         if haushalt.anzahl_bewohner is None:
-            logging_error = LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/haushalt-daten/{haushalt_id}",
                 method="GET",
                 message=f"Haushaltsdaten für Haushalt {haushalt_id} wurden noch nicht freigegeben",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
                                 detail=f"Haushaltsdaten für Haushalt {haushalt_id} wurden noch nicht freigegeben")
 
@@ -941,14 +941,14 @@ async def update_haushalt_daten(haushalt_id: int,
         result = await db.execute(stmt)
         haushalt = result.first()[0]
         if not haushalt:
-            logging_obj = LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/haushalt-daten/{haushalt_id}",
                 method="PUT",
                 message=f"Keine Haushaltsdaten für Haushalt {haushalt_id} gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f"Keine Haushaltsdaten für Haushalt {haushalt_id} gefunden")
         haushalt.anzahl_bewohner = haushalt_daten.anzahl_bewohner
@@ -990,27 +990,27 @@ async def angebot_annehmen(anlage_id: int = Path(..., description="Die ID der PV
 
     pv_anlage = await db.get(models.PVAnlage, anlage_id)
     if not pv_anlage or pv_anlage.haushalt_id != current_user.user_id:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-akzeptieren/{anlage_id}",
             method="PUT",
             message=f"PV-Anlage {anlage_id} nicht gefunden oder gehört nicht zu Benutzer {current_user.user_id}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"PV-Anlage mit der ID {anlage_id} nicht gefunden "
                                    f"oder gehört nicht zum aktuellen Haushalt.")
 
     if pv_anlage.prozess_status == models.ProzessStatus.AngebotAngenommen:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-akzeptieren/{anlage_id}",
             method="PUT",
             message=f"Angebot für PV-Anlage {anlage_id} bereits angenommen",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         return {"message": f"Angebot für PV-Anlage {anlage_id} wurde bereits angenommen."}
 
     try:
@@ -1018,24 +1018,24 @@ async def angebot_annehmen(anlage_id: int = Path(..., description="Die ID der PV
         await db.commit()
         await db.refresh(pv_anlage)
 
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-akzeptieren/{anlage_id}",
             method="PUT",
             message=f"Benutzer {current_user.user_id} hat Angebot für PV-Anlage {anlage_id} angenommen",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
     except Exception as e:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-akzeptieren/{anlage_id}",
             method="PUT",
             message=f"Fehler bei der Angebotsannahme für PV-Anlage {anlage_id}: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
     return {"message": f"Angebot für PV-Anlage {anlage_id} erfolgreich angenommen."}
@@ -1064,14 +1064,14 @@ async def get_angebot(anlage_id: int,
         result = await db.execute(stmt)
         angebote = result.all()
         if not angebote:
-            logging_obj = LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/angebote/{anlage_id}",
                 method="GET",
                 message=f"Angebot {anlage_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail=f"Angebot {anlage_id} nicht gefunden")
 
@@ -1162,20 +1162,20 @@ async def angebot_ablehnen(anlage_id: int = Path(..., description="Die ID der PV
 
     pv_anlage = await db.get(models.PVAnlage, anlage_id)
     if not pv_anlage or pv_anlage.haushalt_id != current_user.user_id:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-ablehnen/{anlage_id}",
             method="PUT",
             message=f"PV-Anlage {anlage_id} nicht gefunden oder gehört nicht zu Benutzer {current_user.user_id}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"PV-Anlage mit der ID {anlage_id} nicht gefunden "
                                    f"oder gehört nicht zum aktuellen Haushalt.")
 
     if pv_anlage.prozess_status in [models.ProzessStatus.AngebotAngenommen, models.ProzessStatus.AngebotAbgelehnt]:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-ablehnen/{anlage_id}",
             method="PUT",
@@ -1183,7 +1183,7 @@ async def angebot_ablehnen(anlage_id: int = Path(..., description="Die ID der PV
                     f"oder abgelehnt wurde.",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         return {"message": f"Angebot kann nicht geändert werden, da es bereits angenommen oder abgelehnt wurde."}
 
     try:
@@ -1191,24 +1191,24 @@ async def angebot_ablehnen(anlage_id: int = Path(..., description="Die ID der PV
         await db.commit()
         await db.refresh(pv_anlage)
 
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-ablehnen/{anlage_id}",
             method="PUT",
             message=f"Benutzer {current_user.user_id} hat Angebot für PV-Anlage {anlage_id} abgelehnt",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
     except Exception as e:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebot-ablehnen/{anlage_id}",
             method="PUT",
             message=f"Fehler bei der Angebotsannahme für PV-Anlage {anlage_id}: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
     return {"message": f"Angebot für PV-Anlage {anlage_id} erfolgreich abgelehnt."}
@@ -1231,14 +1231,14 @@ async def get_rechnungen(rolle: str = Query(None, description="Zahlungsteller od
     """
     try:
         if rolle not in ["steller", "empfaenger"]:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/rechnungen",
                 method="GET",
                 message="Ungültige Rolle",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ungültige Rolle")
 
         if rolle == "steller":
@@ -1250,27 +1250,27 @@ async def get_rechnungen(rolle: str = Query(None, description="Zahlungsteller od
         rechnungen_list = result.scalars().all()
 
         if not rechnungen_list:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/rechnungen",
                 method="GET",
                 message="Keine Rechnungen für den Nutzer gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Keine Rechnungen gefunden")
 
         return rechnungen_list
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/rechnungen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Rechnungen: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fehler beim Abrufen der Rechnungen")
 
     except Exception as e:
@@ -1278,14 +1278,14 @@ async def get_rechnungen(rolle: str = Query(None, description="Zahlungsteller od
         if isinstance(e, HTTPException):
             raise e
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/rechnungen",
             method="GET",
             message=f"Allgemeiner Fehler beim Abrufen der Rechnungen: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
 @router.get("/rechnungen/{rechnung_id}", response_model=schemas.RechnungResponse)
@@ -1319,27 +1319,27 @@ async def get_rechnung(rechnung_id: int,
         rechnung = result.scalar_one_or_none()
 
         if not rechnung:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/rechnungen/{rechnung_id}",
                 method="GET",
                 message=f"Rechnung {rechnung_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Rechnung {rechnung_id} nicht gefunden")
 
         return rechnung
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/rechnungen/{rechnung_id}",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Rechnung: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Fehler beim Abrufen der Rechnung")
 
     except Exception as e:
@@ -1347,14 +1347,14 @@ async def get_rechnung(rechnung_id: int,
         if isinstance(e, HTTPException):
             raise e
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/rechnungen/{rechnung_id}",
             method="GET",
             message=f"Allgemeiner Fehler beim Abrufen der Rechnung: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
 
@@ -1395,32 +1395,32 @@ async def rechnung_bezahlen(rechnung_id: int,
         rechnung.zahlungsstatus = models.Zahlungsstatus.Bezahlt
         await db.commit()
         
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/rechnungen/{rechnung_id}/bezahlen",
             method="PUT",
             message="Rechnung erfolgreich als bezahlt markiert",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return {"message": "Rechnung erfolgreich als bezahlt markiert"}
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/rechnungen/{rechnung_id}/bezahlen",
             method="PUT",
             message=f"Fehler beim Aktualisieren der Rechnung: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail="Fehler beim Aktualisieren der Rechnung")
 
 
 @router.get("/download_reports_dashboard", status_code=status.HTTP_200_OK)
-async def download_reports_dashbaord(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_dashbaord(db: AsyncSession = Depends(database.get_db_async_readonly),
                                 current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Generiert einen Bericht über das Dashboard und ermöglicht den Download als CSV-Datei.
@@ -1469,7 +1469,7 @@ async def download_reports_dashbaord(db: AsyncSession = Depends(database.get_db_
     
 
 @router.get("/download_reports_rechnungen", status_code=status.HTTP_200_OK)
-async def download_reports_rechnungen(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_rechnungen(db: AsyncSession = Depends(database.get_db_async_readonly),
                            current_user: models.Nutzer = Depends(oauth.get_current_user)):
 
     """
@@ -1529,7 +1529,7 @@ async def download_reports_rechnungen(db: AsyncSession = Depends(database.get_db
 
 
 @router.get("/download_reports_vertrag", status_code=status.HTTP_200_OK)
-async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_async_readonly),
                            current_user: models.Nutzer = Depends(oauth.get_current_user)):
 
     """
@@ -1587,7 +1587,7 @@ async def download_reports_vertrag(db: AsyncSession = Depends(database.get_db_as
     
 
 @router.get("/download_reports_energieausweise", status_code=status.HTTP_200_OK)
-async def download_reports_eausweis(db: AsyncSession = Depends(database.get_db_async),
+async def download_reports_eausweis(db: AsyncSession = Depends(database.get_db_async_readonly),
                            current_user: models.Nutzer = Depends(oauth.get_current_user)):
 
     """
@@ -3,24 +3,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy import exc, update, text
-from app import models, schemas, database, oauth, hashing
+from app import models, schemas, database, oauth, hashing, smartmeter_import
 from collections import Counter
 from typing import Union, List
 from pydantic import ValidationError
 import logging
 from logging.config import dictConfig
-from app.logger import LogConfig
+from app.logger import LogConfig, log_eintrag
 from app.routers.users import register_user
-from app.schemas import LoggingSchema, TarifCreate, TarifResponse, TarifCreate, TarifResponse
+from app.schemas import TarifCreate, TarifResponse, TarifCreate, TarifResponse
 from app import types
 from app import config
 from app.routers.haushalte import KWH_VERBRAUCH_JAHR
-from app.database import get_db_async
 import pandas as pd
 import io
 from datetime import datetime, timedelta, date
 import re
-import calendar
 
 router = APIRouter(prefix="/netzbetreiber", tags=["Netzbetreiber"])
 
@@ -41,14 +39,14 @@ async def check_netzbetreiber_role(current_user: models.Nutzer, method: str, end
         HTTPException: Wenn der Benutzer nicht die Rolle des Netzbetreibers hat.
     """
     if current_user.rolle != models.Rolle.Netzbetreiber:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Netzbetreiber",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Netzbetreiber haben Zugriff auf diese Daten")
 
 
@@ -65,14 +63,14 @@ async def check_netzbetreiber_role_or_haushalt(current_user: models.Nutzer, meth
         HTTPException: Wenn der Benutzer keine der angegebenen Rollen hat.
     """
     if current_user.rolle not in [models.Rolle.Netzbetreiber, models.Rolle.Haushalte]:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Netzbetreiber oder Haushalt",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Netzbetreiber und Haushalte haben Zugriff auf diese Daten")
 
 
@@ -338,14 +336,14 @@ async def count_laufzeit(current_user: models.Nutzer = Depends(oauth.get_current
         laufzeit_response = sorted(laufzeit_response, key=lambda x: x['laufzeit'])
         return laufzeit_response
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Tarife: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der Tarife: {e}")
 
 
@@ -373,14 +371,14 @@ async def get_preisstrukturen(current_user: models.Nutzer = Depends(oauth.get_cu
         preisstrukturen = result.scalars().all()
         return preisstrukturen
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Preisstrktur: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der Preisstrktur: {e}")
 
 
@@ -413,14 +411,14 @@ async def get_preisstrukturen(preis_id: int, current_user: models.Nutzer = Depen
                                 detail=f"Preisstruktur mit ID {preis_id} nicht gefunden")
         return preisstruktur[0]
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Preisstrktur: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der Preisstrktur: {e}")
 
 
@@ -451,34 +449,34 @@ async def create_preisstruktur(preisstruktur: schemas.PreisstrukturenCreate,
         db.add(preisstruktur)
         await db.commit()
         await db.refresh(preisstruktur)
-        logging_info = LoggingSchema(
+        logging_info = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="POST",
             message=f"Preisstruktur {preisstruktur.preis_id} erstellt",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
         return preisstruktur
     except SQLAlchemyError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="POST",
             message=f"SQLAlchemy Fehler beim Erstellen der Preisstruktur: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=500, detail="Datenbankfehler beim Erstellen der Preisstruktur")
     except ValidationError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="POST",
             message=f"Validierungsfehler: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=400, detail="Ungültige Eingabedaten")
 
 
@@ -510,14 +508,14 @@ async def update_preisstruktur(preis_id: int, preisstruktur_data: schemas.Preiss
     preisstruktur = result.scalars().first()
 
     if preisstruktur is None:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/preisstrukturen",
             method="PUT",
             message=f"Preisstruktur mit ID {preis_id} nicht gefunden",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=404, detail=f"Preisstruktur mit ID {preis_id} nicht gefunden")
 
     try:
@@ -526,31 +524,31 @@ async def update_preisstruktur(preis_id: int, preisstruktur_data: schemas.Preiss
 
         await db.commit()
         await db.refresh(preisstruktur)
-        logging_info = LoggingSchema(
+        logging_info = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/preisstrukturen/{preis_id}",
             method="PUT",
             message=f"Preisstruktur {preis_id} aktualisiert",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
         return preisstruktur
 
     except SQLAlchemyError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/preisstrukturen/{preis_id}",
             method="PUT",
             message=f"Fehler beim Aktualisieren der Preisstruktur {preis_id}: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=500, detail="Interner Serverfehler")
 
 
 @router.post("/dashboard/{haushalt_id}", status_code=status.HTTP_201_CREATED,
              response_model=schemas.DashboardSmartMeterDataResponse)
-async def add_dashboard_smartmeter_data(haushalt_id: int,
+async def add_dashboard_smartmeter_data(haushalt_id: int, stream: bool = False,
                                         db: AsyncSession = Depends(database.get_db_async),
                                         file: UploadFile = File(...),
                                         current_user: models.Nutzer = Depends(oauth.get_current_user)):
@@ -559,12 +557,15 @@ async def add_dashboard_smartmeter_data(haushalt_id: int,
 
     Args:
         haushalt_id (int): Die ID des Haushalts, dem die Daten hinzugefügt werden sollen.
+        stream (bool): Wenn True, wird die Datei inkrementell in Blöcken fester Größe gelesen und geschrieben,
+                       sodass der Speicherbedarf unabhängig von der Dateigröße bleibt.
         db (AsyncSession): Die Datenbanksitzung.
         file (UploadDatei): Die CSV-Datei mit den Smart-Meter-Daten.
         current_user (models.Nutzer): Das aktuelle Benutzerobjekt, voraussichtlich mit der Rolle netzbetreiber oder haushalt.
 
     Returns:
-        schemas.DashboardSmartMeterDataResponse: Bestätigung des Hinzufügens von Daten.
+        schemas.DashboardSmartMeterDataResponse: Bestätigung des Hinzufügens von Daten inklusive Importstatistik
+        (Anzahl Zeilen, Dauer und Zeilen pro Sekunde).
 
     Raises:
         HTTPException: Wenn die Benutzerrolle nicht angemessen ist oder ein Fehler bei der Verarbeitung der Datei auftritt.
@@ -574,53 +575,92 @@ async def add_dashboard_smartmeter_data(haushalt_id: int,
         haushalt_user = await db.get(models.Nutzer, haushalt_id)
         user_id = current_user.user_id
         if not haushalt_user or haushalt_user.rolle != models.Rolle.Haushalte:
-            logging_error = schemas.LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="/dashboard",
                 method="POST",
                 message=f"Nutzer {haushalt_id} ist nicht in der Rolle 'Haushalte'",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=400, detail="Nutzer ist nicht in der Rolle 'Haushalte'")
 
-        df = pd.read_csv(io.StringIO(file.file.read().decode('utf-8')))
-        df['Zeit'] = pd.to_datetime(df['Zeit'])
-
-        for _, row in df.iterrows():
-            dashboard_data = models.DashboardSmartMeterData(
-                haushalt_id=haushalt_id,
-                datum=row['Zeit'],
-                pv_erzeugung=row['PV(W)'],
-                soc=row['SOC(%)'],
-                batterie_leistung=row['Batterie(W)'],
-                zaehler=row['Zähler(W)'],
-                last=row['Last(W)'],
-                user_id=user_id
-            )
-            db.add(dashboard_data)
-        await db.commit()
+        if stream:
+            statistik = await smartmeter_import.importiere_smartmeter_stream(db, file, haushalt_id, user_id)
+        else:
+            statistik = await smartmeter_import.importiere_smartmeter_csv(db, file.file, haushalt_id, user_id)
 
-        logging_info = schemas.LoggingSchema(
+        logging_info = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/dashboard",
             method="POST",
-            message=f"Smart-Meter-Daten für Nutzer {haushalt_id} erfolgreich hinzugefügt",
+            message=f"Smart-Meter-Daten für Nutzer {haushalt_id} erfolgreich hinzugefügt: "
+                    f"{statistik['zeilen']} Zeilen in {statistik['dauer_s']} s "
+                    f"({statistik['zeilen_pro_sekunde']} Zeilen/s)",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
 
-        return {"message": "Smart-Meter-Daten erfolgreich hochgeladen"}
+        return {"message": "Smart-Meter-Daten erfolgreich hochgeladen", **statistik}
 
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/dashboard",
             method="POST",
             message=f"Fehler beim Hinzufügen von Smart-Meter-Daten: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
+
+
+@router.post("/dashboard/{haushalt_id}/rollups", status_code=status.HTTP_200_OK,
+             response_model=schemas.DashboardSmartMeterDataResponse)
+async def rebuild_dashboard_rollups(haushalt_id: int, db: AsyncSession = Depends(database.get_db_async),
+                                   current_user: models.Nutzer = Depends(oauth.get_current_user)):
+    """
+    Berechnet die vorberechneten Dashboard-Aggregate eines Haushalts aus den Rohdaten neu.
+
+    Wird benötigt für Smart-Meter-Daten, die vor Einführung der Rollups importiert wurden.
+
+    Args:
+        haushalt_id (int): Die ID des Haushalts.
+        db (AsyncSession): Die Datenbanksitzung.
+        current_user (models.Nutzer): Das aktuelle Benutzerobjekt, voraussichtlich mit der Rolle netzbetreiber oder haushalt.
+
+    Returns:
+        schemas.DashboardSmartMeterDataResponse: Bestätigung der Neuberechnung.
+
+    Raises:
+        HTTPException: Wenn die Benutzerrolle nicht angemessen ist oder ein Fehler bei der Neuberechnung auftritt.
+    """
+    await check_netzbetreiber_role_or_haushalt(current_user, "POST", "/dashboard/{haushalt_id}/rollups")
+    try:
+        await smartmeter_import.rollups_neu_berechnen(db, haushalt_id, current_user.user_id)
+        await db.commit()
+
+        logging_info = log_eintrag(
+            user_id=current_user.user_id,
+            endpoint="/dashboard/{haushalt_id}/rollups",
+            method="POST",
+            message=f"Dashboard-Rollups für Nutzer {haushalt_id} neu berechnet",
+            success=True
+        )
+        logger.info(logging_info)
+
+        return {"message": "Dashboard-Rollups erfolgreich neu berechnet"}
+
+    except Exception as e:
+        await db.rollback()
+        logging_error = log_eintrag(
+            user_id=current_user.user_id,
+            endpoint="/dashboard/{haushalt_id}/rollups",
+            method="POST",
+            message=f"Fehler beim Neuberechnen der Dashboard-Rollups: {str(e)}",
+            success=False
+        )
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
 
@@ -664,25 +704,25 @@ async def get_haushalte(current_user: models.Nutzer = Depends(oauth.get_current_
         } for user, adresse in haushalte]
         return response
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/haushalte",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der Haushalte: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der Haushalte: {e}")
 
     except Exception as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/haushalte",
             method="GET",
             message=f"Fehler beim Abrufen der Haushalte: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=500, detail=f"Fehler beim Abrufen der Haushalte: {e}")
 
 
@@ -694,7 +734,7 @@ async def get_haushalte(current_user: models.Nutzer = Depends(oauth.get_current_
             List[schemas.AggregatedDashboardSmartMeterDataResponseLast]])
 async def get_aggregated_dashboard_smartmeter_data(haushalt_id: int, field: str = "all", period: str = "DAY",
                                                    start: str = "2023-01-01", end: str = "2023-01-30",
-                                                   db: AsyncSession = Depends(database.get_db_async),
+                                                   db: AsyncSession = Depends(database.get_db_async_readonly),
                                                    current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
     Ruft aggregierte Smart-Meter-Daten für einen bestimmten Haushalt über einen bestimmten Zeitraum ab.
@@ -718,28 +758,28 @@ async def get_aggregated_dashboard_smartmeter_data(haushalt_id: int, field: str
         await check_netzbetreiber_role_or_haushalt(current_user, "POST", "/dashboard/{haushalt_id}")
 
         if period not in ["MINUTE", "HOUR", "DAY", "WEEK", "MONTH"]:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"dashboard/{haushalt_id}",
                 method="GET",
                 message="Ungültiger Zeitraum angegeben",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise ValueError("Ungültiger Zeitraum angegeben")
 
         try:
             start_date = datetime.strptime(start, "%Y-%m-%d").date()
             end_date = datetime.strptime(end, "%Y-%m-%d").date()
         except ValueError:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"dashboard/{haushalt_id}",
                 method="GET",
                 message="Ungültiges Datumsformat",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise ValueError("Ungültiges Datumsformat. Bitte verwenden Sie YYYY-MM-DD.")
 
         stmt = select(models.Nutzer.rolle).where(models.Nutzer.user_id == haushalt_id)
@@ -747,20 +787,19 @@ async def get_aggregated_dashboard_smartmeter_data(haushalt_id: int, field: str
         result = await db.execute(stmt)
         nutzer_rolle = result.scalar_one_or_none()
         if nutzer_rolle is None or nutzer_rolle != models.Rolle.Haushalte:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"dashboard/{haushalt_id}",
                 method="GET",
                 message="Haushalt nicht gefunden oder Rolle unpassend",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Nutzer ist nicht in der Rolle 'Haushalte'")
 
         table_name = "dashboard_smartmeter_data" if config.settings.OS == 'Linux' else '"Dashboard_smartmeter_data"'
-
-        # Determine the fields and GROUP BY clause based on the 'field' parameter
-        fields, group_by = determine_query_parts(field)
+        rollup_table_name = ("dashboard_smartmeter_rollup" if config.settings.OS == 'Linux'
+                             else '"Dashboard_smartmeter_rollup"')
 
         params = {
             "user_id": user_id,
@@ -770,76 +809,99 @@ async def get_aggregated_dashboard_smartmeter_data(haushalt_id: int, field: str
             "period": period
         }
 
-        query_base = f"""
-                    SELECT 
-                    DATE_TRUNC(:period, datum) as period, 
-                    {', '.join(fields)}
-                    from {table_name}
-                    WHERE user_id = :user_id and haushalt_id = :haushalt_id  
-                    and datum >= :start and datum < :end
-                    {group_by}
-                    ORDER BY DATE_TRUNC(:period, datum) 
-                """
-
-        # Generate the final query
-        raw_sql = text(query_base.format(fields=','.join(fields), group_by=group_by))
+        aggregated_data = []
+        rollup_periode = smartmeter_import.waehle_rollup_periode(period, start_date, end_date)
+        if rollup_periode is not None:
+            # Vorberechnete Rollups lesen, die Laufzeit hängt nur von der Anzahl der Perioden ab
+            fields, group_by = determine_rollup_query_parts(field)
+            query_base = f"""
+                        SELECT 
+                        DATE_TRUNC(:period, periode_start) as period, 
+                        {', '.join(fields)}
+                        from {rollup_table_name}
+                        WHERE user_id = :user_id and haushalt_id = :haushalt_id and periode = :rollup_periode
+                        and periode_start >= :start and periode_start < :end
+                        {group_by}
+                        ORDER BY DATE_TRUNC(:period, periode_start) 
+                    """
+            result = await db.execute(text(query_base), {**params, "rollup_periode": rollup_periode})
+            aggregated_data = result.fetchall()
 
-        result = await db.execute(raw_sql, params)
-        aggregated_data = result.fetchall()
+        if not aggregated_data:
+            # Rohdaten, wenn keine Rollup-Periode passt oder keine Rollups vorliegen. Vor Einführung der Rollups
+            # importierte Daten müssen einmalig mit `make migrate-rollups` übernommen werden, sonst fehlen sie hier
+            fields, group_by = determine_query_parts(field)
+
+            query_base = f"""
+                        SELECT 
+                        DATE_TRUNC(:period, datum) as period, 
+                        {', '.join(fields)}
+                        from {table_name}
+                        WHERE user_id = :user_id and haushalt_id = :haushalt_id  
+                        and datum >= :start and datum < :end
+                        {group_by}
+                        ORDER BY DATE_TRUNC(:period, datum) 
+                    """
+
+            # Generate the final query
+            raw_sql = text(query_base.format(fields=','.join(fields), group_by=group_by))
+
+            result = await db.execute(raw_sql, params)
+            aggregated_data = result.fetchall()
 
         if not aggregated_data:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint="dashboard/{haushalt_id}",
                 method="GET",
                 message="Keine Dashboard-Daten für diesen Haushalt gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Keine Dashboard-Daten für diesen Haushalt gefunden")
 
-        logging_info = schemas.LoggingSchema(
+        logging_info = log_eintrag(
             user_id=current_user.user_id,
             endpoint="dashboard/{haushalt_id}",
             method="GET",
             message="Dashboard-Daten erfolgreich abgerufen",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
 
         return process_aggregated_data(field, aggregated_data)
 
     except ValueError as ve:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/dashboard",
             method="GET",
             message=f"Fehler bei der Eingabeüberprüfung: {ve}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=400, detail=str(ve))
 
     except HTTPException as he:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/dashboard",
             method="GET",
             message=f"HTTP Fehler: {he.detail}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise
 
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/dashboard",
             method="GET",
             message=f"Unerwarteter Fehler: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=500, detail="Ein unerwarteter Fehler ist aufgetreten")
 
 
@@ -877,6 +939,36 @@ def determine_query_parts(field):
     return fields, group_by
 
 
+def determine_rollup_query_parts(field):
+    """
+    Bestimmt die Felder und die GROUP BY-Klausel für die Abfrage von aggregierten Dashboarddaten aus den Rollups.
+
+    Summen werden über die Rollup-Summen gebildet, der SOC-Durchschnitt über Summe und Anzahl der Messwerte.
+
+    Args:
+        field (str): Das Feld, nach dem aggregiert werden soll (z. B. "all", "pv", "soc").
+
+    Returns:
+        Tupel: Enthält die auszuwählenden Felder und die GROUP BY-Klausel für die SQL-Abfrage.
+    """
+    group_by = "GROUP BY DATE_TRUNC(:period, periode_start)"
+    field_sql = {
+        "pv": "sum(pv_erzeugung_summe) as gesamt_pv_erzeugung",
+        "soc": "sum(soc_summe) / NULLIF(sum(soc_anzahl), 0) as gesamt_soc",
+        "batterie": "sum(batterie_leistung_summe) as gesamt_batterie_leistung",
+        "last": "sum(last_summe) as gesamt_last"
+    }
+
+    if field == "all":
+        fields = list(field_sql.values())
+    elif field in field_sql:
+        fields = [field_sql[field]]
+    else:
+        raise ValueError("Ungültiges Feld: {}".format(field))
+
+    return fields, group_by
+
+
 def process_aggregated_data(field, aggregated_data):
     """
     Verarbeitet aggregierte Daten basierend auf dem angegebenen Feld, um die Antwort zu formatieren.
@@ -952,25 +1044,25 @@ async def durchfuehren_netzvertraeglichkeitspruefung(anlage_id: int, db: AsyncSe
     pv_anlage = result.scalar_one_or_none()
 
     if pv_anlage is None:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/netzbetreiber/nvpruefung/{anlage_id}",
             method="PUT",
             message="PV-Anlage nicht gefunden",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PV-Anlage nicht gefunden")
 
     if pv_anlage.prozess_status != models.ProzessStatus.PlanErstellt:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/netzbetreiber/nvpruefung/{anlage_id}",
             method="PUT",
             message="PV-Anlage ist nicht im Status 'PlanErstellt'",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="PV-Anlage ist nicht im Status 'PlanErstellt'")
 
@@ -985,14 +1077,14 @@ async def durchfuehren_netzvertraeglichkeitspruefung(anlage_id: int, db: AsyncSe
     await db.execute(update_stmt)
     await db.commit()
 
-    logging_obj = LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint=f"/netzbetreiber/nvpruefung/{anlage_id}",
         method="PUT",
         message="Netzverträglichkeitsprüfung durchgeführt",
         success=True
     )
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
 
     return {"anlage_id": anlage_id, "nvpruefung_status": is_compatible}
 
@@ -1022,18 +1114,18 @@ async def einspeisezusage_erteilen(anlage_id: int, db: AsyncSession = Depends(da
     pv_anlage = result.scalars().first()
 
     if pv_anlage is None:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/netzbetreiber/einspeisezusage/{anlage_id}",
             method="PUT",
             message="PV-Anlage nicht gefunden",
             success=True
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PV-Anlage nicht gefunden")
 
     if not pv_anlage.nvpruefung_status:
-        logging_obj = LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/netzbetreiber/einspeisezusage/{anlage_id}",
             method="PUT",
@@ -1041,7 +1133,7 @@ async def einspeisezusage_erteilen(anlage_id: int, db: AsyncSession = Depends(da
             success=True
         )
         # wenn nv pruedung false kommt 412 zurück
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
                             detail="Netzverträglichkeitsprüfung nicht bestanden")
 
@@ -1050,169 +1142,18 @@ async def einspeisezusage_erteilen(anlage_id: int, db: AsyncSession = Depends(da
     db.add(pv_anlage)
     await db.commit()
 
-    logging_obj = LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint=f"/netzbetreiber/einspeisezusage/{anlage_id}",
         method="PUT",
         message="Einspeisezusage erteilt",
         success=True
     )
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
 
     return {"message": "Einspeisezusage erfolgreich erteilt", "anlage_id": anlage_id}
 
 
-async def check_and_create_rechnung():
-    """
-    Prüft regelmäßig, ob für Verträge eine neue Rechnung erforderlich ist und erstellt sie bei Bedarf.
-
-    Diese Funktion ist für die Ausführung als Hintergrundaufgabe in der Anwendung vorgesehen.
-    """
-    async for db in get_db_async():
-        try:
-            today = datetime.today().date()
-            result = await db.execute(select(models.Vertrag))
-            vertraege = result.scalars().all()
-
-            for vertrag in vertraege:
-                vertragsjahrestag = berechnen_jahrestag(vertrag, today)
-
-                if today == vertragsjahrestag or (today > vertragsjahrestag
-                                                  and not await check_rechnung_exists (vertrag, vertragsjahrestag, vertragsjahrestag + timedelta(days=364), db)):
-                    await create_rechnung_bei_bedarf(vertrag, vertragsjahrestag, db)
-                    if today > vertragsjahrestag:
-                        logger.info(f"Nachholrechnung für Vertrags-ID {vertrag.id} für verpassten Zeitraum erstellt.")
-
-        except SQLAlchemyError as e:
-            logger.error(f"Datenbankfehler in check_and_create_rechnungen: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Unerwarteter Fehler in check_and_create_rechnungen: {e}")
-            raise
-        break
-
-
-def berechnen_jahrestag(vertrag, today):
-    """
-    Berechnet das Jahrestagsdatum eines Vertrags auf der Grundlage des heutigen Datums.
-
-    Args:
-        vertrag (models.Vertrag): Der Vertrag, für den der Jahrestag berechnet werden soll.
-        heute (Datum): Das Bezugsdatum für die Berechnung.
-
-    Returns:
-        date: Das berechnete Jahrestagsdatum.
-    """
-    try:
-        if vertrag.beginn_datum.month == 2 and vertrag.beginn_datum.day == 29:
-            if not calendar.isleap(today.year):
-                return datetime.date(today.year, 2, 28)
-            else:
-                return vertrag.beginn_datum.replace(year=today.year)
-        else:
-            return vertrag.beginn_datum.replace(year=today.year)
-    except Exception as e:
-        logger.error(f"Fehler bei der Berechnung des Vertragsjahrestags: {e}")
-        return today + timedelta(days=1)
-
-
-async def create_rechnung_bei_bedarf(vertrag, today, db):
-    """
-    Erstellt bei Bedarf eine Rechnung für einen Vertrag, basierend auf bestimmten Bedingungen.
-
-    Args:
-        vertrag (models.Vertrag): Der Vertrag, für den eine Rechnung erstellt werden soll.
-        today (Datum): Das für die Rechnungserstellung zu berücksichtigende Datum.
-        db (AsyncSession): Die Datenbanksitzung.
-
-    Raises:
-        Exception (Ausnahme): Wenn während der Rechnungserstellung ein Fehler auftritt.
-    """
-    try:
-        next_period_start = today
-        next_period_end = today + timedelta(days=365)
-
-        # Check for existing invoice
-        rechnung_exists = await check_rechnung_exists(vertrag, next_period_start, next_period_end, db)
-
-        if not rechnung_exists:
-            await create_new_rechnung(vertrag, today, next_period_start, next_period_end, db)
-    except SQLAlchemyError as e:
-        raise
-    except ValueError as ve:
-        logger.warning(f"Datenüberprüfungsfehler für Vertrags-ID {vertrag.vertrag_id}: {ve}")
-        return  # Vertrag überspringen
-    except Exception as e:
-        logger.error(f"Unerwarteter Fehler für Vertrags-ID {vertrag.vertrag_id}: {e}")
-        raise
-
-
-async def check_rechnung_exists(vertrag, start_date, end_date, db):
-    """
-    Prüft, ob bereits eine Rechnung für einen bestimmten Vertrag innerhalb eines bestimmten Datumsbereichs existiert.
-
-    Args:
-        vertrag (models.Vertrag): Der Vertrag, der auf eine vorhandene Rechnung geprüft werden soll.
-        start_date (Datum): Das Startdatum des zu prüfenden Zeitraums.
-        end_date (Datum): Das Enddatum des zu prüfenden Zeitraums.
-        db (AsyncSession): Die Datenbanksitzung.
-
-    Returns:
-        bool: True, wenn eine Rechnung existiert, sonst False.
-    """
-    try:
-        result = await db.execute(
-            select(models.Rechnungen).where(
-                models.Rechnungen.empfaenger_id == vertrag.user_id,
-                models.Rechnungen.rechnungsperiode_start == start_date,
-                models.Rechnungen.rechnungsperiode_ende == end_date,
-                models.Rechnungen.rechnungsart == models.Rechnungsart.Netzbetreiber_Rechnung
-            )
-        )
-        return result.scalars().first()
-    except Exception as e:
-        logger.error(f"Fehler bei der Prüfung auf vorhandene Rechnung: {e}")
-        return False
-
-
-async def create_new_rechnung(vertrag, today, start_date, end_date, db):
-    """
-    Erzeugt eine neue Rechnung für einen Vertrag.
-
-    Args:
-        vertrag (models.Vertrag): Der Vertrag, für den eine Rechnung erstellt werden soll.
-        today (Datum): Das aktuelle Datum, das für das Erstellungsdatum der Rechnung verwendet wird.
-        start_date (Datum): Das Startdatum für den Rechnungszeitraum.
-        end_date (Datum): Das Enddatum des Rechnungszeitraums.
-        db (AsyncSession): Die Datenbanksitzung.
-
-    Raises:
-        SQLAlchemyError: Wenn bei der Rechnungserstellung ein Datenbankfehler auftritt.
-    """
-    try:
-        neue_rechnung = models.Rechnungen(
-            empfaenger_id=vertrag.user_id,
-            rechnungsbetrag=vertrag.jahresabschlag,
-            rechnungsdatum=today,
-            faelligkeitsdatum=today + timedelta(days=30),
-            rechnungsart=models.Rechnungsart.Netzbetreiber_Rechnung,
-            steller_id=vertrag.netzbetreiber_id,
-            rechnungsperiode_start=start_date,
-            rechnungsperiode_ende=end_date,
-            zahlungsstatus=models.Zahlungsstatus.Offen
-        )
-        db.add(neue_rechnung)
-        await db.commit()
-    except SQLAlchemyError as e:
-        logger.error(f"SQLAlchemy-Fehler in create_new_rechnung für Vertrags-ID {vertrag.id}: {e}")
-        await db.rollback()
-        raise
-    except Exception as e:
-        logger.error(f"Unerwarteter Fehler in create_new_rechnung für Vertrags-ID {vertrag.id}: {e}")
-        await db.rollback()
-        raise
-
-
 @router.get("/pv-angenommen", response_model=List[schemas.NetzbetreiberEinspeisungDetail])
 async def get_angenommene_pv_anlagen(db: AsyncSession = Depends(database.get_db),
                                      current_user: models.Nutzer = Depends(oauth.get_current_user)):
@@ -1319,14 +1260,14 @@ async def get_einspeisezusagen_vorschlag(
         return response
 
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/einspeisezusagen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der PV-Anlagen: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der PV-Anlagen: {e}")
 
 
@@ -1385,14 +1326,14 @@ async def get_einspeisezusagen_vorschlag(anlage_id: int,
         return response
 
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/einspeisezusagen",
             method="GET",
             message=f"SQLAlchemy Fehler beim Abrufen der PV-Anlagen: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der PV-Anlagen: {e}")
 
 
@@ -1426,14 +1367,14 @@ async def deactivate_tarif(tarif_id: int, db: AsyncSession = Depends(database.ge
         await db.commit()
         return {"message": "Tarif erfolgreich deaktiviert"}
     except exc.IntegrityError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/tarif/deactivate/{id}",
             method="PUT",
             message=f"SQLAlchemy Fehler beim Deaktivieren des Tarifs: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Deaktivieren des Tarifs: {e}")
 
 
@@ -1460,14 +1401,14 @@ async def get_kuendigungsanfragen(db: AsyncSession = Depends(database.get_db_asy
         kuendigungsanfragen = result.scalars().all()
         return kuendigungsanfragen
     except SQLAlchemyError as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/kuendigungsanfragen",
             method="PUT",
             message=f"SQLAlchemy Fehler beim Abrufen der Kuendigungsanfragen: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"SQLAlchemy Fehler beim Abrufen der Kuendigungsanfragen: {e}")
 
 
@@ -1488,7 +1429,8 @@ async def kuendigungsanfragenbearbeitung(vertrag_id: int, aktion: str,
         Das Vertragsobjekt mit aktualisiertem Status basierend auf der durchgeführten Aktion.
 
     Raises:
-        HTTPException: Wenn der Vertrag nicht gefunden wird, die Aktion ungültig ist oder ein Datenbankfehler auftritt.
+        HTTPException: Wenn der Vertrag nicht gefunden wird, die Aktion ungültig ist, die Kündigung bereits bearbeitet
+            wurde oder ein Datenbankfehler auftritt.
     """
     try:
         # Abrufen der Kündigungsanfrage
@@ -1505,16 +1447,26 @@ async def kuendigungsanfragenbearbeitung(vertrag_id: int, aktion: str,
             raise HTTPException(status_code=404, detail="Kündigungsanfrage nicht gefunden")
 
         if aktion == "bestaetigen":
-            # Kündigung bestätigen und den Vertragstatus aktualisieren
-            anfrage.bestätigt = True
-            anfrage.vertragstatus = models.Vertragsstatus.Gekuendigt
+            # Kündigung nur bestätigen, solange sie noch unbestätigt ist, damit eine doppelte Bestätigung
+            # keine zweite Rechnung erzeugt
+            bestaetigt = await db.execute(
+                update(models.Vertrag)
+                .where(models.Vertrag.vertrag_id == vertrag_id,
+                       models.Vertrag.vertragstatus == models.Vertragsstatus.Gekuendigt_Unbestaetigt)
+                .values(vertragstatus=models.Vertragsstatus.Gekuendigt)
+                .returning(models.Vertrag.vertrag_id))
+            if bestaetigt.scalar_one_or_none() is None:
+                raise HTTPException(status_code=409, detail="Kündigungsanfrage wurde bereits bearbeitet")
+            if k_anfrage is not None:
+                k_anfrage.bestätigt = True
 
             # Berechne den zeitanteiligen Jahresabschlag
             jahresanfang = date(date.today().year, 1, 1)
             tage_seit_jahresanfang = (date.today() - jahresanfang).days
             zeitanteiliger_jahresabschlag = anfrage.jahresabschlag * (tage_seit_jahresanfang / 365)
 
-            # Erstelle eine Rechnung für den gekündigten Vertrag
+            # Erstelle eine Rechnung für den gekündigten Vertrag. Sie hat keine Rechnungsperiode und fällt daher
+            # nicht unter _rechnung_periode_uc; doppelte Bestätigungen verhindert die Statusprüfung oben
             rechnung = models.Rechnungen(
                 steller_id=current_user.user_id,
                 empfaenger_id=anfrage.user_id,
@@ -1546,47 +1498,47 @@ async def kuendigungsanfragenbearbeitung(vertrag_id: int, aktion: str,
                 )
                 db.add(neuer_vertrag)
 
-            logging_msg = LoggingSchema(
+            logging_msg = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kuendigungsanfragenbearbeitung/{vertrag_id}/{aktion}",
                 method="PUT",
                 message=f" Kündigung wurde bestätigt von {current_user.user_id}",
                 success=True
             )
-            logger.info(logging_msg.dict())
+            logger.info(logging_msg)
 
         elif aktion == "ablehnen":
             anfrage.vertragstatus = models.Vertragsstatus.Laufend
-            logging_msg = LoggingSchema(
+            logging_msg = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kuendigungsanfragenbearbeitung/{vertrag_id}/{aktion}",
                 method="PUT",
                 message=f" Kündigung wurde abgelehnt von {current_user.user_id}",
                 success=True
             )
-            logger.info(logging_msg.dict())
+            logger.info(logging_msg)
         else:
-            logging_error = LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/kuendigungsanfragenbearbeitung/{vertrag_id}/{aktion}",
                 method="PUT",
                 message=f" Ungültige aktion {aktion}",
                 success=False
             )
-            logger.info(logging_error.dict())
+            logger.info(logging_error)
             raise HTTPException(status_code=400, detail=f"Ungültige aktion {aktion}")
         await db.commit()
         return anfrage
     except SQLAlchemyError as e:
         await db.rollback()
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/kuendigungsanfragenbearbeitung/{vertrag_id}/{aktion}",
             method="PUT",
             message=f"Ungültige aktion {aktion}",
             success=False
         )
-        logger.info(logging_error.dict())
+        logger.info(logging_error)
         raise HTTPException(status_code=409, detail=f"Fehler bei der Verarbeitung der Kündigungsanfrage {e}")
 
 
@@ -1618,14 +1570,14 @@ async def get_vertraege(vertragsstatus: str = "all",
                 vertragsstatus = models.Vertragsstatus(vertragsstatus)
                 stmt = stmt.where(models.Vertrag.vertragstatus == vertragsstatus)
             except ValueError as e:
-                logging_error = LoggingSchema(
+                logging_error = log_eintrag(
                     user_id=current_user.user_id,
                     endpoint=f"/vertraege/{vertragsstatus}",
                     method="PUT",
                     message=f"Ungültigher vertragsstatus {e}",
                     success=False
                 )
-                logger.info(logging_error.dict())
+                logger.info(logging_error)
                 raise HTTPException(status_code=404, detail=f"Ungültigher vertragsstatus {e}")
 
         result = await db.execute(stmt)
@@ -1728,14 +1680,14 @@ async def create_mitarbeiter(nutzer: schemas.NutzerCreate,
 
     netzbetreiber = await db.get(models.Netzbetreiber, current_user.user_id)
     if not netzbetreiber.arbeitgeber:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/mitarbeiter",
             method="POST",
             message=f"Netzbetreiber {netzbetreiber.user_id} ist kein Arbeitgeber",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail=f"Netzbetreiber {netzbetreiber.user_id} ist kein Arbeitgeber")
 
     user_id = await register_user(nutzer, db)
@@ -1746,25 +1698,25 @@ async def create_mitarbeiter(nutzer: schemas.NutzerCreate,
         await db.commit()
         await db.refresh(mitarbeiter)
 
-        logging_info = LoggingSchema(
+        logging_info = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/mitarbeiter",
             method="POST",
             message=f"Mitarbeiter {user_id} erfolgreich erstellt",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
         return {"arbeitnehmer_id": user_id, "arbeitgeber_id": current_user.user_id}
 
     except Exception as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/mitarbeiter",
             method="POST",
             message=f"Fehler beim Erstellen der Mitarbeiter {e}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"Fehler beim Erstelln der Mitarbeiter {e}")
 
 
@@ -1816,9 +1768,9 @@ async def get_mitarbeiter(db: AsyncSession = Depends(database.get_db_async),
         else:
             logging_msg = f"Error beim User Abfragen: {e.orig}"
             msg = "Es gab einen Fehler bei der user Abfrage."
-        logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/", method="GET",
-                                            message=logging_msg, success=False)
-        logger.error(logging_obj.dict())
+        logging_obj = log_eintrag(user_id=0, endpoint="/users/", method="GET",
+                                  message=logging_msg, success=False)
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
 
@@ -1846,12 +1798,12 @@ async def check_arbeitgeber(db: AsyncSession = Depends(database.get_db_async),
         return {"is_arbeitgeber": True}
 
     except Exception as e:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/check-arbeitgeber",
             method="GET",
             message=f"Fehler beim Überprüfen des Arbeitgebers {e}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=409, detail=f"Fehler beim Überprüfen des Arbeitgebers {e}")
@@ -7,8 +7,7 @@ from typing import List
 from app import models, schemas, database, oauth, types
 import logging
 from logging.config import dictConfig
-from app.logger import LogConfig
-from app.schemas import LoggingSchema
+from app.logger import LogConfig, log_eintrag
 from io import StringIO
 import io
 from fastapi.responses import StreamingResponse
@@ -33,14 +32,14 @@ async def check_solarteur_role(current_user: models.Nutzer, method: str, endpoin
         HTTPException: Mit Statuscode 403, wenn der Nutzer keine Rolle "Solarteure" hat.
     """
     if current_user.rolle != models.Rolle.Solarteure:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Solarteur",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Solarteure haben Zugriff auf diese Daten")
 
 
@@ -57,14 +56,14 @@ async def check_solarteur_role_and_berater_role(current_user: models.Nutzer, met
         HTTPException: Mit Statuscode 403, wenn der Nutzer keine Rolle "Solarteure" oder "Energieberatende" hat.
     """
     if current_user.rolle != models.Rolle.Solarteure and current_user.rolle != models.Rolle.Energieberatende:
-        logging_error = LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint=endpoint,
             method=method,
             message="Zugriff verweigert: Nutzer ist kein Solarteur oder Energieberater",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=403, detail="Nur Solarteure und Energieberater haben Zugriff auf diese Daten")
 
 
@@ -131,14 +130,14 @@ async def get_anfragen(
         } for angebot, nutzer, adresse in anfragen]
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebote",
             method="GET",
             message=f"Fehler beim Abrufen der Angebote: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Abrufen der Angebote: {e}")
 
@@ -172,14 +171,14 @@ async def get_anfrage(anlage_id: int, current_user: models.Nutzer = Depends(oaut
         angebot = result.first()
 
         if not angebot:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/angebote/{anlage_id}",
                 method="GET",
                 message="Angebot nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Anfrage {anlage_id} nicht gefunden")
 
         return {
@@ -196,28 +195,28 @@ async def get_anfrage(anlage_id: int, current_user: models.Nutzer = Depends(oaut
         }
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebote/{anlage_id}",
             method="GET",
             message=f"Fehler beim Abrufen des Angebots: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail=f"Fehler beim Abrufen des Angebots: {e}")
 
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/angebote/{anlage_id}",
             method="GET",
             message=f"Fehler beim Abrufen des Angebots: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Abrufen des Angebots: {e}")
 
@@ -245,14 +244,14 @@ async def create_angebot(angebot_data: schemas.AngebotCreate,
 
     pv_anlage = await db.get(models.PVAnlage, angebot_data.anlage_id)
     if not pv_anlage:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebote",
             method="POST",
             message="PV-Anlage nicht gefunden",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="PV-Anlage nicht gefunden "
@@ -260,14 +259,14 @@ async def create_angebot(angebot_data: schemas.AngebotCreate,
 
     if pv_anlage.prozess_status != models.ProzessStatus.AnfrageGestellt and pv_anlage.prozess_status \
             != models.ProzessStatus.DatenFreigegeben:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebote",
             method="POST",
             message="Nicht berechtigt, ein Angebot für diese PV-Anlage zu erstellen.",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Nicht berechtigt, ein Angebot für diese PV-Anlage zu erstellen.")
 
@@ -283,14 +282,14 @@ async def create_angebot(angebot_data: schemas.AngebotCreate,
         haushalt.dachflaeche is None,
         haushalt.energieeffizienzklasse is None
     ]):
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebote",
             method="POST",
             message="Vollständiger Haushaltsdatensatz für den angegebenen Haushalt nicht vorhanden.",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(
             status_code=status.HTTP_406_NOT_ACCEPTABLE,
             detail="Vollständiger Haushaltsdatensatz für den angegebenen Haushalt nicht vorhanden."
@@ -299,14 +298,14 @@ async def create_angebot(angebot_data: schemas.AngebotCreate,
     dashboard_daten_existieren = await db.execute(
         select(models.DashboardSmartMeterData).where(models.DashboardSmartMeterData.haushalt_id == haushalt.user_id))
     if not dashboard_daten_existieren.scalars().first():
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/angebote",
             method="POST",
             message="Keine Dashboard-Daten für den angegebenen Haushalt vorhanden.",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(
             status_code=status.HTTP_406_NOT_ACCEPTABLE,
             detail="Keine Dashboard-Daten für den angegebenen Haushalt vorhanden."
@@ -328,14 +327,14 @@ async def create_angebot(angebot_data: schemas.AngebotCreate,
     pv_anlage.solarteur_id = current_user.user_id
     await db.commit()
 
-    logging_obj = schemas.LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint="/angebote",
         method="POST",
         message="Angebot erfolgreich erstellt!",
         success=False
     )
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
 
     return schemas.AngebotResponse(
         angebot_id=neues_angebot.angebot_id,
@@ -468,14 +467,14 @@ async def get_installationsplan(anlage_id: int,
         if isinstance(e, HTTPException):
             raise e
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/installationsplan/",
             method="GET",
             message=f"Fehler beim Abrufen des Installationsplans: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Fehler beim Abrufen des Installationsplans: {e}"
@@ -503,14 +502,14 @@ async def create_rechnung(anlage_id: int, steller_id: int, db: AsyncSession = De
         pv_anlage = pv_anlage_result.scalar_one_or_none()
 
         if not pv_anlage:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=steller_id,
                 endpoint=f"/installationsplan/",
                 method="POST",
                 message=f"PV-Anlage mit ID {anlage_id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="PV-Anlage nicht gefunden")
 
         empfaenger_id = pv_anlage.haushalt_id
@@ -525,14 +524,14 @@ async def create_rechnung(anlage_id: int, steller_id: int, db: AsyncSession = De
         angebot = angebot_result.scalar_one_or_none()
 
         if not angebot:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=steller_id,
                 endpoint=f"/installationsplan/",
                 method="POST",
                 message=f"Kein akzeptiertes Angebot für PV-Anlagen-ID {anlage_id} gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=404, detail="Angebot nicht gefunden oder nicht angenommen")
 
         rechnungsdaten = {
@@ -549,48 +548,48 @@ async def create_rechnung(anlage_id: int, steller_id: int, db: AsyncSession = De
         await db.commit()
         await db.refresh(neue_rechnung)
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=steller_id,
             endpoint=f"/installationsplan/",
             method="POST",
             message=f"Rechnung erfolgreich erstellt für PV-Anlage-ID {anlage_id}",
             success=True
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
 
         return neue_rechnung
 
     except NoResultFound:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=steller_id,
             endpoint=f"/installationsplan/",
             method="POST",
             message=f"Kein Ergebnis bei der Abfrage des Angebots für die PV-Anlagen-ID {anlage_id} gefunden",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Keine Daten zum Angebot gefunden")
 
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=steller_id,
             endpoint=f"/installationsplan/",
             method="POST",
             message=f"Datenbankfehler in create_rechnung: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Datenbank-Fehler: {e}")
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=steller_id,
             endpoint=f"/installationsplan/",
             method="POST",
             message=f"Unerwarteter Fehler in create_rechnung: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Unerwarteter Fehler: {e}")
 
 
@@ -616,25 +615,25 @@ async def offene_pv_anlagen_abrufen(current_user: models.Nutzer = Depends(oauth.
         result = await db.execute(select(models.PVAnlage).where(models.PVAnlage.solarteur_id == None))
         offene_anlagen = result.scalars().all()
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/offene_pv_anlagen",
             method="GET",
             message="PV-Anlagen erfolgreich abgerugen",
             success=False
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
         return offene_anlagen
     except Exception as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/offene_pv_anlagen",
             method="GET",
             message=f"Fehler beim Abrufen offener PV-Anlagen: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Abrufen offener PV-Anlagen: {e}")
 
@@ -662,38 +661,38 @@ async def datenanfrage_stellen(anlage_id: int = Path(..., description="Die ID de
     await check_solarteur_role(current_user, "POST", f"/datenanfrage/{anlage_id}")
 
     if anlage_id <= 0:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/datenanfrage/{anlage_id}",
             method="POST",
             message="Ungültige Anlage-ID",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Ungültige Anlage-ID")
 
     try:
         pv_anlage_result = await db.execute(select(models.PVAnlage).where(models.PVAnlage.anlage_id == anlage_id))
         pv_anlage = pv_anlage_result.scalars().first()
         if not pv_anlage:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/datenanfrage/{anlage_id}",
                 method="POST",
                 message="PV-Anlage nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PV-Anlage nicht gefunden")
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/datenanfrage/{anlage_id}",
             method="POST",
             message=f"Fehler beim Abrufen der PV-Anlage: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Abrufen der PV-Anlage: {e}")
 
@@ -702,25 +701,25 @@ async def datenanfrage_stellen(anlage_id: int = Path(..., description="Die ID de
             select(models.Haushalte).where(models.Haushalte.user_id == pv_anlage.haushalt_id))
         haushaltsdaten_existieren = haushaltsdaten_existieren.scalars().first()
         if haushaltsdaten_existieren is not None:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/datenanfrage/{anlage_id}",
                 method="POST",
                 message="Haushaltsdaten existieren bereits",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                                 detail="Haushaltsdaten existieren bereits oder Anfrage wurde bereits gestellt")
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/datenanfrage/{anlage_id}",
             method="POST",
             message=f"Fehler beim Überprüfen der Haushaltsdaten: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Überprüfen der Haushaltsdaten: {e}")
 
@@ -733,25 +732,25 @@ async def datenanfrage_stellen(anlage_id: int = Path(..., description="Die ID de
         pv_anlage.prozess_status = models.ProzessStatus.DatenAngefordert
         await db.commit()
     except SQLAlchemyError as e:
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/datenanfrage/{anlage_id}",
             method="POST",
             message=f"Fehler beim Erstellen der Haushaltsdatenanfrage: {e}",
             success=False
         )
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                             detail=f"Fehler beim Erstellen der Haushaltsdatenanfrage: {e}")
 
-    logging_obj = schemas.LoggingSchema(
+    logging_obj = log_eintrag(
         user_id=current_user.user_id,
         endpoint=f"/datenanfrage/{anlage_id}",
         method="POST",
         message=f"Datenanfrage erfolgreich gestellt",
         success=True
     )
-    logger.info(logging_obj.dict())
+    logger.info(logging_obj)
 
     return schemas.DatenanfrageResponse(
         message="Datenanfrage erfolgreich gestellt",
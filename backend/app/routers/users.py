@@ -1,22 +1,23 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Response, Query, WebSocket, WebSocketDisconnect
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from sqlalchemy import exc
+from sqlalchemy import exc, func, text, tuple_, and_, or_, case
+from sqlalchemy.orm import aliased
 from sqlalchemy.future import select
 from logging.config import dictConfig
 import logging
-from time import sleep
-from typing import List, Union, Optional
+import asyncio
+import time
+from collections import OrderedDict
+from typing import List, Literal, Union, Optional
 import uuid
 from datetime import datetime, timedelta
-from app import models, schemas, database, config, hashing, oauth
-from app.logger import LogConfig, LogConfigAdresse, LogConfigRegistration
+from app import models, schemas, database, config, hashing, oauth, geocoding, jobs, chat_hub, chat_gespraeche
+from app.logger import LogConfig, LogConfigAdresse, LogConfigRegistration, log_eintrag
 import uuid
-from app.geo_utils import geocode_address
-from app.email_sender import EmailSender
-from app.config import settings
+from app.email_sender import email_einreihen
 
 
 dictConfig(LogConfigRegistration().dict())
@@ -30,73 +31,75 @@ logger = logging.getLogger("GreenEcoHub")
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-email_sender = EmailSender(
-    smtp_server=settings.SMTP_SERVER,
-    smtp_port=settings.SMTP_PORT,
-    username=settings.USERNAME,
-    password=settings.PASSWORD,
-)
+# Hintergrundaufgabe der Geokodierung, die von diesem Worker-Prozess gestartet wurde
+geocodierung_task = None
 
+USERS_SEITENGROESSE = 50
+USERS_MAX_SEITENGROESSE = 500
+# Unterhalb dieser Größe wird die Gesamtzahl der Nutzer exakt gezählt statt geschätzt
+NUTZER_ANZAHL_SCHAETZEN_AB = 10000
+# Höchstzahl zwischengespeicherter Filterkombinationen, die am längsten nicht genutzten werden verdrängt
+NUTZER_ANZAHL_CACHE_GROESSE = 256
+# (Filterwerte) -> (Zeitpunkt, Anzahl, geschätzt)
+nutzer_anzahl_cache = OrderedDict()
 
-@router.post("/geocode", status_code=status.HTTP_200_OK)
-async def geocode_entries(current_user: models.Nutzer = Depends(oauth.get_current_user),
-                          db: AsyncSession = Depends(database.get_db_async)):
+CHAT_SYNC_LIMIT = 100
+CHAT_SYNC_MAX_LIMIT = 500
+CHAT_INBOX_LIMIT = 50
+CHAT_INBOX_MAX_LIMIT = 500
+# Spielraum zwischen Vergabe der nachricht_id und Zeitstempel gleichzeitig gesendeter Nachrichten
+CHAT_ZEITTOLERANZ = timedelta(minutes=1)
+
+
+@router.post("/geocode", status_code=status.HTTP_202_ACCEPTED)
+async def geocode_entries(current_user: models.Nutzer = Depends(oauth.get_current_user)):
     """
-    Geokodiert Adressen, denen Längen- oder Breitengradinformationen fehlen, indem ein externer Geokodierungsdienst abgefragt wird.
+    Startet im Hintergrund die Geokodierung aller Adressen, denen Längen- oder Breitengradinformationen fehlen.
+
+    Die Adressen werden ratenbegrenzt über den konfigurierten Geocoding-Dienst abgefragt und in Batches gespeichert,
+    über alle Worker-Prozesse hinweg läuft höchstens ein Lauf gleichzeitig. Den Fortschritt liefert
+    GET /users/geocode/status.
 
     Args:
         current_user (models.Nutzer): Der Benutzer, der die Anfrage initiiert. Er muss authentifiziert sein.
-        db (AsyncSession): Die Datenbanksitzung, die für die Abfrage und Aktualisierung von Adressen verwendet wird.
 
     Returns:
-        dict: Eine Nachricht, die den Erfolg des Geokodierungsvorgangs angibt.
+        dict: Eine Nachricht, ob die Geokodierung gestartet wurde oder bereits läuft.
+    """
+    global geocodierung_task
+    if geocodierung_task is not None and not geocodierung_task.done():
+        return {"msg": "Geocodierung läuft bereits"}
 
-    Raises:
-        HTTPException: Wenn es ein Problem mit dem Geokodierungsvorgang gibt oder ein Datenbankfehler auftritt.
+    geocodierung_task = asyncio.create_task(jobs.fuehre_aus("geocodierung", ausgeloest_von=current_user.user_id))
+    logging_obj = log_eintrag(user_id=current_user.user_id, endpoint="/geocode", method="POST",
+                              message="Geocodierung gestartet", success=True)
+    logger_adresse.info(logging_obj)
+    return {"msg": "Geocodierung gestartet"}
+
+
+@router.get("/geocode/status", status_code=status.HTTP_200_OK)
+async def geocode_status(current_user: models.Nutzer = Depends(oauth.get_current_user),
+                         db: AsyncSession = Depends(database.get_db_async)):
     """
-    try:
-        stmt = select(models.Adresse)
-        result = await db.execute(stmt)
-        adressen = result.all()
-        for adresse in adressen:
-            if not adresse[0].latitude or not adresse[0].longitude:
-                latitude, longitude = geocode_address(adresse[0].strasse, adresse[0].hausnummer, adresse[0].plz,
-                                                      adresse[0].stadt)
-                if latitude and longitude:
-                    adresse[0].latitude = latitude
-                    adresse[0].longitude = longitude
-                    await db.commit()
-                    await db.refresh(adresse[0])
-                    logging_msg = f"Adresse {adresse[0].adresse_id} erfolgreich geocodiert"
-                    logging_obj = schemas.LoggingSchema(user_id=current_user.user_id, endpoint="/geocode", method="POST",
-                                                        message=logging_msg, success=True)
-                    logger_adresse.info(logging_obj.dict())
-                    sleep(0.5)
-                else:
-                    continue
-        return {"msg": "Geocodierung erfolgreich"}
+    Gibt den Fortschritt der Geokodierung zurück.
 
-    except exc.IntegrityError as e:
-        if config.settings.DEV:
-            msg = f"Error beim geocode Update {e.orig}"
-            logging_msg = msg
-        else:
-            logging_msg = f"Error beim geocode Update: {e.orig}"
-            msg = "Es gab einen Fehler bei der geocodierung."
-        logging_obj = schemas.LoggingSchema(user_id=current_user.user_id, endpoint="/geocode", method="POST",
-                                            message=logging_msg, success=False)
-        logger.error(logging_obj.dict())
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
-    except Exception as e:
-        logging_error = schemas.LoggingSchema(
-            user_id=current_user.user_id,
-            endpoint="/geocode",
-            method="POST",
-            message=f"Interner Serverfehler bei Geocodierung: {str(e)}",
-            success=False
-        )
-        logger.error(logging_error.dict())
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
+    Args:
+        current_user (models.Nutzer): Der Benutzer, der die Anfrage initiiert. Er muss authentifiziert sein.
+        db (AsyncSession): Die Datenbanksitzung.
+
+    Returns:
+        dict: Die Anzahl der Adressen ohne Koordinaten, der letzte protokollierte Lauf und, falls die Geokodierung
+        in diesem Worker-Prozess läuft oder lief, deren aktueller Fortschritt.
+    """
+    offen = await db.scalar(select(func.count()).select_from(models.Adresse)
+                            .where(geocoding.fehlende_koordinaten()))
+    letzter_lauf = await db.scalar(select(models.JobLauf).where(models.JobLauf.job == "geocodierung")
+                                   .order_by(models.JobLauf.gestartet_am.desc()).limit(1))
+    return {
+        "offen": offen,
+        "letzter_lauf": schemas.JobLaufResponse.model_validate(letzter_lauf) if letzter_lauf else None,
+        "fortschritt": geocoding.fortschritt if geocoding.fortschritt["gestartet_am"] else None,
+    }
 
 
 async def register_user(nutzer: schemas.NutzerCreate, db: AsyncSession):
@@ -124,20 +127,20 @@ async def register_user(nutzer: schemas.NutzerCreate, db: AsyncSession):
             else:
                 logging_msg = f"Error beim : {e}"
                 msg = "Es gab einen Fehler bei der Registrierung."
-            logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/registration", method="POST",
-                                                message=logging_msg, success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=0, endpoint="/users/registration", method="POST",
+                                      message=logging_msg, success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
         email = nutzer.email
-        nutzer.passwort = hashing.Hashing.hash_password(nutzer.passwort)
+        nutzer.passwort = await hashing.Hashing.hash_password_async(nutzer.passwort)
         stmt = select(models.Nutzer).where(models.Nutzer.email == email)
         res = await db.execute(stmt)
         if res.scalars().first() is not None:
             logging_msg = schemas.RegistrationLogging(user_id=0, role="unknown", msg=f"Email {email} bereits vergeben")
-            logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/registration", method="POST",
-                                                message=f"Email {email} bereits vergeben", success=False)
+            logging_obj = log_eintrag(user_id=0, endpoint="/users/registration", method="POST",
+                                      message=f"Email {email} bereits vergeben", success=False)
             logger_registration.error(logging_msg.dict())
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email bereits vergeben")
 
         db_user = models.Nutzer(**nutzer.dict())
@@ -147,7 +150,7 @@ async def register_user(nutzer: schemas.NutzerCreate, db: AsyncSession):
 
         subject = "Willkommen bei GreenEcoHub!"
         body = f"Hallo {nutzer.vorname},\n\nVielen Dank für Ihre Anmeldung bei GreenEcoHub."
-        await email_sender.send_email(nutzer.email, subject, body)
+        await email_einreihen(db, nutzer.email, subject, body)
 
         user_id = db_user.user_id
 
@@ -159,10 +162,10 @@ async def register_user(nutzer: schemas.NutzerCreate, db: AsyncSession):
 
         logging_msg = schemas.RegistrationLogging(user_id=db_user.user_id, role=db_user.rolle.value,
                                                   msg="User registriert")
-        logging_obj = schemas.LoggingSchema(user_id=db_user.user_id, endpoint="/users/registration", method="POST",
-                                            message="User registriert", success=True)
+        logging_obj = log_eintrag(user_id=db_user.user_id, endpoint="/users/registration", method="POST",
+                                  message="User registriert", success=True)
         logger_registration.info(logging_msg.dict())
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
     except exc.IntegrityError as e:
         if config.settings.DEV:
             msg = f"Es gab folgenden SQL Fehler: {e.orig}"
@@ -171,11 +174,11 @@ async def register_user(nutzer: schemas.NutzerCreate, db: AsyncSession):
             logging_msg = f"Error while registering user: {e.orig}"
             msg = "Es gab einen Fehler bei der Registrierung."
 
-        logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/registration", method="POST",
-                                            message=logging_msg, success=False)
+        logging_obj = log_eintrag(user_id=0, endpoint="/users/registration", method="POST",
+                                  message=logging_msg, success=False)
         logging_msg = schemas.RegistrationLogging(user_id=0, role="unknown", msg=logging_msg)
         logger_registration.error(logging_msg.dict())
-        logger.error(logging_obj.dict())
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
     return db_user.user_id
@@ -218,6 +221,10 @@ async def create_adresse(adresse: schemas.AdresseCreate, db: AsyncSession = Depe
     """
     try:
         db_adresse = models.Adresse(**adresse.dict())
+        # Bekannte Adressen sofort mit Koordinaten speichern, alle anderen übernimmt die Geocodierung
+        koordinaten = await geocoding.koordinaten_aus_cache(db, db_adresse)
+        if koordinaten is not None:
+            db_adresse.latitude, db_adresse.longitude = koordinaten
         db.add(db_adresse)
         await db.commit()
         await db.refresh(db_adresse)
@@ -343,16 +350,21 @@ async def update_adresse(id: int, adresse: schemas.AdresseCreate, db: AsyncSessi
     """
     stmt = select(models.Adresse).where(models.Adresse.adresse_id == id)
     result = await db.execute(stmt)
-    db_adresse = result.first()
+    db_adresse = result.scalars().first()
 
     if db_adresse is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Adresse nicht gefunden")
+    alter_schluessel = geocoding.adresse_schluessel(db_adresse)
     db_adresse.strasse = adresse.strasse
     db_adresse.hausnummer = adresse.hausnummer
     db_adresse.zusatz = adresse.zusatz
     db_adresse.plz = adresse.plz
     db_adresse.stadt = adresse.stadt
     db_adresse.land = adresse.land
+    if geocoding.adresse_schluessel(db_adresse) != alter_schluessel:
+        # Koordinaten der alten Adresse verwerfen, ohne Cache-Treffer übernimmt die Geocodierung
+        koordinaten = await geocoding.koordinaten_aus_cache(db, db_adresse)
+        db_adresse.latitude, db_adresse.longitude = koordinaten if koordinaten is not None else (None, None)
     await db.commit()
     await db.refresh(db_adresse)
     return {"adresse_id": db_adresse.adresse_id}
@@ -428,9 +440,9 @@ async def update_user(id: int, updated_user: schemas.NutzerUpdate, db: AsyncSess
         try:
             db_user = result.first()[0]
         except TypeError:
-            logging_obj = schemas.LoggingSchema(user_id=id, endpoint="/users/{id}", method="PUT",
-                                                message="Nutzer nicht gefunden zum Bearbeiten", success=False)
-            logger.error(logging_obj.dict())
+            logging_obj = log_eintrag(user_id=id, endpoint="/users/{id}", method="PUT",
+                                      message="Nutzer nicht gefunden zum Bearbeiten", success=False)
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User nicht gefunden")
 
         changes = {}
@@ -448,7 +460,7 @@ async def update_user(id: int, updated_user: schemas.NutzerUpdate, db: AsyncSess
 
             if new_value is not None and new_value != getattr(db_user, field):
                 if field == "passwort" and new_value:
-                    new_value = hashing.Hashing.hash_password(new_value)
+                    new_value = await hashing.Hashing.hash_password_async(new_value)
                 if field == "geburtsdatum" and new_value:
                     try:
                         new_value = datetime.strptime(new_value, "%Y-%m-%d").date()
@@ -466,17 +478,18 @@ async def update_user(id: int, updated_user: schemas.NutzerUpdate, db: AsyncSess
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
         await db.commit()
+        await oauth.invalidiere_nutzer(db, id)
         await db.refresh(db_user)
 
         if changes:
-            logging_info = schemas.LoggingSchema(
+            logging_info = log_eintrag(
                 user_id=id,
                 endpoint=f"/users/{id}",
                 method="PUT",
                 message=f"Änderungen an Nutzerdaten: {changes}",
                 success=True
             )
-            logger.info(logging_info.dict())
+            logger.info(logging_info)
 
         return {"user_id": db_user.user_id}
     except exc.IntegrityError as e:
@@ -486,22 +499,129 @@ async def update_user(id: int, updated_user: schemas.NutzerUpdate, db: AsyncSess
         else:
             logging_msg = f"Error beim User Update: {e.orig}"
             msg = "Es gab einen Fehler bei der Registrierung."
-        logging_obj = schemas.LoggingSchema(user_id=id, endpoint="/users/{id}", method="PUT",
-                                            message=logging_msg, success=False)
-        logger.error(logging_obj.dict())
+        logging_obj = log_eintrag(user_id=id, endpoint="/users/{id}", method="PUT",
+                                  message=logging_msg, success=False)
+        logger.error(logging_obj)
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
 
 
+def nutzer_cursor(user_id: int, created_at: Optional[datetime], sortierung: str) -> str:
+    """
+    Erzeugt den Cursor für die nächste Seite von GET /users/.
+
+    Args:
+        user_id (int): Die ID des letzten Nutzers der Seite.
+        created_at (Optional[datetime]): Der Erstellungszeitpunkt des letzten Nutzers der Seite.
+        sortierung (str): Die Sortierspalte, user_id oder created_at.
+
+    Returns:
+        str: Bei Sortierung nach user_id die ID, sonst "<created_at>,<user_id>".
+    """
+    if sortierung == "created_at":
+        return f"{created_at.isoformat()},{user_id}"
+    return str(user_id)
+
+
+def lies_nutzer_cursor(cursor: str, sortierung: str) -> tuple:
+    """
+    Liest einen mit nutzer_cursor erzeugten Cursor.
+
+    Args:
+        cursor (str): Der Cursor aus X-Next-Cursor.
+        sortierung (str): Die Sortierspalte, user_id oder created_at.
+
+    Returns:
+        tuple: Die Werte der Sortierspalten des letzten Nutzers der vorherigen Seite.
+
+    Raises:
+        HTTPException: Wenn der Cursor nicht zur Sortierung passt.
+    """
+    try:
+        if sortierung == "created_at":
+            created_at, user_id = cursor.rsplit(",", 1)
+            return datetime.fromisoformat(created_at), int(user_id)
+        return (int(cursor),)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ungültiger Cursor")
+
+
+async def nutzer_anzahl(db: AsyncSession, filter_ausdruecke: list, schluessel: tuple) -> tuple:
+    """
+    Ermittelt die Gesamtzahl der Nutzer für GET /users/ und speichert sie USERS_COUNT_CACHE_SECONDS lang
+    je Filterkombination zwischen. Der Cache hält höchstens NUTZER_ANZAHL_CACHE_GROESSE Filterkombinationen.
+
+    Ohne Filter wird die Schätzung des Planners aus pg_class.reltuples verwendet, sofern die Tabelle groß genug ist,
+    dass sich ein vollständiges COUNT(*) bemerkbar machen würde. Mit Filtern wird exakt gezählt, die Filter sind
+    über die Indizes auf rolle und created_at abgedeckt.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        filter_ausdruecke (list): Die WHERE-Bedingungen der Abfrage.
+        schluessel (tuple): Die Filterwerte als Cache-Schlüssel.
+
+    Returns:
+        tuple: Die Anzahl und ob es sich um eine Schätzung handelt.
+    """
+    jetzt = time.monotonic()
+    eintrag = nutzer_anzahl_cache.pop(schluessel, None)
+    if eintrag is not None and jetzt - eintrag[0] < config.settings.USERS_COUNT_CACHE_SECONDS:
+        nutzer_anzahl_cache[schluessel] = eintrag
+        return eintrag[1], eintrag[2]
+
+    anzahl, geschaetzt = None, False
+    if not filter_ausdruecke:
+        reltuples = await db.scalar(text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+                                    {"name": models.Nutzer.__tablename__})
+        # reltuples ist -1 bzw. 0, solange die Tabelle nicht analysiert wurde
+        if reltuples is not None and reltuples >= NUTZER_ANZAHL_SCHAETZEN_AB:
+            anzahl, geschaetzt = reltuples, True
+    if anzahl is None:
+        anzahl = await db.scalar(
+            select(func.count())
+            .select_from(models.Nutzer)
+            .join(models.Adresse, models.Nutzer.adresse_id == models.Adresse.adresse_id)
+            .where(*filter_ausdruecke)
+        )
+
+    nutzer_anzahl_cache[schluessel] = (jetzt, anzahl, geschaetzt)
+    while len(nutzer_anzahl_cache) > NUTZER_ANZAHL_CACHE_GROESSE:
+        nutzer_anzahl_cache.popitem(last=False)
+    return anzahl, geschaetzt
+
+
 @router.get("/", status_code=status.HTTP_200_OK)
-async def get_users(skip: int = 0, limit: int | None = None,
+async def get_users(response: Response,
+                    cursor: Optional[str] = Query(None, description="Wert aus X-Next-Cursor der vorherigen Seite"),
+                    limit: Optional[int] = Query(None, ge=1, le=USERS_MAX_SEITENGROESSE),
+                    rolle: Optional[models.Rolle] = Query(None),
+                    is_active: Optional[bool] = Query(None),
+                    erstellt_von: Optional[datetime] = Query(None, description="Frühester created_at (inklusive)"),
+                    erstellt_bis: Optional[datetime] = Query(None, description="Spätester created_at (exklusive)"),
+                    sortierung: Literal["user_id", "created_at"] = Query("user_id"),
+                    absteigend: bool = Query(False),
+                    mit_anzahl: bool = Query(False, description="Gesamtzahl im Header X-Total-Count liefern"),
                     current_user: models.Nutzer = Depends(oauth.get_current_user),
                     db: AsyncSession = Depends(database.get_db_async)):
     """
-    Ruft eine Liste von Benutzern aus der Datenbank ab.
+    Ruft eine Seite von Benutzern mit ihrer Adresse aus der Datenbank ab.
+
+    Die Benutzer werden nach user_id bzw. created_at sortiert und per Keyset-Paginierung geblättert: Für die
+    nächste Seite wird der Header X-Next-Cursor als cursor übergeben, er ist gesetzt, solange weitere Benutzer
+    folgen können. So bleiben Antwortgröße und Datenbankzeit unabhängig von der Anzahl der Benutzer. Bei Sortierung
+    nach created_at werden Benutzer ohne created_at nicht aufgeführt, da sie keine Position im Keyset haben.
 
     Args:
-        skip (int): Die Anzahl der zu überspringenden Datensätze (für Paginierung).
-        limit (int | Keine): Die maximale Anzahl von Datensätzen, die zurückgegeben werden sollen. Wenn None, wird keine Begrenzung angewendet.
+        response (Response): Die Antwort, in der die Header X-Next-Cursor und X-Total-Count gesetzt werden.
+        cursor (Optional[str]): Es werden nur Benutzer nach dem Cursor zurückgegeben.
+        limit (Optional[int]): Die maximale Anzahl der Benutzer, standardmäßig USERS_SEITENGROESSE.
+        rolle (Optional[models.Rolle]): Filter auf die Rolle.
+        is_active (Optional[bool]): Filter auf aktive bzw. deaktivierte Benutzer.
+        erstellt_von (Optional[datetime]): Frühester Erstellungszeitpunkt (inklusive).
+        erstellt_bis (Optional[datetime]): Spätester Erstellungszeitpunkt (exklusive).
+        sortierung (str): Die Sortierspalte, user_id oder created_at.
+        absteigend (bool): Ob absteigend sortiert wird.
+        mit_anzahl (bool): Ob die Gesamtzahl der passenden Benutzer im Header X-Total-Count geliefert wird.
+            X-Total-Count-Estimated gibt an, ob es sich um eine Schätzung handelt.
         current_user (models.Nutzer): Der aktuell authentifizierte Benutzer, erforderlich für die Autorisierung.
         db (AsyncSession): Die Datenbanksitzung für den Vorgang.
 
@@ -509,18 +629,39 @@ async def get_users(skip: int = 0, limit: int | None = None,
         List[dict]: Eine Liste von Dictionaries, die jeweils einen Benutzer und die zugehörige Adresse darstellen.
 
     Raises:
-        HTTPException: Wenn ein Datenbankfehler auftritt.
+        HTTPException: Wenn der Cursor ungültig ist oder ein Datenbankfehler auftritt.
     """
+    filter_ausdruecke = []
+    if rolle is not None:
+        filter_ausdruecke.append(models.Nutzer.rolle == rolle)
+    if is_active is not None:
+        filter_ausdruecke.append(models.Nutzer.is_active == is_active)
+    if erstellt_von is not None:
+        filter_ausdruecke.append(models.Nutzer.created_at >= erstellt_von)
+    if erstellt_bis is not None:
+        filter_ausdruecke.append(models.Nutzer.created_at < erstellt_bis)
+    if sortierung == "created_at":
+        filter_ausdruecke.append(models.Nutzer.created_at.isnot(None))
+
+    sortierspalten = [models.Nutzer.user_id] if sortierung == "user_id" \
+        else [models.Nutzer.created_at, models.Nutzer.user_id]
     stmt = (
-        select(models.Nutzer, models.Adresse)
+        select(models.Nutzer.user_id, models.Nutzer.nachname, models.Nutzer.vorname, models.Nutzer.email,
+               models.Nutzer.rolle, models.Nutzer.adresse_id, models.Nutzer.geburtsdatum,
+               models.Nutzer.telefonnummer, models.Nutzer.is_active, models.Nutzer.created_at,
+               models.Adresse.strasse, models.Adresse.stadt, models.Adresse.hausnummer, models.Adresse.plz)
         .join(models.Adresse, models.Nutzer.adresse_id == models.Adresse.adresse_id)
-        .offset(skip)
+        .where(*filter_ausdruecke)
+        .order_by(*[spalte.desc() if absteigend else spalte for spalte in sortierspalten])
+        .limit(limit or USERS_SEITENGROESSE)
     )
-    if limit is not None:
-        stmt = stmt.limit(limit)
+    if cursor is not None:
+        spalten, werte = tuple_(*sortierspalten), tuple_(*lies_nutzer_cursor(cursor, sortierung))
+        stmt = stmt.where(spalten < werte if absteigend else spalten > werte)
+
     try:
         result = await db.execute(stmt)
-        user_adresse_pairs = result.all()
+        zeilen = result.all()
         users_out = [{
             "nachname": user.nachname,
             "email": user.email,
@@ -530,25 +671,35 @@ async def get_users(skip: int = 0, limit: int | None = None,
             "adresse_id": user.adresse_id,
             "geburtsdatum": user.geburtsdatum,
             "telefonnummer": user.telefonnummer,
-            "strasse": adresse.strasse,
-            "stadt": adresse.stadt,
-            "hausnr": adresse.hausnummer,
-            "plz": adresse.plz,
-            "is_active": user.is_active
-
-        } for user, adresse in user_adresse_pairs]
-        return users_out
-    except exc.IntegrityError as e:
+            "strasse": user.strasse,
+            "stadt": user.stadt,
+            "hausnr": user.hausnummer,
+            "plz": user.plz,
+            "is_active": user.is_active,
+            "created_at": user.created_at
+
+        } for user in zeilen]
+
+        if mit_anzahl:
+            schluessel = (rolle, is_active, erstellt_von, erstellt_bis, sortierung == "created_at")
+            anzahl, geschaetzt = await nutzer_anzahl(db, filter_ausdruecke, schluessel)
+            response.headers["X-Total-Count"] = str(anzahl)
+            response.headers["X-Total-Count-Estimated"] = str(geschaetzt).lower()
+    except exc.SQLAlchemyError as e:
         if config.settings.DEV:
-            msg = f"Error beim User Abfragen: {e.orig}"
+            msg = f"Error beim User Abfragen: {e}"
             logging_msg = msg
         else:
-            logging_msg = f"Error beim User Abfragen: {e.orig}"
+            logging_msg = f"Error beim User Abfragen: {e}"
             msg = "Es gab einen Fehler bei der user Abfrage."
-        logging_obj = schemas.LoggingSchema(user_id=0, endpoint="/users/", method="GET",
-                                            message=logging_msg, success=False)
-        logger.error(logging_obj.dict())
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=msg)
+        logging_obj = log_eintrag(user_id=current_user.user_id, endpoint="/users/", method="GET",
+                                  message=logging_msg, success=False)
+        logger.error(logging_obj)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=msg)
+
+    if len(zeilen) == (limit or USERS_SEITENGROESSE):
+        response.headers["X-Next-Cursor"] = nutzer_cursor(zeilen[-1].user_id, zeilen[-1].created_at, sortierung)
+    return users_out
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -567,33 +718,34 @@ async def delete_user(id: int, db: AsyncSession = Depends(database.get_db_async)
     """
     try:
         if current_user.rolle != models.Rolle.Admin:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/users/{id}",
                 method="DELETE",
                 message=f"Zugriff verweigert: Nutzer {current_user.user_id} ist kein Admin",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nur Admins können Nutzer löschen")
 
         stmt = select(models.Nutzer).where(models.Nutzer.user_id == id)
         result = await db.execute(stmt)
         user = result.scalars().first()
         if not user:
-            logging_obj = schemas.LoggingSchema(
+            logging_obj = log_eintrag(
                 user_id=current_user.user_id,
                 endpoint=f"/users/{id}",
                 method="DELETE",
                 message=f"Nutzer mit ID {id} nicht gefunden",
                 success=False
             )
-            logger.error(logging_obj.dict())
+            logger.error(logging_obj)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nutzer nicht gefunden")
 
         adresse_id = user.adresse_id
         await db.delete(user)
         await db.commit()
+        await oauth.invalidiere_nutzer(db, id)
 
         # Überprüfung kann ausgelassen werden, ist drin für sehr unwahrscheinliche Szenarien
         other_users = await db.execute(select(models.Nutzer).where(models.Nutzer.adresse_id == adresse_id))
@@ -603,24 +755,24 @@ async def delete_user(id: int, db: AsyncSession = Depends(database.get_db_async)
                 await db.delete(adresse)
                 await db.commit()
 
-        logging_obj = schemas.LoggingSchema(
+        logging_obj = log_eintrag(
             user_id=current_user.user_id,
             endpoint=f"/users/{id}",
             method="DELETE",
             message="Nutzer erfolgreich gelöscht",
             success=True
         )
-        logger.info(logging_obj.dict())
+        logger.info(logging_obj)
 
     except Exception as e:
-        logging_error = schemas.LoggingSchema(
+        logging_error = log_eintrag(
             user_id=current_user.user_id,
             endpoint="/admin/logs",
             method="GET",
             message=f"Interner Serverfehler: {str(e)}",
             success=False
         )
-        logger.error(logging_error.dict())
+        logger.error(logging_error)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
 
@@ -652,7 +804,7 @@ async def request_password_reset(request: schemas.PasswortReqReset, db: AsyncSes
         reset_token = await generate_password_reset_token()
         await store_reset_token(user.user_id, reset_token, db)
 
-        await send_password_recovery_email(email, reset_token)
+        await send_password_recovery_email(email, reset_token, db)
 
         return "Wenn Ihre E-Mail registriert ist, wird ein Wiederherstellungslink gesendet."
 
@@ -694,13 +846,15 @@ async def store_reset_token(user_id, token, db):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
 
 
-async def send_password_recovery_email(user_email, token):
+async def send_password_recovery_email(user_email, token, db):
     """
-    Sendet eine E-Mail zur Wiederherstellung des Passworts an den Benutzer, die den Link zum Zurücksetzen enthält.
+    Reiht eine E-Mail zur Wiederherstellung des Passworts, die den Link zum Zurücksetzen enthält, in den Postausgang
+    ein. Versendet wird sie im Hintergrund, sodass die Anfrage nicht auf den SMTP-Server wartet.
 
     Args:
         user_email (str): Die E-Mail-Adresse des Benutzers, an den der Wiederherstellungslink gesendet werden soll.
         token (str): Das Token, das im Wiederherstellungslink enthalten sein soll.
+        db (AsyncSession): Die Datenbanksitzung für den Vorgang.
 
     Raises:
         Exception: Wenn beim Senden der E-Mail ein Fehler auftritt.
@@ -710,9 +864,9 @@ async def send_password_recovery_email(user_email, token):
     body = f"Bitte klicken Sie auf den Link, um Ihr Passwort zurückzusetzen: {recovery_link}"
 
     try:
-        await email_sender.send_email(user_email, subject, body)
+        await email_einreihen(db, user_email, subject, body)
     except Exception as e:
-        logger.error(f"Fehler beim Senden einer Wiederherstellungs-E-Mail: {e}")
+        logger.error(f"Fehler beim Einreihen einer Wiederherstellungs-E-Mail: {e}")
 
 
 @router.post("/reset-passwort/{token}")
@@ -740,64 +894,65 @@ async def reset_passwort(token: str, reset_data: schemas.PasswortReset,
         token_data = result.scalar_one_or_none()
         if not token_data:
             await db.rollback()
-            logging_error = schemas.LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=0,
                 endpoint="/users/reset-passwort/" + token,
                 method="POST",
                 message=f"Ungültiger Token: {token}",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ungültiger Token")
 
         if token_data.expiration < datetime.utcnow():
             await db.rollback()
-            logging_error = schemas.LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=0,
                 endpoint="/users/reset-passwort/" + token,
                 method="POST",
                 message=f"Token abgelaufen: {token}",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token abgelaufen")
             raise ValueError("Ungültiger Token")
 
         if token_data.expiration < datetime.utcnow():
             raise ValueError("Token abgelaufen")
 
-        hashed_passwort = hashing.Hashing.hash_password(reset_data.neu_passwort)
+        hashed_passwort = await hashing.Hashing.hash_password_async(reset_data.neu_passwort)
 
         result = await db.execute(select(models.Nutzer).filter(models.Nutzer.user_id == token_data.user_id))
         nutzer = result.scalar_one_or_none()
 
         if not nutzer:
             await db.rollback()
-            logging_error = schemas.LoggingSchema(
+            logging_error = log_eintrag(
                 user_id=0,
                 endpoint="/users/reset-passwort/" + token,
                 method="POST",
                 message=f"Nutzer nicht gefunden: {token_data.user_id}",
                 success=False
             )
-            logger.error(logging_error.dict())
+            logger.error(logging_error)
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nutzer nicht gefunden")
 
         nutzer.passwort = hashed_passwort
         await db.commit()
+        await oauth.invalidiere_nutzer(db, nutzer.user_id)
         await db.refresh(nutzer)
 
         await db.delete(token_data)
         await db.commit()
 
-        logging_info = schemas.LoggingSchema(
+        logging_info = log_eintrag(
             user_id=nutzer.user_id,
             endpoint="/users/reset-passwort/" + token,
             method="POST",
             message="Passwort erfolgreich zurückgesetzt",
             success=True
         )
-        logger.info(logging_info.dict())
+        logger.info(logging_info)
         return "Passwort erfolgreich zurückgesetzt"
 
     except ValueError as ve:
@@ -823,6 +978,10 @@ async def send_message(chat_message: schemas.ChatMessageCreate, db: AsyncSession
         chat_message (schemas.ChatMessageCreate): Enthält den Absender, den Empfänger und den Inhalt der Nachricht.
         db (AsyncSession): Die Datenbanksitzung für den Vorgang.
 
+    In derselben Transaktion wird die Zusammenfassung des Gesprächs in chat_conversations aktualisiert und die
+    Nachricht per NOTIFY angekündigt, die mit dem Commit an die über /users/chat/ws verbundenen Clients von Absender
+    und Empfänger ausgeliefert wird.
+
     Returns:
         schemas.ChatMessageSendResponse: Eine Antwort, die anzeigt, dass die Nachricht erfolgreich gesendet wurde.
 
@@ -831,11 +990,86 @@ async def send_message(chat_message: schemas.ChatMessageCreate, db: AsyncSession
     """
     neue_nachricht = models.ChatMessage(**chat_message.dict())
     db.add(neue_nachricht)
-    await db.commit()
+    await db.flush()
     await db.refresh(neue_nachricht)
+    await chat_gespraeche.aktualisiere_gespraech(db, neue_nachricht)
+    await chat_hub.benachrichtige(db, neue_nachricht)
+    await db.commit()
     return {"nachricht": "Nachricht erfolgreich gesendet", "nachricht_id": neue_nachricht.nachricht_id}
 
 
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket, token: str = Query(...)):
+    """
+    WebSocket, über den neue Chatnachrichten des Benutzers sofort nach dem Speichern zugestellt werden.
+
+    Browser können beim Verbindungsaufbau keinen Authorization-Header setzen, daher wird der JWT als Query-Parameter
+    übergeben und wie bei den übrigen Endpunkten geprüft. Die Prüfung wird alle CHAT_WS_AUTH_CHECK_SECONDS
+    wiederholt, sodass die Verbindung nach einer Sperre des Tokens (TokenSperrliste) oder einer Deaktivierung des
+    Nutzers geschlossen wird, spätestens aber, wenn der Token abläuft. Die Verbindung wird dabei wie bei einem
+    ungültigen Token mit dem Code 1008 geschlossen; erst nach dem accept kommt der Code beim Browser an, der sich
+    dann nicht erneut verbindet. Der Server sendet JSON-Ereignisse: {"typ": "nachricht", "nachricht": {...}} für
+    jede Nachricht, die der Benutzer sendet oder empfängt, und {"typ": "resync"}, wenn Nachrichten verpasst worden
+    sein können und über /users/chat/sync nachgeladen werden sollen. Nachrichten des Clients werden ignoriert.
+
+    Args:
+        websocket (WebSocket): Die WebSocket-Verbindung.
+        token (str): Der JWT des Benutzers.
+    """
+    await websocket.accept()
+    try:
+        async with database.SessionLocal() as db:
+            claims = await oauth.get_current_claims(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    chat_hub.hub.verbinden(claims.user_id, websocket)
+    try:
+        naechste_pruefung = time.monotonic() + config.settings.CHAT_WS_AUTH_CHECK_SECONDS
+        while (restlaufzeit := oauth.token_restlaufzeit(token)) > 0:
+            try:
+                await asyncio.wait_for(websocket.receive_text(),
+                                       timeout=max(0.0, min(restlaufzeit, naechste_pruefung - time.monotonic())))
+            except asyncio.TimeoutError:
+                pass
+            if time.monotonic() >= naechste_pruefung:
+                naechste_pruefung = time.monotonic() + config.settings.CHAT_WS_AUTH_CHECK_SECONDS
+                if not await chat_token_gueltig(token, claims.user_id):
+                    break
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_hub.hub.trennen(claims.user_id, websocket)
+
+
+async def chat_token_gueltig(token: str, user_id: int) -> bool:
+    """
+    Prüft den Token einer bestehenden WebSocket-Verbindung erneut gegen die Sperrliste und den Nutzer.
+
+    Ein Datenbankfehler wird protokolliert und beendet die Verbindung nicht, geprüft wird beim nächsten Mal erneut.
+
+    Args:
+        token (str): Der JWT des Benutzers.
+        user_id (int): Die ID des Benutzers.
+
+    Returns:
+        bool: False, wenn der Token gesperrt oder der Nutzer deaktiviert bzw. gelöscht ist.
+    """
+    try:
+        async with database.SessionLocal() as db:
+            await oauth.get_current_claims(token, db)
+        return True
+    except HTTPException:
+        return False
+    except SQLAlchemyError as e:
+        logging_obj = log_eintrag(user_id=user_id, endpoint="/users/chat/ws", method="GET",
+                                  message=f"Fehler beim erneuten Prüfen des Tokens: {e}", success=False)
+        logger.error(logging_obj)
+        return True
+
+
 @router.get("/user-chat-history", status_code=status.HTTP_200_OK)
 async def get_user_chat_history(user_id: int, db: AsyncSession = Depends(database.get_db_async)):
     """
@@ -879,14 +1113,179 @@ async def get_chat_history(user_id: Optional[int] = None, other_user_id: Optiona
     if not user_id:
         user_id = current_user.user_id
 
-    query = select(models.ChatMessage).where(
-        (models.ChatMessage.sender_id == user_id) | (models.ChatMessage.empfaenger_id == user_id))
-
-    if other_user_id:
-        query = query.where(
-            (models.ChatMessage.sender_id == other_user_id) | (models.ChatMessage.empfaenger_id == other_user_id))
+    query = select(models.ChatMessage).where(gespraech_bedingung(user_id, other_user_id))
 
     result = await db.execute(query)
     chat_history = result.scalars().all()
 
     return chat_history
+
+
+def gespraech_bedingung(user_id: int, other_user_id: Optional[int] = None):
+    """
+    Gibt die WHERE-Bedingung für die Nachrichten eines Nutzers bzw. eines Gesprächs zwischen zwei Nutzern zurück.
+
+    Das Gespräch wird als (sender_id, empfaenger_id) in beide Richtungen formuliert, sodass Postgres die beiden
+    zusammengesetzten Indizes auf chat_messages per BitmapOr nutzen kann.
+
+    Args:
+        user_id (int): Die ID des Nutzers.
+        other_user_id (Optional[int]): Die ID des Gesprächspartners, ohne sie alle Gespräche des Nutzers.
+
+    Returns:
+        ColumnElement: Die Bedingung.
+    """
+    nachricht = models.ChatMessage
+    if other_user_id:
+        return or_(and_(nachricht.sender_id == user_id, nachricht.empfaenger_id == other_user_id),
+                   and_(nachricht.sender_id == other_user_id, nachricht.empfaenger_id == user_id))
+    return or_(nachricht.sender_id == user_id, nachricht.empfaenger_id == user_id)
+
+
+@router.get("/chat/sync", response_model=schemas.ChatSyncResponse, status_code=status.HTTP_200_OK)
+async def sync_chat(seit_id: Optional[int] = Query(None, description="Höchste bereits bekannte nachricht_id"),
+                    seit: Optional[datetime] = Query(None, description="Nur Nachrichten nach diesem Zeitpunkt"),
+                    other_user_id: Optional[int] = Query(None, description="Nur das Gespräch mit diesem Nutzer"),
+                    limit: int = Query(CHAT_SYNC_LIMIT, ge=1, le=CHAT_SYNC_MAX_LIMIT),
+                    current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                    db: AsyncSession = Depends(database.get_db_async)):
+    """
+    Liefert nur die Chatnachrichten des aktuellen Benutzers, die seit dem letzten Abruf hinzugekommen sind.
+
+    Der Client übergibt als seit_id den cursor der vorherigen Antwort und erhält die neueren Nachrichten, sortiert
+    nach nachricht_id. Ohne seit_id und seit wird der aktuelle Stand geladen. Je Gespräch werden höchstens limit
+    Nachrichten geliefert, und zwar die neuesten; die IDs der Gesprächspartner, bei denen ältere neue Nachrichten
+    weggelassen wurden, stehen in gekuerzt, ihr Verlauf kann über /users/chat/history nachgeladen werden.
+
+    Die nachricht_id wird beim Einfügen vergeben, nicht beim Commit. Committet eine Nachricht erst, nachdem eine
+    Nachricht mit größerer ID bereits ausgeliefert wurde, überspringt der Cursor sie. Solche Nachrichten erreichen
+    verbundene Clients über den WebSocket (/users/chat/ws), der erst beim Commit benachrichtigt wird, und sind
+    über /users/chat/history vollständig abrufbar. seit_id eignet sich daher zum Nachladen, nicht als alleinige
+    Garantie für Vollständigkeit.
+
+    Args:
+        seit_id (Optional[int]): Es werden nur Nachrichten mit größerer nachricht_id geliefert.
+        seit (Optional[datetime]): Es werden nur Nachrichten mit späterem Zeitstempel geliefert.
+        other_user_id (Optional[int]): Beschränkt die Synchronisation auf das Gespräch mit diesem Nutzer.
+        limit (int): Die maximale Anzahl an Nachrichten je Gespräch.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung für den Vorgang.
+
+    Returns:
+        schemas.ChatSyncResponse: Die neuen Nachrichten, der cursor für den nächsten Abruf und die gekürzten
+        Gespräche.
+
+    Raises:
+        HTTPException: Wenn ein Datenbankfehler auftritt.
+    """
+    nachricht = models.ChatMessage
+    user_id = current_user.user_id
+    bedingungen = [gespraech_bedingung(user_id, other_user_id)]
+    try:
+        if seit_id is not None:
+            bedingungen.append(nachricht.nachricht_id > seit_id)
+            if other_user_id and seit is None:
+                # Mit einer unteren Zeitgrenze liest Postgres im Index (…, timestamp) nur die neuen Nachrichten
+                seit_zeit = await db.scalar(select(nachricht.timestamp).where(nachricht.nachricht_id == seit_id))
+                if seit_zeit is not None:
+                    bedingungen.append(nachricht.timestamp >= seit_zeit - CHAT_ZEITTOLERANZ)
+        if seit is not None:
+            bedingungen.append(nachricht.timestamp > seit)
+
+        partner = case((nachricht.sender_id == user_id, nachricht.empfaenger_id),
+                       else_=nachricht.sender_id).label("partner")
+        rang = func.row_number().over(partition_by=partner, order_by=nachricht.nachricht_id.desc()).label("rang")
+        neue = select(nachricht, partner, rang).where(*bedingungen).subquery()
+        neue_nachricht = aliased(models.ChatMessage, neue)
+        result = await db.execute(
+            select(neue_nachricht, neue.c.partner, neue.c.rang)
+            .where(neue.c.rang <= limit + 1)
+            .order_by(neue.c.nachricht_id)
+        )
+        zeilen = result.all()
+    except exc.SQLAlchemyError as e:
+        logging_obj = log_eintrag(user_id=user_id, endpoint="/users/chat/sync", method="GET",
+                                  message=f"Fehler beim Synchronisieren des Chats: {e}", success=False)
+        logger.error(logging_obj)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
+
+    nachrichten = [zeile[0] for zeile in zeilen if zeile.rang <= limit]
+    gekuerzt = sorted({zeile.partner for zeile in zeilen if zeile.rang > limit})
+    cursor = max((n.nachricht_id for n in nachrichten), default=seit_id)
+    return {"nachrichten": nachrichten, "cursor": cursor, "gekuerzt": gekuerzt}
+
+
+@router.get("/chat/inbox", response_model=List[schemas.ChatInboxEintrag], status_code=status.HTTP_200_OK)
+async def get_chat_inbox(response: Response,
+                         cursor: Optional[int] = Query(None, description="Wert aus X-Next-Cursor der vorherigen Seite"),
+                         limit: int = Query(CHAT_INBOX_LIMIT, ge=1, le=CHAT_INBOX_MAX_LIMIT),
+                         current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                         db: AsyncSession = Depends(database.get_db_async)):
+    """
+    Ruft den Posteingang des aktuellen Benutzers ab: je Gespräch den Gesprächspartner, die letzte Nachricht und die
+    Anzahl ungelesener Nachrichten, das zuletzt aktive Gespräch zuerst.
+
+    Die Daten stammen aus chat_conversations, der Aufwand hängt daher nur von der Anzahl der Gespräche ab und nicht
+    von der Anzahl der Nachrichten. Für die nächste Seite wird der Header X-Next-Cursor als cursor übergeben.
+
+    Args:
+        response (Response): Die Antwort, in der der Header X-Next-Cursor gesetzt wird.
+        cursor (Optional[int]): Es werden nur Gespräche mit älterer letzter Nachricht geliefert.
+        limit (int): Die maximale Anzahl an Gesprächen.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung für den Vorgang.
+
+    Returns:
+        List[schemas.ChatInboxEintrag]: Die Gespräche des Benutzers.
+
+    Raises:
+        HTTPException: Wenn ein Datenbankfehler auftritt.
+    """
+    gespraech = models.ChatConversation
+    user_id = current_user.user_id
+    ist_a = gespraech.user_a_id == user_id
+    partner = case((ist_a, gespraech.user_b_id), else_=gespraech.user_a_id)
+    stmt = (
+        select(partner.label("other_user_id"), case((ist_a, gespraech.ungelesen_a),
+                                                    else_=gespraech.ungelesen_b).label("ungelesen"),
+               models.Nutzer.vorname, models.Nutzer.nachname, models.ChatMessage)
+        .join(models.ChatMessage, models.ChatMessage.nachricht_id == gespraech.letzte_nachricht_id)
+        .outerjoin(models.Nutzer, models.Nutzer.user_id == partner)
+        .where(or_(gespraech.user_a_id == user_id, gespraech.user_b_id == user_id))
+        .order_by(gespraech.letzte_nachricht_id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        stmt = stmt.where(gespraech.letzte_nachricht_id < cursor)
+    try:
+        result = await db.execute(stmt)
+        zeilen = result.all()
+    except exc.SQLAlchemyError as e:
+        logging_obj = log_eintrag(user_id=user_id, endpoint="/users/chat/inbox", method="GET",
+                                  message=f"Fehler beim Abrufen des Posteingangs: {e}", success=False)
+        logger.error(logging_obj)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Interner Serverfehler")
+
+    if len(zeilen) == limit:
+        response.headers["X-Next-Cursor"] = str(zeilen[-1].ChatMessage.nachricht_id)
+    return [{"other_user_id": zeile.other_user_id, "vorname": zeile.vorname, "nachname": zeile.nachname,
+             "letzte_nachricht": zeile.ChatMessage, "ungelesen": zeile.ungelesen} for zeile in zeilen]
+
+
+@router.post("/chat/gelesen/{other_user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def markiere_chat_gelesen(other_user_id: int,
+                                current_user: schemas.TokenClaims = Depends(oauth.get_current_claims),
+                                db: AsyncSession = Depends(database.get_db_async)):
+    """
+    Markiert alle Nachrichten eines Gesprächs für den aktuellen Benutzer als gelesen.
+
+    Args:
+        other_user_id (int): Die ID des Gesprächspartners.
+        current_user (schemas.TokenClaims): Die ID und Rolle des aktuellen Benutzers aus dem JWT.
+        db (AsyncSession): Die Datenbanksitzung für den Vorgang.
+
+    Raises:
+        HTTPException: Wenn es kein Gespräch mit diesem Nutzer gibt.
+    """
+    if not await chat_gespraeche.als_gelesen_markieren(db, current_user.user_id, other_user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gespräch nicht gefunden")
@@ -84,6 +84,32 @@ class TokenData(BaseModel):
     id: int
 
 
+class TokenClaims(BaseModel):
+    user_id: int
+    rolle: Rolle
+
+
+class JobLaufResponse(BaseModel):
+    lauf_id: int
+    job: str
+    status: str
+    gestartet_am: datetime
+    beendet_am: Optional[datetime] = None
+    dauer_s: Optional[float] = None
+    ergebnis: Optional[dict] = None
+    fehler: Optional[str] = None
+    pid: Optional[int] = None
+    ausgeloest_von: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobUebersicht(BaseModel):
+    job: str
+    letzter_lauf: Optional[JobLaufResponse] = None
+
+
 class LoggingSchema(BaseModel):
     user_id: int
     endpoint: str
@@ -276,6 +302,9 @@ class AggregatedDashboardSmartMeterDataResponseLast(BaseModel):
 
 class DashboardSmartMeterDataResponse(BaseModel):
     message: str
+    zeilen: Optional[int] = None
+    dauer_s: Optional[float] = None
+    zeilen_pro_sekunde: Optional[float] = None
 
 
 field_to_schema_mapping = {
@@ -782,3 +811,17 @@ class ChatMessageResponse(BaseModel):
     empfaenger_id: int
     nachricht_inhalt: str
     timestamp: datetime = Field(default_factory=datetime.now)
+
+
+class ChatSyncResponse(BaseModel):
+    nachrichten: List[ChatMessageResponse]
+    cursor: Optional[int]
+    gekuerzt: List[int]
+
+
+class ChatInboxEintrag(BaseModel):
+    other_user_id: int
+    vorname: Optional[str]
+    nachname: Optional[str]
+    letzte_nachricht: ChatMessageResponse
+    ungelesen: int
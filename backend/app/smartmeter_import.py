@@ -0,0 +1,428 @@
+import asyncio
+import io
+import time
+from datetime import date, datetime
+from itertools import repeat
+from typing import Optional
+
+import pandas as pd
+from fastapi import UploadFile
+from sqlalchemy import delete, func, literal, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models, partitionen
+from app.database import SessionLocal
+
+# Zuordnung der Spalten aus dem Smart-Meter-Export zu den Spalten der Tabelle dashboard_smartmeter_data
+CSV_SPALTEN = {
+    "PV(W)": "pv_erzeugung",
+    "SOC(%)": "soc",
+    "Batterie(W)": "batterie_leistung",
+    "Zähler(W)": "zaehler",
+    "Last(W)": "last",
+}
+DB_SPALTEN = ["haushalt_id", "datum", *CSV_SPALTEN.values(), "user_id"]
+CHUNK_SIZE = 50_000
+LESE_BLOCKGROESSE = 1024 * 1024  # 1 MB pro Lesezugriff im Streaming-Modus
+
+# Granularitäten, für die vorberechnete Aggregate in dashboard_smartmeter_rollup gepflegt werden
+ROLLUP_PERIODEN = ("MINUTE", "HOUR", "DAY", "WEEK", "MONTH")
+# Je angefragter Periode die Rollups, aus denen sie sich zusammensetzen lässt, von grob nach fein
+ROLLUP_QUELLEN = {
+    "MINUTE": ("MINUTE",),
+    "HOUR": ("HOUR", "MINUTE"),
+    "DAY": ("DAY", "HOUR", "MINUTE"),
+    "WEEK": ("WEEK", "DAY", "HOUR", "MINUTE"),
+    "MONTH": ("MONTH", "DAY", "HOUR", "MINUTE"),
+}
+ROLLUP_SUMMEN = {
+    "PV(W)": "pv_erzeugung_summe",
+    "SOC(%)": "soc_summe",
+    "Batterie(W)": "batterie_leistung_summe",
+    "Last(W)": "last_summe",
+}
+
+
+def _als_python_werte(serie: pd.Series) -> list:
+    """
+    Wandelt eine pandas-Serie in eine Liste von Python-Objekten um, fehlende Werte werden zu None.
+
+    Args:
+        serie (pd.Series): Die umzuwandelnde Spalte.
+
+    Returns:
+        list: Die Werte der Spalte als Python-Objekte.
+    """
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def dataframe_zu_records(df: pd.DataFrame, haushalt_id: int, user_id: int) -> list:
+    """
+    Wandelt einen Block des Smart-Meter-Exports spaltenweise in Records für den COPY-Import um.
+
+    Zeilen ohne Zeitstempel werden verworfen, alle Messwerte werden als float übergeben.
+
+    Args:
+        df (pd.DataFrame): Der Block mit den Spalten Zeit, PV(W), SOC(%), Batterie(W), Zähler(W), Last(W).
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+
+    Returns:
+        list: Eine Liste von Tupeln in der Reihenfolge von DB_SPALTEN.
+    """
+    datum = pd.to_datetime(df["Zeit"])
+    df = df[datum.notna()]
+    datum = datum[datum.notna()]
+    anzahl = len(df)
+
+    spalten = [pd.DatetimeIndex(datum).to_pydatetime().tolist()]
+    for csv_spalte in CSV_SPALTEN:
+        spalten.append(_als_python_werte(df[csv_spalte].astype("float64")))
+
+    return list(zip(repeat(haushalt_id, anzahl), *spalten, repeat(user_id, anzahl)))
+
+
+async def copy_smartmeter_records(db: AsyncSession, records: list) -> None:
+    """
+    Schreibt Records über das binäre COPY-Protokoll von asyncpg in die Tabelle dashboard_smartmeter_data.
+
+    Der COPY-Befehl läuft auf der Verbindung der Sitzung und damit in deren offener Transaktion,
+    das Commit erfolgt durch den Aufrufer.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        records (list): Die Records in der Reihenfolge von DB_SPALTEN.
+    """
+    if not records:
+        return
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        models.DashboardSmartMeterData.__tablename__,
+        records=records,
+        columns=DB_SPALTEN
+    )
+
+
+def _periodenbeginn(datum: pd.Series, periode: str) -> pd.Series:
+    """
+    Schneidet Zeitstempel wie DATE_TRUNC in PostgreSQL auf den Beginn ihrer Periode ab.
+
+    Args:
+        datum (pd.Series): Die Zeitstempel.
+        periode (str): Die Periode (MINUTE, HOUR, DAY, WEEK oder MONTH).
+
+    Returns:
+        pd.Series: Der Beginn der Periode je Zeitstempel, Wochen beginnen am Montag.
+    """
+    if periode == "MINUTE":
+        return datum.dt.floor("min")
+    if periode == "HOUR":
+        return datum.dt.floor("h")
+    if periode == "DAY":
+        return datum.dt.normalize()
+    if periode == "WEEK":
+        return datum.dt.normalize() - pd.to_timedelta(datum.dt.weekday, unit="D")
+    if periode == "MONTH":
+        return datum.dt.to_period("M").dt.start_time
+    raise ValueError("Ungültiger Zeitraum: {}".format(periode))
+
+
+def berechne_rollup_deltas(df: pd.DataFrame, haushalt_id: int, user_id: int) -> list:
+    """
+    Aggregiert einen Block des Smart-Meter-Exports für alle Granularitäten aus ROLLUP_PERIODEN.
+
+    Es werden Summen und Anzahlen gebildet, damit sich die Werte eines Blocks auf bestehende
+    Rollups addieren lassen und der Durchschnitt des SOC exakt bleibt.
+
+    Args:
+        df (pd.DataFrame): Der Block mit den Spalten Zeit, PV(W), SOC(%), Batterie(W), Zähler(W), Last(W).
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+
+    Returns:
+        list: Ein Dictionary je Periode und Periodenbeginn mit den Spalten von DashboardSmartMeterRollup.
+    """
+    datum = pd.to_datetime(df["Zeit"])
+    werte = pd.DataFrame({spalte: df[csv_spalte].astype("float64")
+                          for csv_spalte, spalte in ROLLUP_SUMMEN.items()})[datum.notna()]
+    datum = datum[datum.notna()]
+
+    deltas = []
+    for periode in ROLLUP_PERIODEN:
+        gruppen = werte.groupby(_periodenbeginn(datum, periode))
+        aggregat = gruppen.sum()
+        aggregat["soc_anzahl"] = gruppen["soc_summe"].count()
+        aggregat["anzahl"] = gruppen.size()
+        for periode_start, zeile in zip(pd.DatetimeIndex(aggregat.index).to_pydatetime(),
+                                        aggregat.to_dict("records")):
+            deltas.append({
+                "haushalt_id": haushalt_id,
+                "user_id": user_id,
+                "periode": periode,
+                "periode_start": periode_start,
+                **{spalte: float(zeile[spalte]) for spalte in ROLLUP_SUMMEN.values()},
+                "soc_anzahl": int(zeile["soc_anzahl"]),
+                "anzahl": int(zeile["anzahl"])
+            })
+    return deltas
+
+
+def _ist_periodengrenze(tag: date, periode: str) -> bool:
+    """
+    Prüft, ob ein Tag auf den Beginn einer Periode fällt.
+
+    Args:
+        tag (date): Der zu prüfende Tag.
+        periode (str): Die Periode (MINUTE, HOUR, DAY, WEEK oder MONTH).
+
+    Returns:
+        bool: True, wenn der Tag eine Grenze der Periode ist, sonst False.
+    """
+    if periode == "WEEK":
+        return tag.weekday() == 0
+    if periode == "MONTH":
+        return tag.day == 1
+    return True
+
+
+def waehle_rollup_periode(period: str, start: date, end: date) -> Optional[str]:
+    """
+    Wählt das gröbste Rollup, aus dem sich die angefragte Periode im Zeitraum exakt berechnen lässt.
+
+    Ein Rollup kommt nur infrage, wenn Start und Ende auf seine Periodengrenzen fallen, da Rollup-Zeilen
+    nicht anteilig ausgewertet werden können.
+
+    Args:
+        period (str): Die angefragte Aggregationsperiode.
+        start (date): Der Beginn des Zeitraums (inklusive).
+        end (date): Das Ende des Zeitraums (exklusive).
+
+    Returns:
+        Optional[str]: Die Periode des zu verwendenden Rollups oder None, wenn kein Rollup passt.
+    """
+    for kandidat in ROLLUP_QUELLEN.get(period, ()):
+        if kandidat in ROLLUP_PERIODEN and _ist_periodengrenze(start, kandidat) and _ist_periodengrenze(end, kandidat):
+            return kandidat
+    return None
+
+
+async def aktualisiere_rollups(db: AsyncSession, df: pd.DataFrame, haushalt_id: int, user_id: int) -> None:
+    """
+    Addiert die Aggregate eines importierten Blocks per Upsert auf die bestehenden Rollups.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        df (pd.DataFrame): Der gerade importierte Block des Smart-Meter-Exports.
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+    """
+    deltas = berechne_rollup_deltas(df, haushalt_id, user_id)
+    if not deltas:
+        return
+    rollup = models.DashboardSmartMeterRollup
+    stmt = insert(rollup)
+    stmt = stmt.on_conflict_do_update(
+        constraint="_smartmeter_rollup_uc",
+        set_={spalte: getattr(rollup, spalte) + stmt.excluded[spalte]
+              for spalte in [*ROLLUP_SUMMEN.values(), "soc_anzahl", "anzahl"]}
+    )
+    await db.execute(stmt, deltas)
+
+
+async def rollups_neu_berechnen(db: AsyncSession, haushalt_id: int, user_id: int) -> None:
+    """
+    Berechnet alle Rollups eines Haushalts aus den Rohdaten neu, z. B. für vor Einführung der Rollups
+    importierte Daten. Das Commit erfolgt durch den Aufrufer.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        haushalt_id (int): Die ID des Haushalts.
+        user_id (int): Die ID des Nutzers, der die Daten hochgeladen hat.
+    """
+    rollup = models.DashboardSmartMeterRollup
+    roh = models.DashboardSmartMeterData
+    await db.execute(delete(rollup).where(rollup.haushalt_id == haushalt_id, rollup.user_id == user_id))
+
+    for periode in ROLLUP_PERIODEN:
+        # Die Periode stammt aus ROLLUP_PERIODEN und wird als Literal eingesetzt, damit SELECT und
+        # GROUP BY denselben Ausdruck verwenden
+        periode_start = func.date_trunc(literal_column(f"'{periode.lower()}'"), roh.datum)
+        auswahl = (
+            select(roh.haushalt_id, roh.user_id, literal(periode), periode_start,
+                   func.coalesce(func.sum(roh.pv_erzeugung), 0), func.coalesce(func.sum(roh.soc), 0),
+                   func.count(roh.soc), func.coalesce(func.sum(roh.batterie_leistung), 0),
+                   func.coalesce(func.sum(roh.last), 0), func.count())
+            .where(roh.haushalt_id == haushalt_id, roh.user_id == user_id, roh.datum.isnot(None))
+            .group_by(roh.haushalt_id, roh.user_id, periode_start)
+        )
+        await db.execute(insert(rollup).from_select(
+            ["haushalt_id", "user_id", "periode", "periode_start", "pv_erzeugung_summe", "soc_summe",
+             "soc_anzahl", "batterie_leistung_summe", "last_summe", "anzahl"], auswahl))
+
+
+async def alle_rollups_neu_berechnen() -> int:
+    """
+    Berechnet die Rollups aller Haushalte mit Smart-Meter-Daten neu, jeden Haushalt in einer eigenen Transaktion.
+
+    Muss einmalig nach Einführung der Rollups ausgeführt werden: Das Dashboard liest bei passenden Zeiträumen nur noch
+    die Rollups, Daten, die vorher importiert wurden, würden sonst in den Aggregaten fehlen. Haushalte, die seitdem
+    bereits neue Daten hochgeladen haben, werden vollständig aus den Rohdaten neu berechnet. Während des Laufs sollten
+    keine Uploads stattfinden.
+
+    Returns:
+        int: Die Anzahl der neu berechneten Haushalte.
+    """
+    roh = models.DashboardSmartMeterData
+    async with SessionLocal() as db:
+        result = await db.execute(select(roh.haushalt_id, roh.user_id)
+                                  .where(roh.haushalt_id.isnot(None), roh.user_id.isnot(None))
+                                  .distinct())
+        haushalte = result.all()
+    for haushalt_id, user_id in haushalte:
+        async with SessionLocal() as db:
+            await rollups_neu_berechnen(db, haushalt_id, user_id)
+            await db.commit()
+    return len(haushalte)
+
+
+async def lese_smartmeter_batches(datei: UploadFile, batch_groesse: int = CHUNK_SIZE):
+    """
+    Liest eine hochgeladene CSV-Datei inkrementell und liefert Blöcke mit fester Zeilenanzahl.
+
+    Es werden jeweils LESE_BLOCKGROESSE Bytes gelesen und an Zeilenenden getrennt. Sobald
+    `batch_groesse` Zeilen vorliegen, werden nur diese Zeilen zusammen mit der Kopfzeile geparst,
+    sodass nie mehr als ein Block der Datei gleichzeitig im Speicher liegt.
+
+    Args:
+        datei (UploadFile): Die hochgeladene CSV-Datei.
+        batch_groesse (int): Die Anzahl der Zeilen pro Block.
+
+    Yields:
+        pd.DataFrame: Der nächste Block mit den Spalten der Kopfzeile.
+    """
+    kopfzeile = None
+    rest = b""
+    zeilen = []
+    while True:
+        block = await datei.read(LESE_BLOCKGROESSE)
+        if block:
+            teile = (rest + block).split(b"\n")
+            rest = teile.pop()
+        else:
+            teile, rest = [rest], b""
+
+        for zeile in teile:
+            if not zeile.strip():
+                continue
+            if kopfzeile is None:
+                kopfzeile = zeile
+                continue
+            zeilen.append(zeile)
+            if len(zeilen) >= batch_groesse:
+                yield pd.read_csv(io.BytesIO(b"\n".join([kopfzeile, *zeilen])), encoding="utf-8")
+                zeilen = []
+
+        if not block:
+            break
+
+    if zeilen:
+        yield pd.read_csv(io.BytesIO(b"\n".join([kopfzeile, *zeilen])), encoding="utf-8")
+
+
+async def _schreibe_bloecke(db: AsyncSession, bloecke, haushalt_id: int, user_id: int) -> dict:
+    """
+    Wandelt die Blöcke nacheinander um, schreibt sie per COPY und committet am Ende.
+
+    Für jeden Block werden zunächst fehlende Monatspartitionen angelegt. Bis zum ersten COPY geschieht das in
+    eigenen kurzen Transaktionen; danach hält die Import-Transaktion bereits eine Sperre auf der Tabelle, und
+    Partitionen für erst später im Stream auftauchende Monate werden in ihr angelegt. Jeder Block wird vollständig
+    geschrieben und in die Rollups übernommen, bevor der nächste angefordert wird.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        bloecke: Ein asynchroner Iterator über DataFrames des Smart-Meter-Exports.
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+
+    Returns:
+        dict: Die Anzahl der importierten Zeilen, die Dauer in Sekunden und die Zeilen pro Sekunde.
+    """
+    start = time.perf_counter()
+    zeilen = 0
+    async for block in bloecke:
+        block["Zeit"] = pd.to_datetime(block["Zeit"])
+        monate = block["Zeit"].dropna().dt.to_period("M").dt.start_time.unique()
+        if zeilen == 0:
+            await partitionen.lege_partitionen_an(monate)
+        else:
+            await partitionen.stelle_partitionen_sicher(db, monate)
+
+        records = dataframe_zu_records(block, haushalt_id, user_id)
+        await copy_smartmeter_records(db, records)
+        await aktualisiere_rollups(db, block, haushalt_id, user_id)
+        zeilen += len(records)
+    await db.commit()
+
+    dauer = time.perf_counter() - start
+    return {
+        "zeilen": zeilen,
+        "dauer_s": round(dauer, 3),
+        "zeilen_pro_sekunde": round(zeilen / dauer, 1) if dauer > 0 else float(zeilen)
+    }
+
+
+async def importiere_smartmeter_csv(db: AsyncSession, datei, haushalt_id: int, user_id: int,
+                                    chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Importiert einen Smart-Meter-Export blockweise in die Datenbank.
+
+    Die Datei wird in Blöcken von `chunksize` Zeilen gelesen, jeder Block wird vektorisiert umgewandelt
+    und per COPY geschrieben, bevor der nächste Block gelesen wird.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        datei: Das Dateiobjekt der hochgeladenen CSV-Datei (binär oder Text).
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+        chunksize (int): Die Anzahl der Zeilen pro Block.
+
+    Returns:
+        dict: Die Anzahl der importierten Zeilen, die Dauer in Sekunden und die Zeilen pro Sekunde.
+    """
+    async def bloecke():
+        for block in pd.read_csv(datei, chunksize=chunksize, encoding="utf-8"):
+            yield block
+
+    return await _schreibe_bloecke(db, bloecke(), haushalt_id, user_id)
+
+
+async def importiere_smartmeter_stream(db: AsyncSession, datei: UploadFile, haushalt_id: int, user_id: int,
+                                       batch_groesse: int = CHUNK_SIZE) -> dict:
+    """
+    Importiert einen Smart-Meter-Export im Streaming-Modus mit begrenztem Speicherbedarf.
+
+    Die Datei wird über lese_smartmeter_batches inkrementell gelesen, jeder Block wird geschrieben,
+    bevor der nächste gelesen wird.
+
+    Args:
+        db (AsyncSession): Die Datenbanksitzung.
+        datei (UploadFile): Die hochgeladene CSV-Datei.
+        haushalt_id (int): Die ID des Haushalts, zu dem die Daten gehören.
+        user_id (int): Die ID des Nutzers, der die Daten hochlädt.
+        batch_groesse (int): Die Anzahl der Zeilen pro Block.
+
+    Returns:
+        dict: Die Anzahl der importierten Zeilen, die Dauer in Sekunden und die Zeilen pro Sekunde.
+    """
+    return await _schreibe_bloecke(db, lese_smartmeter_batches(datei, batch_groesse), haushalt_id, user_id)
+
+
+async def _main():
+    haushalte = await alle_rollups_neu_berechnen()
+    print(f"{datetime.now():%Y-%m-%d %H:%M:%S} Rollups für {haushalte} Haushalte neu berechnet")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
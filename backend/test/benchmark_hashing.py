@@ -0,0 +1,58 @@
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.hashing import Hashing
+
+LOGINS = 40
+PING_INTERVALL = 0.005
+PASSWORT = "geheimes_passwort"
+
+
+async def ping(stop: asyncio.Event, latenzen: list):
+    """Simuliert einen unabhängigen Endpunkt und misst, wie lange er auf die Event-Loop warten muss."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PING_INTERVALL)
+        latenzen.append((time.perf_counter() - start - PING_INTERVALL) * 1000)
+
+
+async def login_sync(passwort_hash: str):
+    return Hashing.verify_password(PASSWORT, passwort_hash)
+
+
+async def login_async(passwort_hash: str):
+    return await Hashing.verify_password_async(PASSWORT, passwort_hash)
+
+
+async def messen(name: str, login, passwort_hash: str):
+    stop = asyncio.Event()
+    latenzen = []
+    pinger = asyncio.create_task(ping(stop, latenzen))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login(passwort_hash) for _ in range(LOGINS)))
+    dauer = time.perf_counter() - start
+
+    stop.set()
+    await pinger
+    latenzen.sort()
+    p99 = latenzen[min(len(latenzen) - 1, int(len(latenzen) * 0.99))]
+    print(f"{name:<28} Burst {dauer:6.2f} s | Verzögerung anderer Anfragen: "
+          f"p50 {statistics.median(latenzen):8.1f} ms, p99 {p99:8.1f} ms, max {latenzen[-1]:8.1f} ms")
+
+
+async def main():
+    passwort_hash = Hashing.hash_password(PASSWORT)
+    print(f"{LOGINS} gleichzeitige Logins (bcrypt verify)")
+    await messen("verify_password", login_sync, passwort_hash)
+    await messen("verify_password_async", login_async, passwort_hash)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
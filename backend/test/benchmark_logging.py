@@ -0,0 +1,39 @@
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.logger import JsonFormatter, FastJsonFormatter, log_eintrag, orjson
+from app.schemas import LoggingSchema
+
+ANZAHL = 100_000
+FELDER = {"user_id": 42, "endpoint": "/haushalte/dashboard", "method": "GET",
+          "message": "Dashboard-Daten erfolgreich abgerufen", "success": True}
+
+
+def record(msg) -> logging.LogRecord:
+    return logging.LogRecord("GreenEcoHub", logging.INFO, __file__, 0, msg, None, None)
+
+
+def json_formatter_mit_schema(formatter):
+    formatter.format(record(LoggingSchema(**FELDER).dict()))
+
+
+def fast_formatter_mit_dict(formatter):
+    formatter.format(record(log_eintrag(**FELDER)))
+
+
+def messen(name, funktion, formatter):
+    sekunden = min(timeit.repeat(lambda: funktion(formatter), number=ANZAHL, repeat=3))
+    print(f"{name:<45} {ANZAHL / sekunden:>12,.0f} Records/s")
+    return sekunden
+
+
+if __name__ == "__main__":
+    print(f"orjson: {'ja' if orjson is not None else 'nein (Fallback json)'}")
+    alt = messen("LoggingSchema(...).dict() + JsonFormatter", json_formatter_mit_schema,
+                 JsonFormatter("%(timestamp)s %(level)s %(name)s %(message)s"))
+    neu = messen("log_eintrag(...) + FastJsonFormatter", fast_formatter_mit_dict, FastJsonFormatter())
+    print(f"Faktor: {alt / neu:.1f}x")
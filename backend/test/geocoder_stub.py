@@ -0,0 +1,32 @@
+"""
+Lokaler Ersatz für Nominatim, um die Geokodierung ohne externen Dienst und ohne Ratenlimit zu testen.
+
+Start:   uvicorn geocoder_stub:app --app-dir test --port 8081
+Nutzung: GEOCODER_URL=http://localhost:8081/search GEOCODER_RATE=50 GEOCODER_BURST=10
+
+Die Koordinaten werden deterministisch aus Postleitzahl und Hausnummer berechnet. Adressen in der Straße
+"Unbekannt" werden nicht gefunden, Postleitzahl 0 liefert einen Serverfehler.
+"""
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI()
+anfragen = {"anzahl": 0}
+
+
+@app.get("/search")
+def search(street: str = "", postalcode: int = 0, city: str = "", country: str = "", format: str = "jsonv2",
+           limit: int = 1):
+    anfragen["anzahl"] += 1
+    if postalcode == 0:
+        raise HTTPException(status_code=503, detail="Stub-Fehler")
+    hausnummer, _, strasse = street.partition(" ")
+    if strasse == "Unbekannt":
+        return []
+    lat = 47.0 + (postalcode % 10000) / 1000
+    lon = 6.0 + (postalcode // 10000) + int(hausnummer or 0) / 10000
+    return [{"lat": f"{lat:.6f}", "lon": f"{lon:.6f}", "display_name": f"{street}, {postalcode} {city}, {country}"}]
+
+
+@app.get("/statistik")
+def statistik():
+    return anfragen
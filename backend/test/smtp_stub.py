@@ -0,0 +1,49 @@
+"""
+Lokaler SMTP-Server (aiosmtpd), um den E-Mail-Postausgang ohne echten Mailserver zu testen.
+
+Start:   pip install -r reqs-dev.txt && python3 ./test/smtp_stub.py (oder make smtp-stub)
+Nutzung: SMTP_SERVER=localhost SMTP_PORT=8025
+
+Jeder Benutzername und jedes Passwort wird akzeptiert. Empfänger mit der Domain "abgelehnt.example" werden
+dauerhaft abgewiesen (550), Empfänger mit "spaeter.example" vorübergehend (451). Zu jeder Sitzung werden
+die Anzahl der darin übertragenen E-Mails ausgegeben, sodass die Wiederverwendung der Verbindungen sichtbar ist.
+"""
+import asyncio
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+
+class Handler:
+    def __init__(self):
+        self.nachrichten = 0
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.endswith("@abgelehnt.example"):
+            return "550 Empfänger unbekannt"
+        if address.endswith("@spaeter.example"):
+            return "451 Bitte später erneut versuchen"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.nachrichten += 1
+        session.nachrichten = getattr(session, "nachrichten", 0) + 1
+        print(f"{session.peer} Nachricht {session.nachrichten} dieser Sitzung "
+              f"({self.nachrichten} gesamt) an {', '.join(envelope.rcpt_tos)}")
+        return "250 Nachricht angenommen"
+
+
+def authenticator(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+if __name__ == "__main__":
+    controller = Controller(Handler(), hostname="localhost", port=8025, authenticator=authenticator,
+                            auth_require_tls=False)
+    controller.start()
+    print("SMTP-Stub läuft auf localhost:8025")
+    try:
+        asyncio.get_event_loop().run_forever()
+    except KeyboardInterrupt:
+        controller.stop()
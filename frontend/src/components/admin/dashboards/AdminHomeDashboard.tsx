@@ -21,7 +21,7 @@ import StatBox from "../../utility/visualization/StatBox";
 import PieChart from "../../utility/visualization/PieChart";
 import BarChart from "../../utility/visualization/BarChart";
 import {setStateOtherwiseRedirect}  from "../../../utils/stateUtils.js"
-import { addSuffixToBackendURL } from "../../../utils/networking_utils";
+import { addSuffixToBackendURL, fetchUserCount } from "../../../utils/networking_utils";
 import { getAllReports } from "../../../utils/download_utils";
 
 // The AdminHome component serves as the main dashboard for administrators, providing stats and actions.
@@ -31,7 +31,7 @@ const AdminHome = () => {
     const navigate = useNavigate();
     const colors = tokens(theme.palette.mode);
     const [numberUsers, setNumberUsers] = React.useState(0);
-    const [users, setUsers] = React.useState([])
+    const [roleCounts, setRoleCounts] = React.useState({})
     const [activityData, setActivityData] = React.useState([])
     const [activityValue, setActivityValue] = React.useState("+0%")
     const [isLoading, setIsLoading] = React.useState(true);
@@ -76,26 +76,26 @@ const AdminHome = () => {
       setStateOtherwiseRedirect(setPieData, "admin/userOverview", navigate,  {Authorization: `Bearer ${token}`})
     }, [])
 
-    // useMemo hooks for calculating counts based on specific roles within the user data
+    // useMemo hooks for the user counts per role, reported by the backend via X-Total-Count
     const adminCount = useMemo(() => {
-      return users.filter((user) => user.rolle === "Admin").length
-    }, [users]);
+      return roleCounts["Admin"] || 0
+    }, [roleCounts]);
 
     const solarteurCount = useMemo(() => {
-      return users.filter((user) => user.rolle === "Solarteure").length
-    }, [users]);
+      return roleCounts["Solarteure"] || 0
+    }, [roleCounts]);
 
     const energieberaterCount = useMemo(() => {
-      return users.filter((user) => user.rolle === "Energieberatende").length
-    }, [users]);
+      return roleCounts["Energieberatende"] || 0
+    }, [roleCounts]);
 
     const haushalteCount = useMemo(() => {
-      return users.filter((user) => user.rolle === "Haushalte").length
-    }, [users]);
+      return roleCounts["Haushalte"] || 0
+    }, [roleCounts]);
 
     const netzbetreiberCount = useMemo(() => {
-      return users.filter((user) => user.rolle === "Netzbetreiber").length
-    }, [users]);
+      return roleCounts["Netzbetreiber"] || 0
+    }, [roleCounts]);
 
 
 
@@ -103,11 +103,12 @@ const AdminHome = () => {
     useEffect(() => {
        
       const token = localStorage.getItem("accessToken");
-        axios.get(addSuffixToBackendURL("users"), {headers: { Authorization: `Bearer ${token}` }})
-        .then((res) => {
-          const response = res.data
-          setNumberUsers(response.length)
-          setUsers(response);
+      const headers = { Authorization: `Bearer ${token}` };
+      const rollen = ["Admin", "Solarteure", "Energieberatende", "Haushalte", "Netzbetreiber"];
+        Promise.all([fetchUserCount(headers), ...rollen.map((rolle) => fetchUserCount(headers, { rolle: rolle }))])
+        .then(([gesamt, ...anzahlen]) => {
+          setNumberUsers(gesamt)
+          setRoleCounts(Object.fromEntries(rollen.map((rolle, i) => [rolle, anzahlen[i]])));
         })
         .catch((err) => {
           if (err.response.status === 401) {
@@ -1,11 +1,12 @@
 import { Box, Typography, useTheme } from "@mui/material";
 import { DataGrid } from "@mui/x-data-grid";
 import { tokens } from "../../../utils/theme";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import ErrorIcon from '@mui/icons-material/Error';
 import CheckBoxIcon from '@mui/icons-material/CheckBox';
 import { useNavigate } from "react-router-dom";
-import {setStateOtherwiseRedirect}  from "../../../utils/stateUtils.js"
+import axios from "axios";
+import { addSuffixToBackendURL } from "../../../utils/networking_utils";
 import Header from "../../utility/Header";
 
 
@@ -23,32 +24,48 @@ interface Log {
   success: boolean;
 }
 
-// TypeScript interface for defining the structure of the state that holds the logs
-interface LogsState {
-  logs: Log[];
-}
-
 const LogOverview = () => {
   const theme = useTheme(); // Use the theme for consistent styling across the app
   const colors = tokens(theme.palette.mode); // Accessing color tokens based on the current theme mode
   const navigate = useNavigate(); // Hook for programmatically navigating between routes
-  const [logs, setLogs] = useState<LogsState>({"logs":[{
-    "log_id": 0,
-    "timestamp": "2023-12-11 23:10:31,122",
-    "level": "INFO",
-    "name": "GreenEcoHub",
-    "message": "User eingeloggt",
-    "user_id": 6,
-    "endpoint": "/auth/login",
-    "method": "POST",
-    "success": true
-  }]});
+  const [logs, setLogs] = useState<Log[]>([]);
+  const [page, setPage] = useState(0);
+  const [pageSize, setPageSize] = useState(100);
+  const [rowCount, setRowCount] = useState(0);
+  const [loading, setLoading] = useState(false);
+  // cursors.current[p] is the X-Next-Cursor that loads page p (page 0 has none)
+  const cursors = useRef<(string | undefined)[]>([undefined]);
 
   useEffect(() => {
     const token = localStorage.getItem("accessToken");
-    setStateOtherwiseRedirect(setLogs, "admin/logs", navigate,  {Authorization: `Bearer ${token}`})
-  }, [])
- 
+    setLoading(true);
+    axios.get(addSuffixToBackendURL("admin/logs"), {
+      headers: { Authorization: `Bearer ${token}` },
+      params: { limit: pageSize, cursor: cursors.current[page], absteigend: true },
+    })
+    .then((res) => {
+      const nextCursor = res.headers["x-next-cursor"];
+      cursors.current[page + 1] = nextCursor;
+      // The total is unknown, so announce one more page as long as the backend returns a cursor
+      setRowCount(nextCursor ? (page + 2) * pageSize : page * pageSize + res.data.length);
+      setLogs(res.data);
+      setLoading(false);
+    })
+    .catch((err) => {
+      setLoading(false);
+      if (err.response && (err.response.status === 401 || err.response.status === 403)) {
+        console.log("Unauthorized  oder kein Admin", err.response.data)
+        navigate("/login")
+      }
+      console.log(err.response?.data)
+    })
+  }, [page, pageSize])
+
+  const handlePageSizeChange = (newPageSize: number) => {
+    cursors.current = [undefined];
+    setPage(0);
+    setPageSize(newPageSize);
+  };
 
   const columns = [
     { field: "log_id", headerName: "ID" },
@@ -143,7 +160,10 @@ const LogOverview = () => {
           },
         }}
       >
-        <DataGrid checkboxSelection getRowId={(row) => row.log_id} rows={logs} columns={columns} />
+        <DataGrid checkboxSelection getRowId={(row) => row.log_id} rows={logs} columns={columns}
+        paginationMode="server" rowCount={rowCount} loading={loading}
+        page={page} onPageChange={setPage}
+        pageSize={pageSize} onPageSizeChange={handlePageSizeChange} rowsPerPageOptions={[50, 100, 500]} />
       </Box>
     </Box>
   );
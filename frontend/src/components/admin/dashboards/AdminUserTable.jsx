@@ -1,7 +1,7 @@
 import { Box, Typography, useTheme } from "@mui/material";
 import { DataGrid } from "@mui/x-data-grid";
 import { tokens } from "../../../utils/theme";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import AdminPanelSettingsOutlinedIcon from "@mui/icons-material/AdminPanelSettingsOutlined";
 import HomeIcon from '@mui/icons-material/Home';
 import PointOfSaleIcon from "@mui/icons-material/PointOfSale";
@@ -21,6 +21,12 @@ const UserTable = () => {
   const colors = tokens(theme.palette.mode);
   const navigate = useNavigate();
   const [users, setUsers] = useState([]);
+  const [page, setPage] = useState(0);
+  const [pageSize, setPageSize] = useState(50);
+  const [rowCount, setRowCount] = useState(0);
+  const [loading, setLoading] = useState(false);
+  // cursors.current[p] is the X-Next-Cursor that loads page p (page 0 has none)
+  const cursors = useRef([undefined]);
 
   const handleRowClick = (params) => {
     navigate("/admin/editUser" + params.id);
@@ -34,12 +40,22 @@ const UserTable = () => {
 
   useEffect(() => {
     const token = localStorage.getItem("accessToken");
-    axios.get(addSuffixToBackendURL("users"), {headers: { Authorization: `Bearer ${token}` }})
+    setLoading(true);
+    axios.get(addSuffixToBackendURL("users"), {
+      headers: { Authorization: `Bearer ${token}` },
+      params: { limit: pageSize, cursor: cursors.current[page], mit_anzahl: page === 0 },
+    })
     .then((res) => {
       let users = res.data;
+      cursors.current[page + 1] = res.headers["x-next-cursor"];
+      if (page === 0) {
+        setRowCount(Number(res.headers["x-total-count"]));
+      }
       setUsers(users)
+      setLoading(false);
     })
     .catch((err) => {
+      setLoading(false);
       if (err.response && err.response.status === 401 || err.response.status === 403) {
         console.log("Unauthorized  oder kein Admin", err.response.data)
         navigate("/login")
@@ -47,7 +63,13 @@ const UserTable = () => {
       console.log(err.response.data)
     })
   
-  }, [])
+  }, [page, pageSize])
+
+  const handlePageSizeChange = (newPageSize) => {
+    cursors.current = [undefined];
+    setPage(0);
+    setPageSize(newPageSize);
+  };
 
   console.log(users)
 
@@ -182,6 +204,9 @@ const UserTable = () => {
       >
         <DataGrid checkboxSelection getRowId={(row) => row.user_id} rows={users} columns={columns} 
         onRowClick={handleRowClick} onSelectionModelChange={handleSelectionChange}
+        paginationMode="server" rowCount={rowCount} loading={loading}
+        page={page} onPageChange={setPage}
+        pageSize={pageSize} onPageSizeChange={handlePageSizeChange} rowsPerPageOptions={[25, 50, 100]}
         sx={{
           cursor: "pointer",
         }}/>
@@ -21,7 +21,7 @@ import SendIcon from '@mui/icons-material/Send';
 import axios from 'axios';
 import SearchIcon from "@mui/icons-material/Search";
 import SentimentSatisfiedAltIcon from '@mui/icons-material/SentimentSatisfiedAlt';
-import { addSuffixToBackendURL } from '../../utils/networking_utils';
+import { addSuffixToBackendURL, addSuffixToBackendWebSocketURL, fetchAllUsers } from '../../utils/networking_utils';
 import { formatTime } from '../../utils/dateUtils';
 import { tokens } from '../../utils/theme';
 import { 
@@ -29,9 +29,11 @@ import {
     ExtendedUser, 
     SearchBarUser, 
     ChatHistory, 
-    getUniqueUsers, 
+    ChatInboxEntry, 
     filterSearchBarUsers,
-    setAndRequestConversationHistory 
+    syncConversationHistory,
+    appendMessages,
+    markConversationAsRead 
 } 
     from '../../utils/chatUtils';
 
@@ -78,16 +80,66 @@ interface MessagesProps  {
     current_user: SearchBarUser,
     selectedUser: SearchBarUser,
     history: ChatHistory[],
-    historySetter : (history: ChatHistory[]) => void;
+    historySetter : React.Dispatch<React.SetStateAction<ChatHistory[]>>;
 }
 
 const Messages: React.FC<MessagesProps> = ({classes, current_user, selectedUser, history, historySetter}) => {
     const theme = useTheme();
+    const navigate = useNavigate();
     const [message, setMessage] = React.useState('');
     const colors = tokens(theme.palette.mode);
+    // New messages are pushed over the WebSocket. On the first connect the complete history is loaded,
+    // after reconnecting or a resync event the conversation is caught up via the sync endpoint
+    // starting at the cursor
     useEffect(() => {
-        setAndRequestConversationHistory(current_user.user_id, selectedUser.user_id, historySetter)
-    }, [selectedUser, message])
+        let active = true;
+        let socket: WebSocket | null = null;
+        let reconnectTimer: ReturnType<typeof setTimeout> | undefined = undefined;
+        const cursor = { current: null };
+        const setter = (update) => { if (active) historySetter(update) };
+        historySetter([]);
+
+        const connect = () => {
+            const token = localStorage.getItem("accessToken");
+            socket = new WebSocket(addSuffixToBackendWebSocketURL(`users/chat/ws?token=${token}`));
+            socket.onopen = () => {
+                syncConversationHistory(selectedUser.user_id, cursor, setter);
+                markConversationAsRead(selectedUser.user_id);
+            };
+            socket.onmessage = (event) => {
+                const data = JSON.parse(event.data);
+                if (data.typ === "resync") {
+                    syncConversationHistory(selectedUser.user_id, cursor, setter);
+                    return;
+                }
+                const message: ChatHistory = data.nachricht;
+                const partner = message.sender_id === current_user.user_id ? message.empfaenger_id : message.sender_id;
+                if (partner === selectedUser.user_id) {
+                    appendMessages([message], cursor, setter);
+                    if (message.sender_id === selectedUser.user_id) {
+                        markConversationAsRead(selectedUser.user_id);
+                    }
+                }
+            };
+            socket.onclose = (event) => {
+                if (!active) {
+                    return;
+                }
+                // 1008: the token is invalid, expired or revoked, reconnecting with it would fail again
+                if (event.code === 1008) {
+                    navigate("/login");
+                    return;
+                }
+                reconnectTimer = setTimeout(connect, 3000);
+            };
+        };
+        connect();
+        return () => {
+            active = false;
+            clearTimeout(reconnectTimer);
+            socket?.close();
+        };
+    }, [selectedUser])
 
     const handleInputChange = (event) => {
         setMessage(event.target.value);
@@ -211,7 +263,6 @@ const Chat = () => {
   const [users, setUsers] = React.useState<SearchBarUser[]>([]); 
   const [inputValue, setInputValue] = React.useState<string>("");
   const [selectedUser, setSelectedUser] = React.useState<SearchBarUser | null>(null);
-  const [userHistory, setUserHistory] = React.useState<ChatHistory[]>([]);
   const [individualHistory, setIndividualHistory] = React.useState<ChatHistory[]>([]);
   const [historyUsers, setHistoryUsers] = React.useState<SearchBarUser[]>([]);
   const navigate = useNavigate();
@@ -246,14 +297,14 @@ const Chat = () => {
             label: res.data.vorname + " " + res.data.nachname + " " + res.data.email,
             user_id: res.data.user_id,
         })
-        axios.get(addSuffixToBackendURL("users/chat/history"), {headers: { Authorization: `Bearer ${token}` }})
+        axios.get(addSuffixToBackendURL("users/chat/inbox"), {headers: { Authorization: `Bearer ${token}` }, params: { limit: 500 }})
             .then((res2) => {
-            setUserHistory(res2.data)
-            const uniqueIDs = getUniqueUsers(res2.data, res.data.user_id)
-            axios.get(addSuffixToBackendURL("users"), {headers: { Authorization: `Bearer ${token}` }})
-                .then((res3) => {
-                setUsers(reduceUsers(res3.data))
-                setHistoryUsers(reduceUsers(filterSearchBarUsers(res3.data, uniqueIDs)))
+            const uniqueIDs = res2.data.map((entry: ChatInboxEntry) => entry.other_user_id)
+                .filter((id: number) => id !== res.data.user_id)
+            fetchAllUsers({ Authorization: `Bearer ${token}` })
+                .then((allUsers) => {
+                setUsers(reduceUsers(allUsers))
+                setHistoryUsers(reduceUsers(filterSearchBarUsers(allUsers, uniqueIDs)))
                 })
                     .catch((err) => {
                     if (err.response && err.response.status === 401 || err.response.status === 403) {
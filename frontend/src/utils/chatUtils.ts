@@ -20,6 +20,20 @@ export interface ChatHistory {
     timestamp: string;
 }
 
+export interface ChatInboxEntry {
+    other_user_id: number;
+    vorname: string | null;
+    nachname: string | null;
+    letzte_nachricht: ChatHistory;
+    ungelesen: number;
+}
+
+export interface ChatSync {
+    nachrichten: ChatHistory[];
+    cursor: number | null;
+    gekuerzt: number[];
+}
+
 export const  reduceUsers = (users: ExtendedUser[]) : SearchBarUser[]=> {
     return users.map((user) => {
         const label = `${user.vorname} ${user.nachname} (${user.email})`;
@@ -44,22 +58,70 @@ export const filterSearchBarUsers = (users: SearchBarUser[], user_ids: number[])
 }
 
 
-export const setAndRequestConversationHistory = async (user_id: number, other_user_id: number, setter: any) => {
+// Loads the complete conversation with other_user_id and moves the cursor past its newest message
+export const loadConversationHistory = async (other_user_id: number, cursor: { current: number | null }, setter: any) => {
     const accessToken = localStorage.getItem("accessToken");
-    const senderUrl = addSuffixToBackendURL(`users/chat/history?user_id=${user_id}&other_user_id=${other_user_id}`);
-    axios.get(senderUrl, {
-        headers: {
-            Authorization: `Bearer ${accessToken}`,
-        },
-    }).then((response) => {
-        const data = response.data;
-        data.sort((a: ChatHistory, b: ChatHistory) => {
-            return a.timestamp > b.timestamp ? 1 : -1;
+    try {
+        const response = await axios.get(addSuffixToBackendURL("users/chat/history"), {
+            headers: {
+                Authorization: `Bearer ${accessToken}`,
+            },
+            params: { other_user_id: other_user_id },
         });
-        setter(data);
-    }).catch((error) => {
+        appendMessages(response.data, cursor, setter);
+    } catch (error) {
         console.log(error);
+    }
+}
+
+// Appends the messages of the conversation that are newer than cursor.current and advances the cursor.
+// Without a cursor, or if the sync endpoint had to cut the conversation (gekuerzt), the complete
+// history is loaded instead so that no older messages are lost
+export const syncConversationHistory = async (other_user_id: number, cursor: { current: number | null }, setter: any) => {
+    if (cursor.current === null) {
+        return loadConversationHistory(other_user_id, cursor, setter);
+    }
+    const accessToken = localStorage.getItem("accessToken");
+    try {
+        const response = await axios.get(addSuffixToBackendURL("users/chat/sync"), {
+            headers: {
+                Authorization: `Bearer ${accessToken}`,
+            },
+            params: { other_user_id: other_user_id, seit_id: cursor.current },
+        });
+        const data: ChatSync = response.data;
+        if (data.gekuerzt.includes(other_user_id)) {
+            return loadConversationHistory(other_user_id, cursor, setter);
+        }
+        appendMessages(data.nachrichten, cursor, setter);
+    } catch (error) {
+        console.log(error);
+    }
+}
+
+// Appends messages that are not yet in the history and moves the cursor past them
+export const appendMessages = (messages: ChatHistory[], cursor: { current: number | null }, setter: any) => {
+    if (messages.length === 0) {
+        return;
+    }
+    cursor.current = Math.max(cursor.current ?? 0, ...messages.map((message) => message.nachricht_id));
+    setter((history: ChatHistory[]) => {
+        const known = new Set(history.map((message) => message.nachricht_id));
+        return [...history, ...messages.filter((message) => !known.has(message.nachricht_id))]
+            .sort((a, b) => a.nachricht_id - b.nachricht_id);
     });
-    
+}
 
+// Resets the unread counter of the conversation with other_user_id
+export const markConversationAsRead = async (other_user_id: number) => {
+    const accessToken = localStorage.getItem("accessToken");
+    try {
+        await axios.post(addSuffixToBackendURL(`users/chat/gelesen/${other_user_id}`), {}, {
+            headers: {
+                Authorization: `Bearer ${accessToken}`,
+            },
+        });
+    } catch (error) {
+        console.log(error);
+    }
 }
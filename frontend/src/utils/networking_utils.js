@@ -4,6 +4,11 @@ export const addSuffixToBackendURL = (suffix) => {
     return import.meta.env.VITE_BACKEND_URL + suffix;
 }
 
+// WebSocket URL of a backend endpoint (http -> ws, https -> wss)
+export const addSuffixToBackendWebSocketURL = (suffix) => {
+    return addSuffixToBackendURL(suffix).replace(/^http/, "ws");
+}
+
 export const setStateofResponse = async (setter, endpoint, headers = {}) => {
     try {
         const response = await axios.get(addSuffixToBackendURL(endpoint), {headers: headers});
@@ -11,4 +16,24 @@ export const setStateofResponse = async (setter, endpoint, headers = {}) => {
     } catch (err) {
         console.log(err.response.data);
     }
-};
\ No newline at end of file
+};
+
+// Fetches all users page by page, following the X-Next-Cursor header of GET /users
+export const fetchAllUsers = async (headers = {}) => {
+    let users = [];
+    let cursor = undefined;
+    do {
+        const response = await axios.get(addSuffixToBackendURL("users"),
+            {headers: headers, params: {limit: 500, cursor: cursor}});
+        users = users.concat(response.data);
+        cursor = response.headers["x-next-cursor"];
+    } while (cursor);
+    return users;
+};
+
+// Returns the number of users from the X-Total-Count header, optionally filtered (e.g. {rolle: "Admin"})
+export const fetchUserCount = async (headers = {}, filter = {}) => {
+    const response = await axios.get(addSuffixToBackendURL("users"),
+        {headers: headers, params: {...filter, limit: 1, mit_anzahl: true}});
+    return Number(response.headers["x-total-count"]);
+};